@@ -1,29 +1,187 @@
+import asyncio
+import hashlib
+import hmac
 import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Callable, Dict, Optional
 
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBasic,
+    HTTPBasicCredentials,
+    HTTPBearer,
+)
 
-security = HTTPBasic()
+from app.config.settings import get_settings
+from app.metrics import AUTH_FAILURES
+from app.utils.passwords import verify_password
+from app.utils.tokens import verify_token
+
+settings = get_settings()
+
+security = HTTPBasic(auto_error=False)
+bearer = HTTPBearer(auto_error=False)
 
 _creds_path = Path(__file__).parent.parent / "credentials.json"
-with open(_creds_path) as f:
-    _USERS = json.load(f).get("users", {})
 
 
-def get_current_user(
-    credentials: HTTPBasicCredentials = Depends(security),
+class CredentialStore:
+    """
+    Password hashes from credentials.json, re-read when the file's mtime
+    changes (checked at most once per `check_interval` seconds).
+    `version` increases on every reload.
+    """
+    def __init__(
+        self,
+        path: Path,
+        check_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._path = path
+        self._check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._users: Dict[str, str] = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+        self.version = 0
+        self._reload()
+
+    def hash_for(self, username: str) -> Optional[str]:
+        self._maybe_reload()
+        return self._users.get(username)
+
+    def _maybe_reload(self) -> None:
+        now = self._clock()
+        if now - self._checked_at < self._check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self._check_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.stat(self._path).st_mtime
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self._reload()
+
+    def _reload(self) -> None:
+        with open(self._path) as f:
+            self._users = json.load(f).get("users", {})
+        self._mtime = os.stat(self._path).st_mtime
+        self.version += 1
+
+
+class VerifiedCredentials:
+    """
+    Bounded LRU of credentials that recently passed the (deliberately
+    slow) password hash check, keyed by an HMAC of username and password
+    so the plaintext is never kept. Entries made before the store was
+    last reloaded are ignored. Failed checks are not cached.
+    """
+    def __init__(self, store: CredentialStore, max_size: int = 1024):
+        self._store = store
+        self._max_size = max_size
+        self._key = secrets.token_bytes(32)
+        self._entries: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, username: str, password: str) -> bytes:
+        return hmac.new(
+            self._key, f"{username}\0{password}".encode(), hashlib.sha256
+        ).digest()
+
+    def cached(self, username: str, password: str) -> bool:
+        # hash_for also picks up a changed credentials.json, so the
+        # version compared below is current.
+        if self._store.hash_for(username) is None:
+            return False
+        digest = self._digest(username, password)
+        with self._lock:
+            version = self._entries.get(digest)
+            if version is None:
+                return False
+            if version != self._store.version:
+                del self._entries[digest]
+                return False
+            self._entries.move_to_end(digest)
+            return True
+
+    def check(self, username: str, password: str) -> bool:
+        if self.cached(username, password):
+            return True
+        encoded = self._store.hash_for(username)
+        version = self._store.version
+        if not encoded or not verify_password(password, encoded):
+            return False
+        digest = self._digest(username, password)
+        with self._lock:
+            self._entries[digest] = version
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return True
+
+    async def acheck(self, username: str, password: str) -> bool:
+        """check(), with a cache miss hashed off the event loop."""
+        if self.cached(username, password):
+            return True
+        return await asyncio.to_thread(self.check, username, password)
+
+
+def _token_secret() -> bytes:
+    if settings.auth_token_secret:
+        return settings.auth_token_secret.encode()
+    if settings.environment != "test":
+        raise RuntimeError(
+            "AUTH_TOKEN_SECRET is not set; every API process must sign tokens "
+            "with the same key"
+        )
+    return secrets.token_bytes(32)
+
+
+credential_store = CredentialStore(_creds_path)
+verified_credentials = VerifiedCredentials(
+    credential_store, max_size=settings.auth_verified_cache_size
+)
+token_secret = _token_secret()
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid authentication credentials",
+        headers={"WWW-Authenticate": "Basic, Bearer"},
+    )
+
+
+async def get_current_user(
+    token: Optional[HTTPAuthorizationCredentials] = Depends(bearer),
+    credentials: Optional[HTTPBasicCredentials] = Depends(security),
 ) -> str:
     """
-    Validates against username/passwords in credentials.json.
-    Raises 401 if invalid.
+    Accepts a bearer token from POST /auth/token (an HMAC check) or HTTP
+    Basic credentials from credentials.json (a password hash check, cached
+    for recently verified credentials). Raises 401 if neither is valid.
     Returns the username on success.
     """
-    correct = _USERS.get(credentials.username)
-    if not correct or credentials.password != correct:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials",
-            headers={"WWW-Authenticate": "Basic"},
-        )
+    if token is not None:
+        username = verify_token(token.credentials, token_secret)
+        if username is None or credential_store.hash_for(username) is None:
+            AUTH_FAILURES.inc("bearer")
+            raise _unauthorized()
+        return username
+    if credentials is None:
+        AUTH_FAILURES.inc("missing")
+        raise _unauthorized()
+    if not await verified_credentials.acheck(credentials.username, credentials.password):
+        AUTH_FAILURES.inc("basic")
+        raise _unauthorized()
     return credentials.username
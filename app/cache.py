@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.metrics import CallbackGauge, Counter
+
+settings = get_settings()
+
+CACHE_REQUESTS = Counter(
+    "enrollment_cache_requests_total",
+    "Enrollment cache lookups, by kind (item or page) and result",
+    ("kind", "result"),
+)
+
+
+class TTLCache:
+    """
+    Bounded LRU whose entries also expire `ttl` seconds after they were
+    stored. A `max_size` or `ttl` of 0 disables it.
+    """
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0 and self._ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self._clock() - stored_at >= self._ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class EnrollmentCache:
+    """
+    Read-through cache of the serialized GET /enrollments/{id} and list
+    page responses, used from the event loop only.
+
+    Items are keyed by (owner, id) and dropped when that enrollment
+    changes. List pages are keyed by the owner's version, which any change
+    to the owner's enrollments bumps, so stale pages are never looked up
+    again and simply age out. Versions are kept for the `max_size` most
+    recently changed owners; evicting one moves every owner without a
+    version of its own to a new base version, so their pages miss too. A lookup returns a token to pass back when
+    storing what it missed: if anything was invalidated in between, the
+    result may predate the change and is not stored. Changes this process
+    never hears about (e.g. writes by another API process) are bounded by
+    the TTL.
+    """
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self._entries = TTLCache(max_size, ttl, clock)
+        self._max_owners = max(max_size, 1)
+        self._owner_versions: "OrderedDict[Optional[str], int]" = OrderedDict()
+        self._base_version = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _lookup(self, kind: str, key: Hashable) -> Tuple[Optional[Any], int]:
+        if not self._entries.enabled:
+            return None, self._generation
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(kind, "miss")
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.inc(kind, "hit")
+        return value, self._generation
+
+    def _store(self, key: Hashable, value: Any, token: int) -> None:
+        if token == self._generation:
+            self._entries.put(key, value)
+
+    def get_item(self, owner: str, id: str) -> Tuple[Optional[bytes], int]:
+        return self._lookup("item", ("item", owner, id))
+
+    def put_item(self, owner: str, id: str, body: bytes, token: int) -> None:
+        self._store(("item", owner, id), body, token)
+
+    def _page_key(self, owner: str, limit: int, cursor: Optional[str]) -> Tuple:
+        return ("page", owner, self._owner_versions.get(owner, self._base_version), limit, cursor)
+
+    def get_page(self, owner: str, limit: int, cursor: Optional[str]) -> Tuple[Optional[Any], int]:
+        return self._lookup("page", self._page_key(owner, limit, cursor))
+
+    def put_page(self, owner: str, limit: int, cursor: Optional[str], page: Any, token: int) -> None:
+        self._store(self._page_key(owner, limit, cursor), page, token)
+
+    def invalidate(self, owner: Optional[str], ids: Iterable[str] = ()) -> None:
+        """Drops the given enrollments and every cached page of `owner`."""
+        self._generation += 1
+        self._owner_versions[owner] = self._generation
+        self._owner_versions.move_to_end(owner)
+        while len(self._owner_versions) > self._max_owners:
+            self._owner_versions.popitem(last=False)
+            self._base_version = self._generation
+        for id in ids:
+            self._entries.pop(("item", owner, id))
+
+    def invalidate_events(self, events: Iterable[Dict]) -> None:
+        """invalidate() for status-change events from the worker."""
+        by_owner: Dict[Optional[str], list] = {}
+        for event in events:
+            by_owner.setdefault(event.get("owner"), []).append(event["id"])
+        for owner, ids in by_owner.items():
+            self.invalidate(owner, ids)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._owner_versions.clear()
+        self._generation += 1
+        self._base_version = self._generation
+
+
+enrollment_cache = EnrollmentCache(
+    max_size=settings.enrollment_cache_size,
+    ttl=settings.enrollment_cache_ttl_seconds,
+)
+CallbackGauge(
+    "enrollment_cache_hit_ratio",
+    "Share of enrollment cache lookups served from the cache since startup",
+    enrollment_cache.hit_ratio,
+)
@@ -0,0 +1,235 @@
+import abc
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AgeGroupIndex:
+    """
+    Age groups merged into sorted, non-overlapping intervals so that
+    membership is a bisect instead of a scan over every group.
+    """
+    def __init__(self, groups: Iterable[Dict]):
+        intervals = sorted(
+            (g["min_age"], g["max_age"])
+            for g in groups
+            if g["min_age"] <= g["max_age"]
+        )
+        starts: List = []
+        ends: List = []
+        for lo, hi in intervals:
+            if ends and lo <= ends[-1]:
+                ends[-1] = max(ends[-1], hi)
+            else:
+                starts.append(lo)
+                ends.append(hi)
+        self._starts = starts
+        self._ends = ends
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def contains(self, age) -> bool:
+        i = bisect.bisect_right(self._starts, age) - 1
+        return i >= 0 and age <= self._ends[i]
+
+
+class _AgeGroupsSnapshot(abc.ABC):
+    """
+    Snapshot bookkeeping shared by the sync and async caches.
+
+    The snapshot is reloaded once it is older than `ttl_seconds`. When a
+    reload fails, the previous snapshot keeps being served until it is
+    older than `max_staleness_seconds`. With a background refresher
+    running, readers never reload themselves while the snapshot is within
+    the staleness window.
+    """
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_staleness_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._ttl = ttl_seconds
+        self._max_staleness = max(max_staleness_seconds, ttl_seconds)
+        self._clock = clock
+        self._snapshot: Tuple[Optional[AgeGroupIndex], float] = (None, 0.0)
+
+    def clear(self) -> None:
+        self._snapshot = (None, 0.0)
+
+    @abc.abstractmethod
+    def _background_active(self) -> bool:
+        """Whether a background refresher is running."""
+
+    def _refresh_interval(self) -> float:
+        return max(self._ttl / 2, 1.0)
+
+    def _cached(self) -> Optional[AgeGroupIndex]:
+        index, loaded_at = self._snapshot
+        if index is None:
+            return None
+        age = self._clock() - loaded_at
+        if age < self._ttl:
+            return index
+        if self._background_active() and age < self._max_staleness:
+            return index
+        return None
+
+    def _fresh(self) -> Optional[AgeGroupIndex]:
+        index, loaded_at = self._snapshot
+        if index is not None and self._clock() - loaded_at < self._ttl:
+            return index
+        return None
+
+    def _stale_fallback(self) -> Optional[AgeGroupIndex]:
+        index, loaded_at = self._snapshot
+        age = self._clock() - loaded_at
+        if index is not None and age < self._max_staleness:
+            logger.warning(
+                f"Age groups refresh failed; serving snapshot from {age:.0f}s ago"
+            )
+            return index
+        return None
+
+    def _store(self, groups: List[Dict]) -> AgeGroupIndex:
+        index = AgeGroupIndex(groups)
+        self._snapshot = (index, self._clock())
+        return index
+
+
+class AgeGroupsCache(_AgeGroupsSnapshot):
+    """
+    Holds the last good snapshot of the age groups as an AgeGroupIndex,
+    refreshed from a blocking loader (optionally on a daemon thread).
+    """
+    def __init__(
+        self,
+        loader: Callable[[], List[Dict]],
+        ttl_seconds: float,
+        max_staleness_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(ttl_seconds, max_staleness_seconds, clock)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self) -> AgeGroupIndex:
+        index = self._cached()
+        if index is not None:
+            return index
+        try:
+            return self._reload(only_if_stale=True)
+        except Exception:
+            index = self._stale_fallback()
+            if index is None:
+                raise
+            return index
+
+    def start_background_refresh(self) -> None:
+        if self._background_active():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop,
+            name="age-groups-refresh",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            # A refresh stuck in retries must not hold up shutdown; the
+            # thread is a daemon and exits with the process.
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _background_active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self._reload(only_if_stale=False)
+            except Exception:
+                logger.exception("Background age groups refresh failed")
+            if self._stop.wait(self._refresh_interval()):
+                return
+
+    def _reload(self, only_if_stale: bool) -> AgeGroupIndex:
+        with self._lock:
+            index = self._fresh() if only_if_stale else None
+            if index is not None:
+                return index
+            return self._store(self._loader())
+
+
+class AsyncAgeGroupsCache(_AgeGroupsSnapshot):
+    """
+    Same caching policy as AgeGroupsCache for an async loader; the
+    background refresher is an asyncio task on the running loop.
+    """
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[List[Dict]]],
+        ttl_seconds: float,
+        max_staleness_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(ttl_seconds, max_staleness_seconds, clock)
+        self._loader = loader
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self) -> AgeGroupIndex:
+        index = self._cached()
+        if index is not None:
+            return index
+        try:
+            return await self._reload(only_if_stale=True)
+        except Exception:
+            index = self._stale_fallback()
+            if index is None:
+                raise
+            return index
+
+    def start_background_refresh(self) -> None:
+        if not self._background_active():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop_background_refresh(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _background_active(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self._reload(only_if_stale=False)
+            except Exception:
+                logger.exception("Background age groups refresh failed")
+            await asyncio.sleep(self._refresh_interval())
+
+    async def _reload(self, only_if_stale: bool) -> AgeGroupIndex:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            index = self._fresh() if only_if_stale else None
+            if index is not None:
+                return index
+            return self._store(await self._loader())
@@ -13,3 +13,17 @@ class AgeGroupsClient:
         resp = self.http.get(f"{self.base_url}/age-groups/")
         resp.raise_for_status()
         return resp.json()
+
+
+class AsyncAgeGroupsClient:
+    """
+    Async counterpart of AgeGroupsClient for httpx.AsyncClient.
+    """
+    def __init__(self, base_url: str, http_client: httpx.AsyncClient):
+        self.base_url = base_url.rstrip("/")
+        self.http = http_client
+
+    async def list(self) -> List[dict]:
+        resp = await self.http.get(f"{self.base_url}/age-groups/")
+        resp.raise_for_status()
+        return resp.json()
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+from app.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes, by breaker and new state",
+    ("breaker", "state"),
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The breaker is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after `failure_threshold` consecutive
+    failures, so callers fail in microseconds instead of waiting on it.
+
+    Closed: calls go through and failures are counted. Open: every call
+    is refused with CircuitOpenError until `reset_timeout` seconds have
+    passed. Half-open: one trial call at a time goes through;
+    `success_threshold` successes in a row close the breaker again, and
+    any failure reopens it for another `reset_timeout`.
+
+    Callers bracket each call with before_call() and record_success() or
+    record_failure(), or release_trial() for a call abandoned before it
+    finished (e.g. cancelled), so the same breaker serves sync and async
+    code. Thread-safe.
+    """
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        success_threshold: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self._failure_threshold = max(1, failure_threshold)
+        self._reset_timeout = reset_timeout
+        self._success_threshold = max(1, success_threshold)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self._reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == OPEN:
+                if self._clock() - self._opened_at < self._reset_timeout:
+                    raise CircuitOpenError(f"{self.name} circuit is open")
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError(f"{self.name} circuit is half-open; trial call in flight")
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state != HALF_OPEN:
+                return
+            self._trial_in_flight = False
+            self._successes += 1
+            if self._successes >= self._success_threshold:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self._failure_threshold:
+                self._opened_at = self._clock()
+                if self._state != OPEN:
+                    self._transition(OPEN)
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot without counting the call either way."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def call(self, fn: Callable, *args, **kwargs):
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            self.release_trial()
+            raise
+        self.record_success()
+        return result
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"{self.name} circuit {self._state} -> {state}")
+        self._state = state
+        self._successes = 0
+        if state == CLOSED:
+            self._failures = 0
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
@@ -1,10 +1,21 @@
+import logging
+import os
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+logger = logging.getLogger(__name__)
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
+        frozen=True,
     )
 
     environment: str
@@ -17,6 +28,155 @@ class Settings(BaseSettings):
     age_groups_api_username: str
     age_groups_api_password: str
 
+    auth_token_secret: str = ""
+    auth_token_ttl_seconds: int = 900
+    auth_verified_cache_size: int = 1024
+
+    enrollments_page_size_default: int = 100
+    enrollments_page_size_max: int = 500
+    enrollments_bulk_max_items: int = 5000
+
+    rabbit_reconnect_delay_seconds: float = 2.0
+    rabbit_confirm_timeout_seconds: float = 5.0
+    rabbit_confirm_batch_size: int = 100
+
+    outbox_enabled: bool = False
+    outbox_batch_size: int = 500
+    outbox_poll_interval_seconds: float = 0.2
+
+    enrollment_cache_size: int = 10_000
+    enrollment_cache_ttl_seconds: float = 5.0
+    enrollment_events_exchange: str = "enrollment_events"
+    enrollment_events_keepalive_seconds: float = 15.0
+    enrollment_events_max_queued: int = 100
+
+    health_probe_interval_seconds: float = 5.0
+    health_probe_timeout_seconds: float = 2.0
+
+    age_groups_cache_ttl_seconds: float = 60.0
+    age_groups_max_staleness_seconds: float = 900.0
+    age_groups_breaker_failure_threshold: int = 3
+    age_groups_breaker_reset_seconds: float = 30.0
+    age_groups_breaker_success_threshold: int = 1
+
+    worker_batch_size: int = 1
+    worker_batch_timeout_ms: int = 500
+    worker_processing_delay_seconds: float = 0.0
+    worker_concurrency: int = 16
+    worker_retry_delays_seconds: Tuple[int, ...] = (10, 60, 600)
+    worker_stats_port: int = 9100
+    worker_stats_log_interval_seconds: float = 60.0
+
+
+SettingsListener = Callable[[Settings, Settings], None]
+
+
+class SettingsStore:
+    """
+    Settings parsed once into a frozen snapshot, re-parsed when the env
+    file's mtime changes (checked at most once per `check_interval`
+    seconds) or after request_reload(), e.g. from SIGHUP. A reload swaps
+    the snapshot in one assignment and then calls each listener with the
+    old and new snapshot if anything changed; a reload that fails to
+    parse keeps the current snapshot.
+    """
+    def __init__(
+        self,
+        path: Path = Path(".env"),
+        factory: Callable[[], Settings] = Settings,
+        check_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._path = path
+        self._factory = factory
+        self._check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._listeners: List[SettingsListener] = []
+        self._snapshot: Optional[Settings] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._reload_requested = False
+        self.parses = 0
+
+    def current(self) -> Settings:
+        if self._snapshot is None or self._reload_requested:
+            self.reload()
+        elif self._clock() - self._checked_at >= self._check_interval:
+            self._check_mtime()
+        return self._snapshot
+
+    def subscribe(self, listener: SettingsListener) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: SettingsListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def request_reload(self) -> None:
+        """Async-signal-safe: the next current() call does the reload."""
+        self._reload_requested = True
+
+    def reload(self) -> Settings:
+        with self._lock:
+            self._reload_requested = False
+            self._checked_at = self._clock()
+            self._mtime = self._stat()
+            old = self._snapshot
+            try:
+                self.parses += 1
+                new = self._factory()
+            except Exception:
+                if old is None:
+                    raise
+                logger.exception("Could not reload settings; keeping the current ones")
+                return old
+            if old is not None and new == old:
+                return old
+            self._snapshot = new
+        if old is not None:
+            logger.info("Settings reloaded")
+            for listener in self._listeners:
+                try:
+                    listener(old, new)
+                except Exception:
+                    logger.exception("Settings listener failed")
+        return new
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self._path).st_mtime
+        except OSError:
+            return None
+
+    def _check_mtime(self) -> None:
+        with self._lock:
+            if self._clock() - self._checked_at < self._check_interval:
+                return
+            self._checked_at = self._clock()
+            changed = self._stat() != self._mtime
+        if changed:
+            self.reload()
+
+
+def settings_changed(old: Settings, new: Settings, *fields: str) -> bool:
+    return any(getattr(old, f) != getattr(new, f) for f in fields)
+
+
+settings_store = SettingsStore()
+
 
 def get_settings() -> Settings:
-    return Settings()
+    return settings_store.current()
+
+
+def reload_settings_on_sighup() -> bool:
+    """
+    Installs a SIGHUP handler that makes the next get_settings() call
+    reload. Only the main thread can install signal handlers; returns
+    False elsewhere.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGHUP, lambda signum, frame: settings_store.request_reload())
+    return True
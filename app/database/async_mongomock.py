@@ -0,0 +1,114 @@
+from typing import Any, List, Optional
+
+from mongomock import MongoClient as MockClient
+
+
+class AsyncMockCursor:
+    """
+    Async iteration over a mongomock cursor, mirroring the parts of
+    pymongo's AsyncCursor the application uses.
+    """
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs) -> "AsyncMockCursor":
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int) -> "AsyncMockCursor":
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    def skip(self, skip: int) -> "AsyncMockCursor":
+        self._cursor = self._cursor.skip(skip)
+        return self
+
+    def batch_size(self, batch_size: int) -> "AsyncMockCursor":
+        return self
+
+    def __aiter__(self) -> "AsyncMockCursor":
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = []
+        async for doc in self:
+            docs.append(doc)
+            if length is not None and len(docs) >= length:
+                break
+        return docs
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncMockCollection:
+    """
+    Awaitable facade over a mongomock collection. `find` returns a cursor
+    synchronously and `aggregate` is awaited, as in pymongo's async API.
+    """
+    def __init__(self, collection):
+        self._collection = collection
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    def find(self, *args, **kwargs) -> AsyncMockCursor:
+        return AsyncMockCursor(self._collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs) -> AsyncMockCursor:
+        return AsyncMockCursor(iter(self._collection.aggregate(*args, **kwargs)))
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncMockDatabase:
+    def __init__(self, db, client: "AsyncMockClient"):
+        self._db = db
+        self.client = client
+
+    @property
+    def name(self) -> str:
+        return self._db.name
+
+    def __getitem__(self, name: str) -> AsyncMockCollection:
+        return AsyncMockCollection(self._db[name])
+
+    async def command(self, command, *args, **kwargs):
+        if command == "ping":
+            return {"ok": 1.0}
+        return self._db.command(command, *args, **kwargs)
+
+    async def drop_collection(self, name: str) -> None:
+        self._db.drop_collection(name)
+
+
+class AsyncMockClient:
+    """
+    Stands in for pymongo's AsyncMongoClient in test mode, sharing data
+    with the synchronous mongomock client it wraps.
+    """
+    def __init__(self, client: Optional[MockClient] = None):
+        self._client = client or MockClient()
+
+    def __getitem__(self, name: str) -> AsyncMockDatabase:
+        return AsyncMockDatabase(self._client[name], self)
+
+    @property
+    def admin(self) -> AsyncMockDatabase:
+        return self["admin"]
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,51 @@
+import asyncio
+
+from pymongo import AsyncMongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.config.settings import Settings, get_settings, settings_changed, settings_store
+from app.database.async_mongomock import AsyncMockClient
+from app.database.provider import DatabaseProvider
+
+
+class AsyncDatabaseProvider:
+    _client: AsyncMongoClient | None = None
+
+    @classmethod
+    def get_client(cls) -> AsyncMongoClient | AsyncMockClient:
+        settings = get_settings()
+        if settings.environment == "test":
+            # Wrap the sync mock so async and sync code see the same data.
+            return AsyncMockClient(DatabaseProvider.get_client())
+        if cls._client is None:
+            cls._client = AsyncMongoClient(settings.mongo_uri)
+        return cls._client
+
+    @classmethod
+    def get_db(cls) -> AsyncDatabase:
+        settings = get_settings()
+        return cls.get_client()[settings.mongo_db_name]
+
+    @classmethod
+    def on_settings_changed(cls, old: Settings, new: Settings) -> None:
+        if cls._client is None or not settings_changed(old, new, "mongo_uri"):
+            return
+        # Requests already awaiting the old client finish on it first; see
+        # DatabaseProvider.on_settings_changed.
+        client, cls._client = cls._client, None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop left to close it on; it goes with the process
+        loop.call_later(
+            DatabaseProvider.close_grace_seconds, lambda: loop.create_task(client.close())
+        )
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._client is not None:
+            await cls._client.close()
+            cls._client = None
+
+
+settings_store.subscribe(AsyncDatabaseProvider.on_settings_changed)
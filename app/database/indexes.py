@@ -0,0 +1,62 @@
+import logging
+from typing import List
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+
+from app.enums.enrollment_status import EnrollmentStatus
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [EnrollmentStatus.pending.value, EnrollmentStatus.approved.value]
+
+ENROLLMENT_INDEXES: List[IndexModel] = [
+    # One owner's enrollments of a CPF by status: {"owner", "cpf", "status"}
+    IndexModel(
+        [("owner", ASCENDING), ("cpf", ASCENDING), ("status", ASCENDING)],
+        name="owner_cpf_status",
+    ),
+    # Worker rule checks across owners: {"cpf": ..., "status": ...}
+    IndexModel(
+        [("cpf", ASCENDING), ("status", ASCENDING)],
+        name="cpf_status",
+    ),
+    # Owner listings ordered by _id
+    IndexModel(
+        [("owner", ASCENDING), ("_id", ASCENDING)],
+        name="owner_id",
+    ),
+    # At most one pending/approved enrollment per CPF and owner; this is
+    # what AsyncEnrollmentService.create's DuplicateKeyError handler relies on.
+    # Partial filters with $in require MongoDB 6.0+.
+    IndexModel(
+        [("cpf", ASCENDING), ("owner", ASCENDING)],
+        name="cpf_owner_active_unique",
+        unique=True,
+        partialFilterExpression={"status": {"$in": ACTIVE_STATUSES}},
+    ),
+    # Outbox relay: enrollments not yet published, oldest first. Only
+    # unpublished documents carry the flag, so the index stays small.
+    IndexModel(
+        [("outbox_pending", ASCENDING), ("_id", ASCENDING)],
+        name="outbox_pending",
+        partialFilterExpression={"outbox_pending": True},
+    ),
+]
+
+
+def ensure_indexes(db: Database) -> List[str]:
+    """
+    Creates the enrollment indexes. Safe to run on every start: MongoDB
+    treats re-creating an identical index as a no-op.
+    """
+    names = db["enrollments"].create_indexes(ENROLLMENT_INDEXES)
+    logger.info(f"Ensured enrollment indexes: {', '.join(names)}")
+    return names
+
+
+async def ensure_indexes_async(db: AsyncDatabase) -> List[str]:
+    names = await db["enrollments"].create_indexes(ENROLLMENT_INDEXES)
+    logger.info(f"Ensured enrollment indexes: {', '.join(names)}")
+    return names
@@ -1,12 +1,15 @@
+import threading
 from contextlib import contextmanager
 from pymongo import MongoClient
 from pymongo.database import Database
-from app.config.settings import get_settings
+from app.config.settings import Settings, get_settings, settings_changed, settings_store
 
 from mongomock import MongoClient as MockClient
 
 class DatabaseProvider:
     _client: MongoClient | MockClient | None = None
+    # How long a replaced client stays open for operations already using it.
+    close_grace_seconds: float = 30.0
 
     @classmethod
     def get_client(cls) -> MongoClient | MockClient:
@@ -23,7 +26,22 @@ class DatabaseProvider:
         settings = get_settings()
         return cls.get_client()[settings.mongo_db_name]
 
+    @classmethod
+    def on_settings_changed(cls, old: Settings, new: Settings) -> None:
+        # A new database name is picked up by get_db on its own. Threads
+        # partway through an operation on the old client (e.g. the outbox
+        # relay) still hold it, so it is closed after a grace period rather
+        # than here.
+        if cls._client is not None and settings_changed(old, new, "environment", "mongo_uri"):
+            client, cls._client = cls._client, None
+            closer = threading.Timer(cls.close_grace_seconds, client.close)
+            closer.daemon = True
+            closer.start()
+
     @classmethod
     @contextmanager
     def session(cls):
         yield cls.get_db()
+
+
+settings_store.subscribe(DatabaseProvider.on_settings_changed)
@@ -3,7 +3,10 @@ from fastapi import Depends
 
 from app.clients.age_groups_client import AgeGroupsClient
 from app.config.settings import get_settings
+from app.database.async_provider import AsyncDatabaseProvider
 from app.database.provider import DatabaseProvider
+from app.health import HealthProber, health_prober
+from app.repositories.async_enrollment_repo import AsyncEnrollmentRepository
 from app.repositories.enrollment_repo import EnrollmentRepository
 
 settings = get_settings()
@@ -23,3 +26,14 @@ def get_db():
 
 def get_enrollment_repo(db=Depends(get_db)):
     return EnrollmentRepository(db)
+
+# Request-path dependencies are `async def` so FastAPI resolves them on
+# the event loop instead of handing each one to the threadpool.
+async def get_async_db():
+    return AsyncDatabaseProvider.get_db()
+
+async def get_async_enrollment_repo(db=Depends(get_async_db)):
+    return AsyncEnrollmentRepository(db)
+
+async def get_health_prober() -> HealthProber:
+    return health_prober
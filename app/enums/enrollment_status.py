@@ -6,3 +6,8 @@ class EnrollmentStatus(str, Enum):
     approved  = "approved"
     rejected  = "rejected"
     failed    = "failed"
+
+
+# Never re-decided. A failed enrollment is not final: replaying its
+# parked message decides it again.
+FINAL_STATUSES = frozenset({EnrollmentStatus.approved.value, EnrollmentStatus.rejected.value})
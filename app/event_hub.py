@@ -0,0 +1,137 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.config.settings import get_settings
+from app.enums.enrollment_status import FINAL_STATUSES
+from app.metrics import CallbackGauge
+from app.utils.sse import KEEPALIVE, sse_message
+
+settings = get_settings()
+
+SubscriptionKey = Tuple[Optional[str], Optional[str]]
+
+
+class Subscription:
+    """
+    One open stream: the owner's events, or only those of one enrollment.
+    Events wait in a bounded queue until the stream writes them out.
+    """
+    def __init__(self, owner: Optional[str], enrollment_id: Optional[str], max_queued: int):
+        self.owner = owner
+        self.enrollment_id = enrollment_id
+        self.queue: "asyncio.Queue[Dict]" = asyncio.Queue(max_queued)
+        self.overflowed = False
+
+    @property
+    def key(self) -> SubscriptionKey:
+        return self.owner, self.enrollment_id
+
+
+class EventHub:
+    """
+    Fans the status-change events received by the process's single
+    EnrollmentEventsListener out to the open event streams, used from the
+    event loop only.
+
+    Subscriptions are indexed by (owner, enrollment id) and (owner, None),
+    so publishing an event touches only the streams that want it, however
+    many are open. A stream whose client reads too slowly to keep up with
+    `max_queued` events is dropped rather than buffered without bound;
+    the client reconnects and resumes from the current status.
+    """
+    def __init__(self, max_queued: int = 100):
+        self._max_queued = max_queued
+        self._subscriptions: Dict[SubscriptionKey, Set[Subscription]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, owner: Optional[str], enrollment_id: Optional[str] = None) -> Subscription:
+        sub = Subscription(owner, enrollment_id, self._max_queued)
+        self._subscriptions.setdefault(sub.key, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscriptions.get(sub.key)
+        if subs is None or sub not in subs:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscriptions[sub.key]
+        self._count -= 1
+
+    def publish(self, events: Iterable[Dict]) -> None:
+        for event in events:
+            owner = event.get("owner")
+            for key in ((owner, None), (owner, event["id"])):
+                for sub in list(self._subscriptions.get(key, ())):
+                    try:
+                        sub.queue.put_nowait(event)
+                    except asyncio.QueueFull:
+                        sub.overflowed = True
+                        self.unsubscribe(sub)
+
+    async def stream(
+        self,
+        sub: Subscription,
+        keepalive: float,
+        current: Optional[Dict] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Writes the subscription's events as SSE messages, starting with
+        `current` if given, and a keepalive comment after `keepalive` idle
+        seconds. A single-enrollment stream ends once the enrollment is
+        approved or rejected. Unsubscribes when the stream ends or the client
+        disconnects.
+        """
+        try:
+            events = [current] if current is not None else []
+            while True:
+                for event in events:
+                    yield sse_message("status", {
+                        "id": event["id"],
+                        "status": event["status"],
+                        "rejection_reason": event.get("rejection_reason"),
+                    })
+                    if sub.enrollment_id is not None and event["status"] in FINAL_STATUSES:
+                        return
+                if sub.overflowed and sub.queue.empty():
+                    return
+                try:
+                    events = [await asyncio.wait_for(sub.queue.get(), keepalive)]
+                except asyncio.TimeoutError:
+                    events = []
+                    yield KEEPALIVE
+        finally:
+            self.unsubscribe(sub)
+
+    async def open_stream(
+        self,
+        owner: Optional[str],
+        enrollment_id: Optional[str],
+        keepalive: float,
+        current: Optional[Callable[[], Awaitable[Optional[Dict]]]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        stream() on a subscription made once the response starts, so a
+        response that is never sent (the client left first) holds none.
+        `current` loads the first event after subscribing, so a change
+        made in between is not missed.
+        """
+        sub = self.subscribe(owner, enrollment_id)
+        try:
+            first = await current() if current is not None else None
+            async for chunk in self.stream(sub, keepalive, first):
+                yield chunk
+        finally:
+            self.unsubscribe(sub)
+
+
+event_hub = EventHub(max_queued=settings.enrollment_events_max_queued)
+CallbackGauge(
+    "enrollment_event_streams",
+    "Enrollment event streams currently open",
+    event_hub.__len__,
+)
@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from app.clients.age_groups_client import AsyncAgeGroupsClient
+from app.config.settings import get_settings
+from app.database.async_provider import AsyncDatabaseProvider
+from app.queue.async_provider import AsyncRabbitMQProvider
+from app.schemas.health_schema import ProbeStatus, ReadinessStatus
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+Probe = Callable[[], Awaitable[None]]
+
+
+class HealthProber:
+    """
+    Probes the API's dependencies from a background task every `interval`
+    seconds, so health endpoints answer from the last result instead of
+    touching MongoDB or RabbitMQ per request.
+
+    Each probe is an async callable that raises when its dependency is
+    down; one that runs past `timeout` counts as failed. Readiness needs
+    every `required` probe to have passed on a result that is not stale
+    (older than three intervals plus the timeout, e.g. because the
+    prober stopped).
+
+    Probes of HTTP dependencies share `http`, the client made by
+    `http_client` in start() and closed in stop().
+    """
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        required: Iterable[str],
+        interval: float = 5.0,
+        timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        http_client: Optional[Callable[[], httpx.AsyncClient]] = None,
+    ):
+        self._probes = probes
+        self._required = set(required)
+        self._interval = interval
+        self._timeout = timeout
+        self._clock = clock
+        self._max_age = interval * 3 + timeout
+        self._http_client = http_client
+        self.http: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        # (passed, probed at, encoded ReadinessStatus); swapped as a whole.
+        self._state: Optional[Tuple[bool, float, bytes]] = None
+
+    def readiness(self) -> Tuple[bool, bytes]:
+        """Whether the API is ready, and the last ReadinessStatus as JSON."""
+        state = self._state
+        if state is None:
+            return False, ReadinessStatus(status="unavailable", checks={}).model_dump_json().encode()
+        passed, probed_at, body = state
+        return passed and self._clock() - probed_at < self._max_age, body
+
+    async def probe_once(self) -> bool:
+        names = list(self._probes)
+        checks = dict(zip(names, await asyncio.gather(*(self._run(n) for n in names))))
+        passed = all(checks[n].ok for n in self._required if n in checks)
+        body = ReadinessStatus(
+            status="ok" if passed else "unavailable", checks=checks
+        ).model_dump_json().encode()
+        self._state = (passed, self._clock(), body)
+        return passed
+
+    def start(self) -> None:
+        if self.http is None and self._http_client is not None:
+            self.http = self._http_client()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def _run(self, name: str) -> ProbeStatus:
+        checked_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        error = None
+        try:
+            await asyncio.wait_for(self._probes[name](), self._timeout)
+        except asyncio.TimeoutError:
+            error = f"timed out after {self._timeout:g}s"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        if error is not None and name in self._required:
+            logger.warning(f"Health probe {name} failed: {error}")
+        return ProbeStatus(
+            ok=error is None,
+            required=name in self._required,
+            checked_at=checked_at,
+            latency_ms=round((time.perf_counter() - started) * 1000, 3),
+            error=error,
+        )
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except Exception:
+                logger.exception("Health probe pass failed")
+            await asyncio.sleep(self._interval)
+
+
+async def _probe_mongodb() -> None:
+    await AsyncDatabaseProvider.get_db().client.admin.command("ping")
+
+
+async def _probe_rabbitmq() -> None:
+    # The publisher reconnects on its own; its channel state is the check.
+    if not AsyncRabbitMQProvider.get_publisher().is_ready:
+        raise ConnectionError("publisher channel is not open")
+
+
+def _age_groups_http() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        auth=(settings.age_groups_api_username, settings.age_groups_api_password),
+    )
+
+
+async def _probe_age_groups() -> None:
+    if health_prober.http is None:
+        raise ConnectionError("health prober is not started")
+    await AsyncAgeGroupsClient(settings.age_groups_api_url, health_prober.http).list()
+
+
+# The Age Groups API is only called by the worker, so it is reported but
+# does not take the API out of rotation.
+health_prober = HealthProber(
+    {
+        "mongodb": _probe_mongodb,
+        "rabbitmq": _probe_rabbitmq,
+        "age_groups_api": _probe_age_groups,
+    },
+    required=("mongodb", "rabbitmq"),
+    interval=settings.health_probe_interval_seconds,
+    timeout=settings.health_probe_timeout_seconds,
+    http_client=_age_groups_http,
+)
@@ -0,0 +1,291 @@
+import abc
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric") -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines: List[str] = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric(abc.ABC):
+    """
+    Each thread updates its own shard, so recording never takes a lock
+    and the event loop thread never waits on the worker threads. Shards
+    are only merged when the metrics are rendered.
+    """
+    type = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, object]] = []
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _shard(self) -> Dict[LabelValues, object]:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[LabelValues, object] = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self) -> List[Dict[LabelValues, object]]:
+        with self._lock:
+            shards = list(self._shards)
+        # Copying a dict is a single step under the GIL, so this never
+        # sees a shard halfway through a resize.
+        return [dict(shard) for shard in shards]
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """The metric's sample lines in the Prometheus text format."""
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return sum(s.get(labelvalues, 0) for s in self._snapshots())
+
+    def _totals(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        if not totals and not self.labelnames:
+            totals[()] = 0
+        return totals
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(self._totals().items())
+        ]
+
+
+class Gauge(Counter):
+    """A Counter that can go down; per-thread deltas sum to the value."""
+    type = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+
+class CallbackGauge(_Metric):
+    """A gauge whose value is read from `fn` when the metrics are rendered."""
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        fn: Callable[[], float],
+        registry: Registry = REGISTRY,
+    ):
+        self._fn = fn
+        super().__init__(name, documentation, (), registry)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_number(self._fn())}"]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Registry = REGISTRY,
+    ):
+        self._buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        # One slot per bucket, one for +Inf, then the sum.
+        slots = shard.get(labelvalues)
+        if slots is None:
+            slots = shard[labelvalues] = [0] * (len(self._buckets) + 1) + [0.0]
+        slots[bisect.bisect_left(self._buckets, value)] += 1
+        slots[-1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        return sum(sum(s[labelvalues][:-1]) for s in self._snapshots() if labelvalues in s)
+
+    def samples(self) -> List[str]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshots():
+            for labels, slots in shard.items():
+                total = merged.setdefault(labels, [0] * len(slots))
+                for i, v in enumerate(list(slots)):
+                    total[i] += v
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, slots in sorted(merged.items()):
+            cumulative = 0
+            for bound, n in zip(self._buckets + (float("inf"),), slots):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}")
+            label_str = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_number(slots[-1])}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+def timed_method(histogram: Histogram) -> Callable:
+    """
+    Records how long each call of a method (sync or async) takes, labeled
+    with its class and method name.
+    """
+    def decorate(fn: Callable) -> Callable:
+        labels = tuple(fn.__qualname__.rsplit(".", 1)[-2:])
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start, *labels)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, *labels)
+        return wrapper
+    return decorate
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    ("method",),
+)
+MONGO_OPERATION_SECONDS = Histogram(
+    "mongo_operation_duration_seconds",
+    "Latency of repository methods that query MongoDB",
+    ("repository", "method"),
+    buckets=(0.0005,) + DEFAULT_BUCKETS,
+)
+PUBLISH_SECONDS = Histogram(
+    "enrollment_publish_duration_seconds",
+    "Time from publishing an enrollment until the broker confirmed it",
+)
+PUBLISH_ERRORS = Counter(
+    "enrollment_publish_errors_total",
+    "Enrollment publishes that were not confirmed, by error",
+    ("error",),
+)
+AUTH_FAILURES = Counter(
+    "auth_failures_total",
+    "Rejected authentication attempts, by scheme",
+    ("scheme",),
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording HTTP_REQUEST_SECONDS and
+    HTTP_REQUESTS_IN_FLIGHT. Routes are labeled by their path template
+    ("/enrollments/{enrollment_id}"), and unmatched paths as "unmatched", to keep
+    the label set bounded.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(method)
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method,
+                route.path if route is not None else "unmatched",
+                str(status),
+            )
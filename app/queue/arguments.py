@@ -0,0 +1,18 @@
+def parked_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.parked"
+
+
+def queue_arguments(queue_name: str) -> dict:
+    """
+    Arguments every consumer and publisher must declare the work queue
+    with; RabbitMQ rejects a redeclaration with different arguments.
+
+    Retries are scheduled by the worker through the delay queues of
+    app.queue.retry, not by a TTL on the work queue. Anything rejected
+    from the work queue is dead-lettered to the parking lot, so it is
+    kept for replay instead of dropped.
+    """
+    return {
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": parked_queue_name(queue_name),
+    }
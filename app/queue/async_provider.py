@@ -0,0 +1,68 @@
+import asyncio
+
+from app.config.settings import Settings, get_settings, settings_changed, settings_store
+from app.queue.async_publisher import AsyncPublisher
+from app.queue.events import EnrollmentEventsListener
+from app.queue.provider import PUBLISHER_SETTINGS
+
+
+class AsyncRabbitMQProvider:
+    _publisher: AsyncPublisher | None = None
+    _events: EnrollmentEventsListener | None = None
+
+    @classmethod
+    def get_publisher(cls) -> AsyncPublisher:
+        """
+        Returns the process-wide AsyncPublisher, starting its connection
+        on first use. Must be called from the running event loop.
+        """
+        if cls._publisher is None:
+            settings = get_settings()
+            cls._publisher = AsyncPublisher(
+                url=settings.rabbit_uri,
+                queue_name=settings.rabbit_queue_name,
+                reconnect_delay=settings.rabbit_reconnect_delay_seconds,
+                confirm_timeout=settings.rabbit_confirm_timeout_seconds,
+                confirm_batch_size=settings.rabbit_confirm_batch_size,
+            )
+            cls._publisher.start()
+        return cls._publisher
+
+    @classmethod
+    def get_events_listener(cls) -> EnrollmentEventsListener:
+        """
+        Returns the process-wide consumer of the worker's status-change
+        events, starting it on first use. Must be called from the running
+        event loop.
+        """
+        if cls._events is None:
+            settings = get_settings()
+            cls._events = EnrollmentEventsListener(
+                url=settings.rabbit_uri,
+                exchange=settings.enrollment_events_exchange,
+                reconnect_delay=settings.rabbit_reconnect_delay_seconds,
+            )
+            cls._events.start()
+        return cls._events
+
+    @classmethod
+    def on_settings_changed(cls, old: Settings, new: Settings) -> None:
+        if cls._publisher is None or not settings_changed(old, new, *PUBLISHER_SETTINGS):
+            return
+        publisher, cls._publisher = cls._publisher, None
+        try:
+            asyncio.get_running_loop().create_task(publisher.close())
+        except RuntimeError:
+            pass  # its event loop is gone, and its connection with it
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._publisher is not None:
+            await cls._publisher.close()
+            cls._publisher = None
+        if cls._events is not None:
+            await cls._events.close()
+            cls._events = None
+
+
+settings_store.subscribe(AsyncRabbitMQProvider.on_settings_changed)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import Iterable, List, Optional
+
+import aio_pika
+from aio_pika.abc import AbstractRobustChannel, AbstractRobustConnection
+from aio_pika.exceptions import AMQPError, DeliveryError
+from pamqp.commands import Basic
+
+from app.queue.arguments import queue_arguments
+from app.queue.publisher import PublishNacked, PublisherError, PublisherUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPublisher:
+    """
+    ConfirmingPublisher for the event loop, on aio-pika.
+
+    One robust connection and one confirm-mode channel are shared by every
+    request task; aio-pika tracks confirms per delivery tag, so concurrent
+    publishes are awaited independently and settle together when the
+    broker acks them with `multiple`. The first connection is retried in
+    the background and later drops are repaired by the robust connection;
+    while the channel is down, publishes fail fast with
+    PublisherUnavailable.
+    """
+    def __init__(
+        self,
+        url: str,
+        queue_name: str,
+        reconnect_delay: float = 2.0,
+        confirm_timeout: float = 5.0,
+        confirm_batch_size: int = 100,
+    ):
+        self._url = url
+        self._queue_name = queue_name
+        self._reconnect_delay = reconnect_delay
+        self._confirm_timeout = confirm_timeout
+        self._confirm_batch_size = max(confirm_batch_size, 1)
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractRobustChannel] = None
+        self._connect_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._channel is not None and not self._channel.is_closed
+
+    def start(self) -> None:
+        if self._connect_task is None:
+            self._connect_task = asyncio.create_task(self._connect())
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        self.start()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._connect_task), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.is_ready
+
+    async def close(self) -> None:
+        if self._connect_task is not None:
+            self._connect_task.cancel()
+            try:
+                await self._connect_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._connect_task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+            self._channel = None
+
+    async def publish_and_wait(
+        self, body: bytes, routing_key: Optional[str] = None
+    ) -> Optional[Exception]:
+        """
+        Publishes one persistent message and waits for its confirm.
+        Returns None on ack, otherwise the PublisherError it failed with.
+        """
+        if not self.is_ready:
+            return PublisherUnavailable("Not connected to RabbitMQ")
+        message = aio_pika.Message(body, delivery_mode=aio_pika.DeliveryMode.PERSISTENT)
+        try:
+            confirm = await self._channel.default_exchange.publish(
+                message,
+                routing_key=routing_key or self._queue_name,
+                timeout=self._confirm_timeout,
+            )
+        except asyncio.TimeoutError:
+            return PublisherError("Timed out waiting for the broker to confirm")
+        except DeliveryError:
+            return PublishNacked("RabbitMQ returned the message")
+        except (AMQPError, ConnectionError):
+            return PublisherUnavailable("Not connected to RabbitMQ")
+        if isinstance(confirm, Basic.Nack):
+            return PublishNacked("RabbitMQ refused the message")
+        return None
+
+    async def publish_many(
+        self,
+        bodies: Iterable[bytes],
+        routing_key: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Optional[Exception]]:
+        """
+        Publishes up to `batch_size` messages concurrently and waits for
+        their confirms before sending the next batch. Returns one error
+        (or None) per body.
+        """
+        batch_size = max(batch_size or self._confirm_batch_size, 1)
+        bodies = list(bodies)
+        errors: List[Optional[Exception]] = []
+        for start in range(0, len(bodies), batch_size):
+            errors.extend(await asyncio.gather(*(
+                self.publish_and_wait(body, routing_key)
+                for body in bodies[start:start + batch_size]
+            )))
+        return errors
+
+    async def _connect(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await aio_pika.connect_robust(
+                    self._url, reconnect_interval=self._reconnect_delay
+                )
+                channel = await connection.channel(publisher_confirms=True)
+                await channel.declare_queue(
+                    self._queue_name,
+                    durable=True,
+                    arguments=queue_arguments(self._queue_name),
+                )
+            except (AMQPError, OSError) as e:
+                logger.warning(f"Could not connect to RabbitMQ, retrying: {e}")
+                if connection is not None:
+                    await connection.close()
+                await asyncio.sleep(self._reconnect_delay)
+                continue
+            self._connection, self._channel = connection, channel
+            return
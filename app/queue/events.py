@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
+
+import aio_pika
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+from aio_pika.exceptions import AMQPError
+from pika.adapters.blocking_connection import BlockingChannel
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[List[Dict]], None]
+
+
+def status_event(id, owner: Optional[str], status: str, reason: Optional[str] = None) -> Dict:
+    return {"id": str(id), "owner": owner, "status": status, "rejection_reason": reason}
+
+
+def encode_events(events: Iterable[Dict]) -> bytes:
+    return json.dumps(list(events)).encode()
+
+
+def decode_events(body: bytes) -> List[Dict]:
+    events = json.loads(body)
+    return events if isinstance(events, list) else []
+
+
+def declare_events_exchange(ch: BlockingChannel, exchange: str) -> None:
+    ch.exchange_declare(exchange=exchange, exchange_type="fanout", durable=True)
+
+
+def publish_events(ch: BlockingChannel, exchange: str, events: List[Dict]) -> None:
+    """
+    Best effort: a lost event only leaves API caches stale until their
+    TTL, so the worker logs a failed publish and carries on.
+    """
+    if events:
+        ch.basic_publish(exchange=exchange, routing_key="", body=encode_events(events))
+
+
+class EnrollmentEventsListener:
+    """
+    The API process's one consumer of the worker's status-change events.
+
+    Binds an exclusive, server-named queue to the fanout exchange, so
+    every API process gets every event, and hands each decoded batch to
+    the registered handlers on the event loop. Connects in the background
+    and, like AsyncPublisher, leaves reconnection to the robust
+    connection.
+    """
+    def __init__(self, url: str, exchange: str, reconnect_delay: float = 2.0):
+        self._url = url
+        self._exchange = exchange
+        self._reconnect_delay = reconnect_delay
+        self._handlers: List[EventHandler] = []
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._connect_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, handler: EventHandler) -> None:
+        self._handlers.append(handler)
+
+    def dispatch(self, events: List[Dict]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(events)
+            except Exception:
+                logger.exception("Enrollment event handler failed")
+
+    def start(self) -> None:
+        if self._connect_task is None:
+            self._connect_task = asyncio.create_task(self._connect())
+
+    async def close(self) -> None:
+        if self._connect_task is not None:
+            self._connect_task.cancel()
+            try:
+                await self._connect_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._connect_task = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _on_message(self, message: AbstractIncomingMessage) -> None:
+        try:
+            events = decode_events(message.body)
+        except ValueError:
+            logger.warning(f"Ignoring malformed enrollment event {message.body!r}")
+            return
+        self.dispatch(events)
+
+    async def _connect(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await aio_pika.connect_robust(
+                    self._url, reconnect_interval=self._reconnect_delay
+                )
+                channel = await connection.channel()
+                exchange = await channel.declare_exchange(
+                    self._exchange, aio_pika.ExchangeType.FANOUT, durable=True
+                )
+                queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+                await queue.bind(exchange)
+                await queue.consume(self._on_message, no_ack=True)
+            except (AMQPError, OSError) as e:
+                logger.warning(f"Could not subscribe to enrollment events, retrying: {e}")
+                if connection is not None:
+                    await connection.close()
+                await asyncio.sleep(self._reconnect_delay)
+                continue
+            self._connection = connection
+            return
@@ -0,0 +1,108 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+from app.config.settings import Settings
+from app.queue.publisher import ConfirmingPublisher
+from app.repositories.enrollment_repo import EnrollmentRepository
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Publishes enrollments written in outbox mode.
+
+    A daemon thread polls for documents flagged `outbox_pending`, publishes
+    their ids in one confirmed batch and clears the flag of those the
+    broker acked. Anything not confirmed stays flagged and is retried on
+    the next pass, so delivery is at-least-once; the worker skips
+    enrollments that are no longer pending.
+
+    The publisher is looked up through `get_publisher` on every pass, so
+    the relay follows a publisher replaced after a settings reload.
+    Subscribed to the settings store, it starts when OUTBOX_ENABLED is
+    turned on and, once turned off, stops after relaying what is still
+    flagged.
+    """
+    def __init__(
+        self,
+        repo: EnrollmentRepository,
+        get_publisher: Callable[[], ConfirmingPublisher],
+        batch_size: int = 500,
+        poll_interval: float = 0.2,
+    ):
+        self._repo = repo
+        self._get_publisher = get_publisher
+        self._batch_size = max(batch_size, 1)
+        self._poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._finishing = False
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def relay_once(self) -> int:
+        """Publishes one batch; returns how many entries were marked sent."""
+        publisher = self._get_publisher()
+        if not publisher.is_ready:
+            return 0
+        ids = self._repo.pending_outbox(self._batch_size)
+        if not ids:
+            return 0
+        errors = publisher.publish_many(
+            (str(oid).encode("utf-8") for oid in ids), batch_size=len(ids)
+        )
+        sent = [oid for oid, error in zip(ids, errors) if error is None]
+        if len(sent) < len(ids):
+            logger.warning(f"Outbox: {len(ids) - len(sent)} of {len(ids)} not confirmed; will retry")
+        return self._repo.mark_outbox_sent(sent) if sent else 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._lock:
+            self._finishing = False
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+            self._thread.start()
+
+    def finish(self) -> None:
+        """Lets the thread exit once nothing is left flagged; does not wait for it."""
+        with self._lock:
+            self._finishing = True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def on_settings_changed(self, old: Settings, new: Settings) -> None:
+        if new.outbox_enabled and not old.outbox_enabled:
+            self.start()
+        elif old.outbox_enabled and not new.outbox_enabled:
+            self.finish()
+
+    def _finished(self) -> bool:
+        with self._lock:
+            if not self._finishing or self._repo.pending_outbox(1):
+                return False
+            self._thread = None
+            return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                relayed = self.relay_once()
+                if self._finished():
+                    return
+            except Exception:
+                logger.exception("Outbox relay pass failed")
+                relayed = 0
+            # A full batch means there is probably more waiting.
+            if relayed < self._batch_size and self._stop.wait(self._poll_interval):
+                return
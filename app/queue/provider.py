@@ -1,10 +1,25 @@
+import threading
+
 import pika
 from pika.adapters.blocking_connection import BlockingConnection, BlockingChannel
-from app.config.settings import get_settings
+from app.config.settings import Settings, get_settings, settings_changed, settings_store
+from app.queue.arguments import queue_arguments
+from app.queue.publisher import ConfirmingPublisher
+
+
+PUBLISHER_SETTINGS = (
+    "rabbit_uri",
+    "rabbit_queue_name",
+    "rabbit_reconnect_delay_seconds",
+    "rabbit_confirm_timeout_seconds",
+    "rabbit_confirm_batch_size",
+)
+
 
 class RabbitMQProvider:
     _conn: BlockingConnection | None = None
     _ch: BlockingChannel | None = None
+    _publisher: ConfirmingPublisher | None = None
 
     @classmethod
     def get_channel(cls) -> BlockingChannel:
@@ -12,8 +27,8 @@ class RabbitMQProvider:
         Returns a single shared channel, declaring the queue with:
          - durable=True
          - x-dead-letter-exchange: ''  (the default exchange)
-         - x-dead-letter-routing-key: <same queue name>
-         - x-message-ttl: 300000      (retry every 5 minutes)
+         - x-dead-letter-routing-key: <queue name>.parked
+        The worker declares the retry queues itself (app.queue.retry).
         """
         settings = get_settings()
 
@@ -22,24 +37,58 @@ class RabbitMQProvider:
             cls._conn = pika.BlockingConnection(params)
             ch: BlockingChannel = cls._conn.channel()
 
-            args = {
-                "x-dead-letter-exchange": "",
-                "x-dead-letter-routing-key": settings.rabbit_queue_name,
-                "x-message-ttl": 300_000,
-            }
             ch.queue_declare(
                 queue=settings.rabbit_queue_name,
                 durable=True,
-                arguments=args,
+                arguments=queue_arguments(settings.rabbit_queue_name),
             )
 
             cls._ch = ch
 
         return cls._ch
 
+    @classmethod
+    def get_publisher(cls) -> ConfirmingPublisher:
+        """
+        Returns the process-wide publisher, starting its I/O thread on
+        first use. Safe to call and publish from any thread.
+        """
+        if cls._publisher is None:
+            settings = get_settings()
+            cls._publisher = ConfirmingPublisher(
+                url=settings.rabbit_uri,
+                queue_name=settings.rabbit_queue_name,
+                reconnect_delay=settings.rabbit_reconnect_delay_seconds,
+                confirm_timeout=settings.rabbit_confirm_timeout_seconds,
+                confirm_batch_size=settings.rabbit_confirm_batch_size,
+            )
+            cls._publisher.start()
+        return cls._publisher
+
+    @classmethod
+    def on_settings_changed(cls, old: Settings, new: Settings) -> None:
+        """
+        Drops the publisher so the next get_publisher() call connects with
+        the new settings. Listeners run on whichever thread noticed the
+        reload, possibly the event loop, so the old publisher's close(),
+        which joins its I/O thread, runs on a thread of its own. The
+        blocking channel is left alone: it belongs to the worker's
+        consumer thread, which reads its settings once at startup.
+        """
+        if cls._publisher is None or not settings_changed(old, new, *PUBLISHER_SETTINGS):
+            return
+        publisher, cls._publisher = cls._publisher, None
+        threading.Thread(target=publisher.close, name="publisher-close", daemon=True).start()
+
     @classmethod
     def close(cls) -> None:
+        if cls._publisher:
+            cls._publisher.close()
+            cls._publisher = None
         if cls._conn:
             cls._conn.close()
             cls._conn = None
             cls._ch = None
+
+
+settings_store.subscribe(RabbitMQProvider.on_settings_changed)
@@ -0,0 +1,279 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import partial
+from typing import Iterable, List, Optional
+
+import pika
+from pika.spec import Basic
+
+from app.queue.arguments import queue_arguments
+
+logger = logging.getLogger(__name__)
+
+PERSISTENT = pika.BasicProperties(delivery_mode=2)
+
+
+class PublisherError(Exception):
+    """Base class for messages the broker did not take."""
+
+
+class PublisherUnavailable(PublisherError):
+    """The publisher has no open channel to the broker right now."""
+
+
+class PublishNacked(PublisherError):
+    """The broker refused the message (basic.nack)."""
+
+
+class ConfirmTracker:
+    """
+    Futures of published messages keyed by delivery tag, resolved as the
+    broker acks or nacks them. A confirm with `multiple` settles every
+    outstanding tag up to and including its own, so one frame can release
+    many waiters. Only touched from the publisher's I/O thread.
+    """
+    def __init__(self):
+        self._pending: "OrderedDict[int, Future]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, tag: int, future: Future) -> None:
+        self._pending[tag] = future
+
+    def settle(self, tag: int, multiple: bool, error: Optional[Exception] = None) -> None:
+        if multiple:
+            tags = [t for t in self._pending if t <= tag]
+        else:
+            tags = [tag] if tag in self._pending else []
+        for t in tags:
+            _resolve(self._pending.pop(t), error)
+
+    def fail_all(self, error: Exception) -> None:
+        pending, self._pending = self._pending, OrderedDict()
+        for future in pending.values():
+            _resolve(future, error)
+
+
+def _resolve(future: Future, error: Optional[Exception]) -> None:
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+def wait_confirm(future: Future, timeout: Optional[float]) -> Optional[Exception]:
+    """
+    Waits for one publish to be confirmed. Returns None on ack, otherwise
+    the reason it was not (PublisherError or a timeout).
+    """
+    try:
+        future.result(timeout=timeout)
+    except FutureTimeoutError:
+        return PublisherError("Timed out waiting for the broker to confirm")
+    except PublisherError as e:
+        return e
+    return None
+
+
+class ConfirmingPublisher:
+    """
+    Publishes to the work queue from any thread.
+
+    A single I/O thread owns a pika SelectConnection and its channel, which
+    runs in confirm mode; callers hand messages over with
+    add_callback_threadsafe and get back a Future that settles when the
+    broker confirms the message. No caller ever touches the channel, so
+    there is nothing to lock, and a lost connection is re-established on
+    the I/O thread while publishes fail fast with PublisherUnavailable.
+    """
+    def __init__(
+        self,
+        url: str,
+        queue_name: str,
+        reconnect_delay: float = 2.0,
+        confirm_timeout: float = 5.0,
+        confirm_batch_size: int = 100,
+    ):
+        self._parameters = pika.URLParameters(url)
+        self._queue_name = queue_name
+        self._reconnect_delay = reconnect_delay
+        self._confirm_timeout = confirm_timeout
+        self._confirm_batch_size = max(confirm_batch_size, 1)
+
+        self._connection: Optional[pika.SelectConnection] = None
+        self._channel = None
+        self._delivery_tag = 0
+        self._confirms = ConfirmTracker()
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="rabbitmq-publisher", daemon=True
+        )
+        self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._ready.clear()
+        connection = self._connection
+        if connection is not None:
+            try:
+                connection.ioloop.add_callback_threadsafe(self._shutdown)
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def publish(
+        self,
+        body: bytes,
+        routing_key: Optional[str] = None,
+        properties: pika.BasicProperties = PERSISTENT,
+    ) -> Future:
+        """
+        Queues `body` for publishing (to the work queue unless
+        `routing_key` says otherwise) and returns a Future that resolves
+        once the broker confirms it, or fails with a PublisherError.
+        """
+        future: Future = Future()
+        connection = self._connection
+        if not self._ready.is_set() or connection is None:
+            future.set_exception(PublisherUnavailable("Not connected to RabbitMQ"))
+            return future
+        try:
+            connection.ioloop.add_callback_threadsafe(
+                partial(self._publish, future, routing_key or self._queue_name, body, properties)
+            )
+        except Exception:
+            future.set_exception(PublisherUnavailable("Not connected to RabbitMQ"))
+        return future
+
+    def publish_many(
+        self,
+        bodies: Iterable[bytes],
+        routing_key: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ) -> List[Optional[Exception]]:
+        """
+        Publishes every body and returns, per body, None when it was
+        confirmed or the error it failed with. Up to `batch_size` messages
+        (default: the configured confirm batch size) are in flight before
+        the caller waits for their confirms.
+        """
+        batch_size = max(batch_size or self._confirm_batch_size, 1)
+        bodies = list(bodies)
+        errors: List[Optional[Exception]] = []
+        for start in range(0, len(bodies), batch_size):
+            futures = [
+                self.publish(body, routing_key) for body in bodies[start:start + batch_size]
+            ]
+            errors.extend(wait_confirm(f, self._confirm_timeout) for f in futures)
+        return errors
+
+    def publish_and_wait(self, body: bytes, routing_key: Optional[str] = None) -> Optional[Exception]:
+        return wait_confirm(self.publish(body, routing_key), self._confirm_timeout)
+
+    # Everything below runs on the I/O thread.
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._connection = pika.SelectConnection(
+                parameters=self._parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_open_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+            self._connection.ioloop.close()
+            if self._stopping.wait(self._reconnect_delay):
+                break
+        self._connection = None
+
+    def _shutdown(self) -> None:
+        self._confirms.fail_all(PublisherUnavailable("Publisher is shutting down"))
+        connection = self._connection
+        if connection is not None and not (connection.is_closing or connection.is_closed):
+            connection.close()
+        elif connection is not None:
+            connection.ioloop.stop()
+
+    def _on_connection_open(self, connection) -> None:
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_open_error(self, connection, error) -> None:
+        logger.warning(f"Could not connect to RabbitMQ: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason) -> None:
+        self._ready.clear()
+        self._channel = None
+        self._confirms.fail_all(PublisherUnavailable("RabbitMQ connection closed"))
+        if not self._stopping.is_set():
+            logger.warning(f"RabbitMQ connection closed, reconnecting: {reason}")
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel) -> None:
+        self._channel = channel
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.queue_declare(
+            queue=self._queue_name,
+            durable=True,
+            arguments=queue_arguments(self._queue_name),
+            callback=self._on_queue_declared,
+        )
+
+    def _on_queue_declared(self, frame) -> None:
+        self._channel.confirm_delivery(
+            ack_nack_callback=self._on_confirm, callback=self._on_confirm_mode
+        )
+
+    def _on_confirm_mode(self, frame) -> None:
+        self._delivery_tag = 0
+        self._ready.set()
+
+    def _on_channel_closed(self, channel, reason) -> None:
+        # A closed channel leaves the connection unusable for us; closing
+        # it lands in _on_connection_closed, which fails pending confirms
+        # and reconnects.
+        self._ready.clear()
+        self._channel = None
+        connection = self._connection
+        if connection is not None and not (connection.is_closing or connection.is_closed):
+            connection.close()
+
+    def _publish(self, future: Future, routing_key: str, body: bytes, properties) -> None:
+        channel = self._channel
+        if channel is None or not channel.is_open:
+            _resolve(future, PublisherUnavailable("Not connected to RabbitMQ"))
+            return
+        self._delivery_tag += 1
+        self._confirms.add(self._delivery_tag, future)
+        channel.basic_publish(
+            exchange="",
+            routing_key=routing_key,
+            body=body,
+            properties=properties,
+        )
+
+    def _on_confirm(self, frame) -> None:
+        method = frame.method
+        error = PublishNacked("RabbitMQ refused the message") if isinstance(method, Basic.Nack) else None
+        self._confirms.settle(method.delivery_tag, method.multiple, error)
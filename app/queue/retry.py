@@ -0,0 +1,65 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pika.adapters.blocking_connection import BlockingChannel
+
+from app.queue.arguments import parked_queue_name, queue_arguments
+
+ATTEMPT_HEADER = "x-attempt"
+ERROR_HEADER = "x-last-error"
+
+
+def attempt_of(headers: Optional[Dict]) -> int:
+    """How many times this message has been delivered, this one included."""
+    try:
+        return max(1, int((headers or {}).get(ATTEMPT_HEADER, 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+class RetryTopology:
+    """
+    The work queue, one delay queue per entry of `delays` and a parking
+    lot. A failed message is republished to the delay queue for its
+    attempt, with the attempt count in its headers; the delay queue has
+    no consumers, and once the message's TTL runs out RabbitMQ
+    dead-letters it back onto the work queue. After the last delay the
+    message goes to the parking lot until it is replayed by hand
+    (processor/replay_parked.py).
+
+    Messages only wait in the delay queues, so the work queue holds fresh
+    work and retries that are due, and healthy messages are never
+    recycled.
+    """
+    def __init__(self, queue_name: str, delays: Sequence[int]):
+        self.queue_name = queue_name
+        self.delays = tuple(delays)
+        self.parked = parked_queue_name(queue_name)
+
+    def delay_queue(self, delay: int) -> str:
+        return f"{self.queue_name}.retry.{delay}s"
+
+    def declarations(self) -> List[Tuple[str, Dict]]:
+        """(name, arguments) of every queue, the work queue first."""
+        queues = [(self.queue_name, queue_arguments(self.queue_name)), (self.parked, {})]
+        for delay in self.delays:
+            queues.append((self.delay_queue(delay), {
+                "x-message-ttl": delay * 1000,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": self.queue_name,
+            }))
+        return queues
+
+    def declare(self, ch: BlockingChannel) -> None:
+        for name, arguments in self.declarations():
+            ch.queue_declare(queue=name, durable=True, arguments=arguments)
+
+    def route_failure(self, headers: Optional[Dict], error: str) -> Tuple[str, Dict]:
+        """
+        The queue a message that failed on this delivery goes to, and the
+        headers to republish it with.
+        """
+        attempt = attempt_of(headers)
+        headers = {**(headers or {}), ATTEMPT_HEADER: attempt + 1, ERROR_HEADER: error[:200]}
+        if attempt > len(self.delays):
+            return self.parked, headers
+        return self.delay_queue(self.delays[attempt - 1]), headers
@@ -0,0 +1,46 @@
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+from pymongo.asynchronous.database import AsyncDatabase
+
+from app.repositories.cpf_state_repo import COLLECTION, Transition, state_key, transition_ops
+from app.schemas.cpf_state_schema import CpfState
+
+
+class AsyncCpfStateRepository:
+    """CpfStateRepository's reads and transitions on the async driver."""
+    def __init__(self, db: AsyncDatabase):
+        self.db = db
+        self.collection = db[COLLECTION]
+
+    async def get(self, cpf: str, owner: Optional[str] = None) -> CpfState:
+        doc = await self.collection.find_one({"_id": state_key(cpf, owner)})
+        return CpfState.from_document(doc, cpf, owner)
+
+    async def get_many(
+        self, cpfs: Iterable[str], owner: Optional[str] = None
+    ) -> Dict[str, CpfState]:
+        cpfs = list(set(cpfs))
+        cursor = self.collection.find(
+            {"_id": {"$in": [state_key(cpf, owner) for cpf in cpfs]}}
+        )
+        docs = {d["_id"]: d async for d in cursor}
+        return {
+            cpf: CpfState.from_document(docs.get(state_key(cpf, owner)), cpf, owner)
+            for cpf in cpfs
+        }
+
+    async def record(
+        self,
+        cpf: str,
+        owner: Optional[str],
+        enrollment_id: ObjectId,
+        old_status: Optional[str],
+        new_status: Optional[str],
+    ) -> None:
+        await self.record_many([(cpf, owner, enrollment_id, old_status, new_status)])
+
+    async def record_many(self, transitions: Iterable[Transition]) -> None:
+        ops = [op for t in transitions for op in transition_ops(*t)]
+        if ops:
+            await self.collection.bulk_write(ops, ordered=True)
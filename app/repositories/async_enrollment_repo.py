@@ -0,0 +1,125 @@
+from typing import AsyncIterator, List, Optional, Tuple
+
+from bson import ObjectId, errors as bson_errors
+from pymongo import ASCENDING
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.errors import BulkWriteError
+
+from app.metrics import MONGO_OPERATION_SECONDS, timed_method
+from app.repositories.async_cpf_state_repo import AsyncCpfStateRepository
+from app.repositories.enrollment_repo import (
+    STATE_FIELDS,
+    duplicate_key_indexes,
+    enrollment_document,
+)
+from app.schemas.enrollment_schema import EnrollmentCreate, EnrollmentRead
+
+
+class AsyncEnrollmentRepository:
+    """
+    The request-path half of EnrollmentRepository on the async driver
+    (pymongo's AsyncMongoClient, or AsyncMockClient in tests).
+    """
+    def __init__(self, db: AsyncDatabase):
+        self.collection = db["enrollments"]
+        self.cpf_state = AsyncCpfStateRepository(db)
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    async def create(self, payload: EnrollmentCreate, owner: str, outbox: bool = False) -> EnrollmentRead:
+        data = enrollment_document(payload, owner, outbox)
+        result = await self.collection.insert_one(data)
+        await self.cpf_state.record(data["cpf"], owner, result.inserted_id, None, data["status"])
+        return EnrollmentRead.from_document({**data, "_id": result.inserted_id})
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    async def create_many(
+        self, payloads: List[EnrollmentCreate], owner: str, outbox: bool = False
+    ) -> List[Optional[EnrollmentRead]]:
+        docs = [enrollment_document(p, owner, outbox) for p in payloads]
+        duplicates = set()
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            duplicates = duplicate_key_indexes(e)
+
+        created = [d for i, d in enumerate(docs) if i not in duplicates]
+        await self.cpf_state.record_many(
+            (d["cpf"], owner, d["_id"], None, d["status"]) for d in created
+        )
+        return [
+            None if i in duplicates else EnrollmentRead.from_document(d)
+            for i, d in enumerate(docs)
+        ]
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    async def list(self, owner: str) -> List[EnrollmentRead]:
+        return [
+            EnrollmentRead.from_document(d)
+            async for d in self.collection.find({"owner": owner})
+        ]
+
+    async def list_page(
+        self,
+        owner: str,
+        limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[EnrollmentRead], Optional[ObjectId]]:
+        docs, next_after = await self.list_page_documents(owner, limit, after)
+        return [EnrollmentRead.from_document(d) for d in docs], next_after
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    async def list_page_documents(
+        self,
+        owner: str,
+        limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[dict], Optional[ObjectId]]:
+        """list_page, returning the raw documents."""
+        query = {"owner": owner}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        docs = await (
+            self.collection.find(query).sort("_id", ASCENDING).limit(limit + 1).to_list()
+        )
+        next_after = docs[limit - 1]["_id"] if len(docs) > limit else None
+        return docs[:limit], next_after
+
+    async def iter_documents(self, owner: str, batch_size: int) -> AsyncIterator[dict]:
+        cursor = (
+            self.collection.find({"owner": owner})
+            .sort("_id", ASCENDING)
+            .batch_size(batch_size)
+        )
+        try:
+            async for doc in cursor:
+                yield doc
+        finally:
+            await cursor.close()
+
+    async def get(self, id: str, owner: str) -> Optional[EnrollmentRead]:
+        doc = await self.get_document(id, owner)
+        return doc and EnrollmentRead.from_document(doc)
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    async def get_document(self, id: str, owner: str) -> Optional[dict]:
+        try:
+            oid = ObjectId(id)
+        except (bson_errors.InvalidId, TypeError):
+            return None
+        return await self.collection.find_one({"_id": oid, "owner": owner})
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    async def delete(self, id: str, owner: str) -> bool:
+        try:
+            oid = ObjectId(id)
+        except (bson_errors.InvalidId, TypeError):
+            return False
+        before = await self.collection.find_one_and_delete(
+            {"_id": oid, "owner": owner}, projection=STATE_FIELDS
+        )
+        if before is None:
+            return False
+        await self.cpf_state.record(
+            before.get("cpf"), before.get("owner"), oid, before.get("status"), None
+        )
+        return True
@@ -0,0 +1,163 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateMany
+from pymongo.database import Database
+
+from app.enums.enrollment_status import EnrollmentStatus
+from app.schemas.cpf_state_schema import CpfState
+
+COLLECTION = "cpf_state"
+
+COUNTED_STATUSES = [s.value for s in EnrollmentStatus]
+ACTIVE_STATUSES = [EnrollmentStatus.pending.value, EnrollmentStatus.approved.value]
+
+# (cpf, owner, enrollment_id, old_status, new_status); None for old_status
+# means the enrollment was created, None for new_status that it was deleted.
+Transition = Tuple[str, Optional[str], ObjectId, Optional[str], Optional[str]]
+
+
+def state_key(cpf: str, owner: Optional[str] = None) -> str:
+    """
+    `_id` of a state document: the CPF alone for the counters across all
+    owners, "<cpf>:<owner>" for the counters of one owner.
+    """
+    return cpf if owner is None else f"{cpf}:{owner}"
+
+
+def transition_ops(
+    cpf: str,
+    owner: Optional[str],
+    enrollment_id: ObjectId,
+    old_status: Optional[str],
+    new_status: Optional[str],
+) -> List[UpdateMany]:
+    """
+    Write operations that move one enrollment between counters, for both
+    the all-owners and the per-owner state documents. Run them ordered:
+    the active-id reset must follow the $inc/$set of the same document.
+    """
+    inc: Dict[str, int] = {}
+    if old_status:
+        inc[old_status] = inc.get(old_status, 0) - 1
+    if new_status:
+        inc[new_status] = inc.get(new_status, 0) + 1
+    inc = {status: n for status, n in inc.items() if n}
+
+    keys = [(state_key(cpf), None)]
+    if owner is not None:
+        keys.append((state_key(cpf, owner), owner))
+
+    # UpdateMany on an _id filter touches one document, like UpdateOne,
+    # but is also accepted by mongomock's bulk_write in tests.
+    ops = []
+    for key, key_owner in keys:
+        update: Dict = {"$setOnInsert": {"cpf": cpf, "owner": key_owner}}
+        if inc:
+            update["$inc"] = inc
+        if new_status in ACTIVE_STATUSES:
+            update["$set"] = {"active_enrollment_id": enrollment_id}
+        ops.append(UpdateMany({"_id": key}, update, upsert=True))
+        if old_status in ACTIVE_STATUSES and new_status not in ACTIVE_STATUSES:
+            ops.append(UpdateMany(
+                {"_id": key, "active_enrollment_id": enrollment_id},
+                {"$set": {"active_enrollment_id": None}},
+            ))
+    return ops
+
+
+class CpfStateRepository:
+    """
+    Per-CPF counters of enrollments by status, maintained on every status
+    transition so the business rules are a keyed lookup instead of a
+    count over the CPF's whole enrollment history.
+    """
+    def __init__(self, db: Database):
+        self.db = db
+        self.collection = db[COLLECTION]
+
+    def get(self, cpf: str, owner: Optional[str] = None) -> CpfState:
+        doc = self.collection.find_one({"_id": state_key(cpf, owner)})
+        return CpfState.from_document(doc, cpf, owner)
+
+    def get_many(self, cpfs: Iterable[str], owner: Optional[str] = None) -> Dict[str, CpfState]:
+        cpfs = list(set(cpfs))
+        docs = {
+            d["_id"]: d for d in self.collection.find(
+                {"_id": {"$in": [state_key(cpf, owner) for cpf in cpfs]}}
+            )
+        }
+        return {
+            cpf: CpfState.from_document(docs.get(state_key(cpf, owner)), cpf, owner)
+            for cpf in cpfs
+        }
+
+    def record(
+        self,
+        cpf: str,
+        owner: Optional[str],
+        enrollment_id: ObjectId,
+        old_status: Optional[str],
+        new_status: Optional[str],
+    ) -> None:
+        self.record_many([(cpf, owner, enrollment_id, old_status, new_status)])
+
+    def record_many(self, transitions: Iterable[Transition]) -> None:
+        ops = [op for t in transitions for op in transition_ops(*t)]
+        if ops:
+            self.collection.bulk_write(ops, ordered=True)
+
+    def rebuild(self, batch_size: int = 1000) -> int:
+        """
+        Recomputes every state document from the enrollments collection
+        into a scratch collection and swaps it in with a rename, so
+        readers never see a half-built state. Returns the number of
+        state documents written.
+        """
+        enrollments = self.db["enrollments"]
+        states: Dict[str, Dict] = {}
+
+        def state(cpf: str, owner: Optional[str]) -> Dict:
+            key = state_key(cpf, owner)
+            if key not in states:
+                states[key] = {
+                    "_id": key,
+                    "cpf": cpf,
+                    "owner": owner,
+                    **{status: 0 for status in COUNTED_STATUSES},
+                    "active_enrollment_id": None,
+                }
+            return states[key]
+
+        pipeline = [{"$group": {
+            "_id": {"cpf": "$cpf", "owner": "$owner", "status": "$status"},
+            "count": {"$sum": 1},
+            "last_id": {"$max": "$_id"},
+        }}]
+        for row in enrollments.aggregate(pipeline):
+            cpf, owner, status = (
+                row["_id"]["cpf"], row["_id"].get("owner"), row["_id"]["status"]
+            )
+            if cpf is None or status not in COUNTED_STATUSES:
+                continue
+            scopes = [state(cpf, None)]
+            if owner is not None:
+                scopes.append(state(cpf, owner))
+            for doc in scopes:
+                doc[status] += row["count"]
+                if status in ACTIVE_STATUSES and (
+                    doc["active_enrollment_id"] is None
+                    or row["last_id"] > doc["active_enrollment_id"]
+                ):
+                    doc["active_enrollment_id"] = row["last_id"]
+
+        scratch = self.db[f"{COLLECTION}_rebuild"]
+        scratch.drop()
+        docs = list(states.values())
+        for start in range(0, len(docs), batch_size):
+            scratch.insert_many(docs[start:start + batch_size])
+        if docs:
+            scratch.rename(COLLECTION, dropTarget=True)
+        else:
+            self.collection.drop()
+        return len(docs)
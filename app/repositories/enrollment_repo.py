@@ -1,37 +1,155 @@
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Iterator, List, Optional, Set, Tuple
 from bson import ObjectId, errors as bson_errors
+from pymongo import ASCENDING, ReturnDocument
 from pymongo.database import Database
+from pymongo.errors import BulkWriteError
 
 from app.enums.enrollment_status import EnrollmentStatus
+from app.metrics import MONGO_OPERATION_SECONDS, timed_method
+from app.repositories.cpf_state_repo import CpfStateRepository
 from app.schemas.enrollment_schema import EnrollmentRead, EnrollmentCreate
 from app.utils.validators import normalize_cpf
 
+STATE_FIELDS = {"cpf": 1, "owner": 1, "status": 1}
+_DUPLICATE_KEY = 11000
+
+
+def enrollment_document(payload: EnrollmentCreate, owner: str, outbox: bool = False) -> dict:
+    """The document a new enrollment is inserted as."""
+    data = payload.model_dump()
+    data["cpf"] = normalize_cpf(data["cpf"])
+    data["owner"] = owner
+    data["status"] = EnrollmentStatus.pending.value
+    data["rejection_reason"] = None
+    data["created_at"] = datetime.now(timezone.utc)
+    data["processed_at"] = None
+    if outbox:
+        # The outbox entry lives on the document itself, so it is
+        # written atomically with the enrollment.
+        data["outbox_pending"] = True
+    return data
+
+
+def duplicate_key_indexes(error: BulkWriteError) -> Set[int]:
+    """
+    Positions rejected by a unique index in an unordered insert_many;
+    re-raises if any other write failed.
+    """
+    indexes = set()
+    for err in error.details["writeErrors"]:
+        if err["code"] != _DUPLICATE_KEY:
+            raise error
+        indexes.add(err["index"])
+    return indexes
+
 
 class EnrollmentRepository:
     def __init__(self, db: Database):
         self.collection = db["enrollments"]
+        self.cpf_state = CpfStateRepository(db)
+
+    def _record_change(self, before: Optional[dict], oid: ObjectId, new_status: Optional[str]) -> None:
+        if before and before.get("status") != new_status:
+            self.cpf_state.record(
+                before.get("cpf"), before.get("owner"), oid, before.get("status"), new_status
+            )
 
     def _doc_to_model(self, doc) -> EnrollmentRead:
         return EnrollmentRead.from_document(doc)
 
-    def create(self, payload: EnrollmentCreate, owner: str) -> EnrollmentRead:
-        data = payload.model_dump()
-        data["cpf"] = normalize_cpf(data["cpf"])
-        data["owner"] = owner
-        data["status"] = EnrollmentStatus.pending.value
-        data["rejection_reason"] = None
-        data["created_at"] = datetime.now(timezone.utc)
-        data["processed_at"] = None
-
+    @timed_method(MONGO_OPERATION_SECONDS)
+    def create(self, payload: EnrollmentCreate, owner: str, outbox: bool = False) -> EnrollmentRead:
+        data = enrollment_document(payload, owner, outbox)
         result = self.collection.insert_one(data)
+        self.cpf_state.record(data["cpf"], owner, result.inserted_id, None, data["status"])
         doc = {**data, "_id": result.inserted_id}
         return self._doc_to_model(doc)
 
+    @timed_method(MONGO_OPERATION_SECONDS)
+    def create_many(
+        self, payloads: List[EnrollmentCreate], owner: str, outbox: bool = False
+    ) -> List[Optional[EnrollmentRead]]:
+        """
+        Inserts with one unordered insert_many. Items rejected by the
+        unique index come back as None; any other write error is raised.
+        """
+        docs = [enrollment_document(p, owner, outbox) for p in payloads]
+        duplicates = set()
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            duplicates = duplicate_key_indexes(e)
+
+        created = [d for i, d in enumerate(docs) if i not in duplicates]
+        self.cpf_state.record_many(
+            (d["cpf"], owner, d["_id"], None, d["status"]) for d in created
+        )
+        return [
+            None if i in duplicates else self._doc_to_model(d)
+            for i, d in enumerate(docs)
+        ]
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    def pending_outbox(self, limit: int) -> List[ObjectId]:
+        """Ids of enrollments not yet published, oldest first."""
+        docs = (
+            self.collection.find({"outbox_pending": True}, {"_id": 1})
+            .sort("_id", ASCENDING)
+            .limit(limit)
+        )
+        return [d["_id"] for d in docs]
+
+    @timed_method(MONGO_OPERATION_SECONDS)
+    def mark_outbox_sent(self, ids: List[ObjectId]) -> int:
+        result = self.collection.update_many(
+            {"_id": {"$in": ids}, "outbox_pending": True},
+            {"$unset": {"outbox_pending": ""}},
+        )
+        return result.modified_count
+
+    @timed_method(MONGO_OPERATION_SECONDS)
     def list(self, owner: str) -> List[EnrollmentRead]:
         docs = self.collection.find({"owner": owner})
         return [self._doc_to_model(d) for d in docs]
 
+    @timed_method(MONGO_OPERATION_SECONDS)
+    def list_page(
+        self,
+        owner: str,
+        limit: int,
+        after: Optional[ObjectId] = None,
+    ) -> Tuple[List[EnrollmentRead], Optional[ObjectId]]:
+        """
+        Keyset page of the owner's enrollments in _id order, served by the
+        (owner, _id) index. Returns the page and the _id to continue after,
+        or None when this is the last page.
+        """
+        query = {"owner": owner}
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        docs = list(
+            self.collection.find(query).sort("_id", ASCENDING).limit(limit + 1)
+        )
+        next_after = docs[limit - 1]["_id"] if len(docs) > limit else None
+        return [self._doc_to_model(d) for d in docs[:limit]], next_after
+
+    def iter_documents(self, owner: str, batch_size: int) -> Iterator[dict]:
+        """
+        Streams the owner's raw documents in _id order, fetching
+        `batch_size` documents per round trip.
+        """
+        cursor = (
+            self.collection.find({"owner": owner})
+            .sort("_id", ASCENDING)
+            .batch_size(batch_size)
+        )
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    @timed_method(MONGO_OPERATION_SECONDS)
     def get(self, id: str, owner: str) -> Optional[EnrollmentRead]:
         try:
             oid = ObjectId(id)
@@ -40,46 +158,46 @@ class EnrollmentRepository:
         doc = self.collection.find_one({"_id": oid, "owner": owner})
         return doc and self._doc_to_model(doc)
 
+    @timed_method(MONGO_OPERATION_SECONDS)
     def delete(self, id: str, owner: str) -> bool:
         try:
             oid = ObjectId(id)
         except (bson_errors.InvalidId, TypeError):
             return False
-        res = self.collection.delete_one({"_id": oid, "owner": owner})
-        return res.deleted_count > 0
+        before = self.collection.find_one_and_delete(
+            {"_id": oid, "owner": owner}, projection=STATE_FIELDS
+        )
+        self._record_change(before, oid, None)
+        return before is not None
 
+    @timed_method(MONGO_OPERATION_SECONDS)
     def update_status(self, id: str, new_status: EnrollmentStatus) -> bool:
         try:
             oid = ObjectId(id)
         except (bson_errors.InvalidId, TypeError):
             return False
-        res = self.collection.update_one(
+        before = self.collection.find_one_and_update(
             {"_id": oid},
-            {"$set": {"status": new_status.value}}
+            {"$set": {"status": new_status.value}},
+            projection=STATE_FIELDS,
+            return_document=ReturnDocument.BEFORE,
         )
-        return res.modified_count > 0
+        self._record_change(before, oid, new_status.value)
+        return before is not None and before.get("status") != new_status.value
 
+    @timed_method(MONGO_OPERATION_SECONDS)
     def update_rejection(self, id: str, reason: str) -> None:
         try:
             oid = ObjectId(id)
         except (bson_errors.InvalidId, TypeError):
             return
-        self.collection.update_one(
+        before = self.collection.find_one_and_update(
             {"_id": oid},
             {"$set": {
                 "status": EnrollmentStatus.rejected.value,
                 "rejection_reason": reason
-            }}
+            }},
+            projection=STATE_FIELDS,
+            return_document=ReturnDocument.BEFORE,
         )
-
-    def count_by_cpf_and_status(
-        self,
-        cpf: str,
-        statuses: List[str],
-        owner: str
-    ) -> int:
-        return self.collection.count_documents({
-            "cpf": cpf,
-            "status": {"$in": statuses},
-            "owner": owner
-        })
+        self._record_change(before, oid, EnrollmentStatus.rejected.value)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.auth import token_secret, verified_credentials
+from app.config.settings import get_settings
+from app.metrics import AUTH_FAILURES
+from app.schemas.auth_schema import TokenRequest, TokenResponse
+from app.utils.tokens import issue_token
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+@router.post(
+    "/token",
+    response_model=TokenResponse,
+    responses={401: {"description": "Invalid username or password"}},
+)
+async def create_token(payload: TokenRequest):
+    """
+    Verifies the credentials once and returns a short-lived signed token
+    to send as a bearer token instead of Basic credentials.
+    """
+    if not await verified_credentials.acheck(payload.username, payload.password):
+        AUTH_FAILURES.inc("token_request")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid username or password",
+        )
+    ttl = get_settings().auth_token_ttl_seconds
+    token, _ = issue_token(payload.username, token_secret, ttl)
+    return TokenResponse(access_token=token, expires_in=ttl)
@@ -1,69 +1,191 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.auth import get_current_user
-from app.dependencies import get_enrollment_repo
-from app.repositories.enrollment_repo import EnrollmentRepository
-from app.schemas.enrollment_schema import EnrollmentCreate, EnrollmentRead
-from app.services.enrollment_service import EnrollmentService
+from app.config.settings import get_settings
+from app.dependencies import get_async_enrollment_repo
+from app.repositories.async_enrollment_repo import AsyncEnrollmentRepository
+from app.schemas.enrollment_schema import (
+    EnrollmentBulkResult,
+    EnrollmentCreate,
+    EnrollmentRead,
+)
+from app.services.async_enrollment_service import AsyncEnrollmentService
+
+# Only for the route declarations; handlers call get_settings() so that
+# a settings reload applies to them.
+settings = get_settings()
 
 router = APIRouter(
     prefix="/enrollments",
     tags=["enrollments"],
 )
 
-def get_enrollment_service(
-    repo: EnrollmentRepository = Depends(get_enrollment_repo),
-) -> EnrollmentService:
-    return EnrollmentService(repo)
+async def get_enrollment_service(
+    repo: AsyncEnrollmentRepository = Depends(get_async_enrollment_repo),
+) -> AsyncEnrollmentService:
+    return AsyncEnrollmentService(repo)
 
 @router.post(
     "/",
     response_model=EnrollmentRead,
     status_code=status.HTTP_201_CREATED
 )
-def create_enrollment(
+async def create_enrollment(
     payload: EnrollmentCreate,
     current_user: str = Depends(get_current_user),
-    service: EnrollmentService = Depends(get_enrollment_service),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
 ):
     try:
-        return service.create(payload, owner=current_user)
+        return await service.create(payload, owner=current_user)
     except ValueError as e:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+@router.post(
+    "/bulk",
+    response_model=List[EnrollmentBulkResult],
+)
+async def create_enrollments_bulk(
+    items: List[Dict[str, Any]] = Body(
+        ...,
+        max_length=settings.enrollments_bulk_max_items,
+        description="EnrollmentCreate objects; each one is validated on its own",
+    ),
+    current_user: str = Depends(get_current_user),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
+):
+    return await service.create_many(items, owner=current_user)
+
 @router.get(
     "/",
-    response_model=List[EnrollmentRead]
+    response_model=List[EnrollmentRead],
+    responses={
+        200: {
+            "headers": {
+                "X-Next-Cursor": {
+                    "description": "Cursor for the next page; absent on the last page",
+                    "schema": {"type": "string"},
+                },
+            },
+        },
+    },
+)
+async def list_enrollments(
+    limit: int = Query(
+        settings.enrollments_page_size_default,
+        ge=1,
+        description=f"Page size, capped at {settings.enrollments_page_size_max}",
+    ),
+    cursor: str | None = Query(
+        None, description="Value of X-Next-Cursor from the previous page"
+    ),
+    current_user: str = Depends(get_current_user),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
+):
+    limit = min(limit, get_settings().enrollments_page_size_max)
+    try:
+        body, next_cursor = await service.list_page_json(current_user, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    # The body is already EnrollmentRead JSON; returning a Response skips
+    # FastAPI's response_model validation, which is kept for OpenAPI.
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One EnrollmentRead JSON object per line",
+            "content": {"application/x-ndjson": {}},
+        },
+    },
 )
-def list_enrollments(
+async def export_enrollments(
+    batch_size: int = Query(
+        1000, ge=1, le=10_000, description="Documents fetched from MongoDB per round trip"
+    ),
     current_user: str = Depends(get_current_user),
-    service: EnrollmentService = Depends(get_enrollment_service),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
 ):
-    return service.list(current_user)
+    return StreamingResponse(
+        service.export(current_user, batch_size),
+        media_type="application/x-ndjson",
+    )
+
+EVENT_STREAM_RESPONSES = {
+    200: {
+        "description": (
+            "Server-Sent Events: a `status` event with "
+            '{"id", "status", "rejection_reason"} per status change'
+        ),
+        "content": {"text/event-stream": {}},
+    },
+}
+
+# Proxies must pass each event through as soon as it is written.
+EVENT_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    responses=EVENT_STREAM_RESPONSES,
+)
+async def stream_owner_events(
+    current_user: str = Depends(get_current_user),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
+):
+    stream = await service.watch(
+        current_user, get_settings().enrollment_events_keepalive_seconds
+    )
+    return StreamingResponse(
+        stream, media_type="text/event-stream", headers=EVENT_STREAM_HEADERS
+    )
+
+@router.get(
+    "/{enrollment_id}/events",
+    response_class=StreamingResponse,
+    responses=EVENT_STREAM_RESPONSES,
+    description="Starts with the current status and ends once the enrollment is approved or rejected.",
+)
+async def stream_enrollment_events(
+    enrollment_id: str,
+    current_user: str = Depends(get_current_user),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
+):
+    stream = await service.watch(
+        current_user, get_settings().enrollment_events_keepalive_seconds, enrollment_id
+    )
+    if stream is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Enrollment not found")
+    return StreamingResponse(
+        stream, media_type="text/event-stream", headers=EVENT_STREAM_HEADERS
+    )
 
 @router.get(
     "/{enrollment_id}",
     response_model=EnrollmentRead
 )
-def get_enrollment(
+async def get_enrollment(
     enrollment_id: str,
     current_user: str = Depends(get_current_user),
-    service: EnrollmentService = Depends(get_enrollment_service),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
 ):
-    result = service.get(enrollment_id, current_user)
-    if not result:
+    body = await service.get_json(enrollment_id, current_user)
+    if not body:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Enrollment not found")
-    return result
+    return Response(body, media_type="application/json")
 
 @router.delete(
     "/{enrollment_id}",
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_enrollment(
+async def delete_enrollment(
     enrollment_id: str,
     current_user: str = Depends(get_current_user),
-    service: EnrollmentService = Depends(get_enrollment_service),
+    service: AsyncEnrollmentService = Depends(get_enrollment_service),
 ):
-    if not service.delete(enrollment_id, current_user):
+    if not await service.delete(enrollment_id, current_user):
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Enrollment not found")
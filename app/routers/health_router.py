@@ -1,21 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from pymongo.database import Database
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pymongo.asynchronous.database import AsyncDatabase
 
-from app.dependencies import get_db
-from app.queue.provider import RabbitMQProvider
+from app.dependencies import get_async_db, get_health_prober
+from app.health import HealthProber
+from app.queue.async_provider import AsyncRabbitMQProvider
+from app.schemas.health_schema import ReadinessStatus
 
 
 router = APIRouter(prefix = "/health", tags=["health"])
 
 
-def check_rabbitmq():
+async def check_rabbitmq():
     """
-    Fast dependency that simply tries to open a RabbitMQ channel.
-    Raises a 503 if it can’t.
+    Fast dependency that checks the publisher has an open channel.
+    Raises a 503 if it doesn't.
     """
-    try:
-        RabbitMQProvider.get_channel()
-    except Exception:
+    if not AsyncRabbitMQProvider.get_publisher().is_ready:
         raise HTTPException(
             status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Cannot connect to RabbitMQ",
@@ -31,16 +31,19 @@ def check_rabbitmq():
         503: {"description": "One or more dependencies are down"},
     },
 )
-def health(
-    db: Database = Depends(get_db),
+async def health(
+    db: AsyncDatabase = Depends(get_async_db),
     _: bool = Depends(check_rabbitmq),
 ):
     """
     - Ping MongoDB via `db.client.admin.command("ping")`
-    - Ensure RabbitMQ channel can be opened
+    - Ensure the RabbitMQ publisher has an open channel
+
+    Pings MongoDB on every call; load balancers and orchestrators should
+    poll `/health/ready` and `/health/live` instead.
     """
     try:
-        db.client.admin.command("ping")
+        await db.client.admin.command("ping")
     except Exception:
         raise HTTPException(
             status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -48,3 +51,38 @@ def health(
         )
 
     return {"status": "ok"}
+
+
+@router.get(
+    path="/live",
+    summary="Liveness probe",
+    responses={200: {"description": "The process is serving requests"}},
+)
+async def live():
+    """
+    Answers without touching any dependency; only a stuck event loop
+    fails it.
+    """
+    return {"status": "ok"}
+
+
+@router.get(
+    path="/ready",
+    summary="Readiness probe",
+    response_model=ReadinessStatus,
+    responses={
+        200: {"description": "MongoDB and RabbitMQ passed their last probe"},
+        503: {"description": "A required dependency is down, or not yet probed"},
+    },
+)
+async def ready(prober: HealthProber = Depends(get_health_prober)):
+    """
+    Returns the last result of the background health prober, with the
+    time and latency of each check. Nothing is probed per request.
+    """
+    passed, body = prober.readiness()
+    return Response(
+        body,
+        status_code=status.HTTP_200_OK if passed else status.HTTP_503_SERVICE_UNAVAILABLE,
+        media_type="application/json",
+    )
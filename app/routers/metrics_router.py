@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.metrics import REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the process's metrics."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,14 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class TokenRequest(BaseModel):
+    username: str
+    password: str
+
+
+class TokenResponse(BaseModel):
+    access_token: str = Field(..., description="Send as `Authorization: Bearer <token>`")
+    token_type: Literal["bearer"] = "bearer"
+    expires_in: int = Field(..., description="Seconds until the token expires")
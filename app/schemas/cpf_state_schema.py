@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+
+
+class CpfState(BaseModel):
+    cpf: str
+    owner: str | None = Field(
+        None, description="Owner the counters are scoped to; None for all owners"
+    )
+    pending: int = 0
+    approved: int = 0
+    rejected: int = 0
+    failed: int = 0
+    active_enrollment_id: str | None = Field(
+        None, description="Pending or approved enrollment currently holding the CPF"
+    )
+
+    @classmethod
+    def from_document(cls, doc: dict | None, cpf: str, owner: str | None = None) -> "CpfState":
+        """
+        Build without validation; a missing document means no history.
+        """
+        if not doc:
+            return cls.model_construct(cpf=cpf, owner=owner)
+        active = doc.get("active_enrollment_id")
+        return cls.model_construct(
+            cpf=cpf,
+            owner=owner,
+            pending=doc.get("pending", 0),
+            approved=doc.get("approved", 0),
+            rejected=doc.get("rejected", 0),
+            failed=doc.get("failed", 0),
+            active_enrollment_id=str(active) if active else None,
+        )
@@ -1,5 +1,8 @@
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from typing import Iterable, List, Literal, Optional
+
+from pydantic import BaseModel, Field, TypeAdapter, field_validator, ConfigDict
+from typing_extensions import TypedDict
 
 from app.enums.enrollment_status import EnrollmentStatus
 from app.utils.validators import normalize_cpf, is_valid_cpf
@@ -55,3 +58,56 @@ class EnrollmentRead(EnrollmentCreate):
             created_at=doc["created_at"],
             processed_at=doc.get("processed_at"),
         )
+
+
+class EnrollmentJSON(TypedDict):
+    """
+    EnrollmentRead's JSON shape, field for field, as a TypedDict so a
+    document can be serialized without building (or re-validating) a
+    model. Key order matches EnrollmentRead's output.
+    """
+    name: str
+    cpf: str
+    age: int
+    id: str
+    status: str
+    rejection_reason: Optional[str]
+    created_at: datetime
+    processed_at: Optional[datetime]
+
+
+_enrollment_json = TypeAdapter(EnrollmentJSON)
+_enrollments_json = TypeAdapter(List[EnrollmentJSON])
+
+
+def enrollment_json(doc: dict) -> EnrollmentJSON:
+    return {
+        "name": doc["name"],
+        "cpf": doc["cpf"],
+        "age": doc["age"],
+        "id": str(doc["_id"]),
+        "status": doc["status"],
+        "rejection_reason": doc.get("rejection_reason"),
+        "created_at": doc["created_at"],
+        "processed_at": doc.get("processed_at"),
+    }
+
+
+def dump_enrollment(doc: dict) -> bytes:
+    """The JSON of EnrollmentRead.from_document(doc), straight from the document."""
+    return _enrollment_json.dump_json(enrollment_json(doc))
+
+
+def dump_enrollments(docs: Iterable[dict]) -> bytes:
+    return _enrollments_json.dump_json([enrollment_json(d) for d in docs])
+
+
+class EnrollmentBulkResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request array")
+    result: Literal["created", "error"]
+    enrollment: EnrollmentRead | None = Field(
+        None, description="The created enrollment, when result is 'created'"
+    )
+    error: str | None = Field(
+        None, description="Why the item was not created, when result is 'error'"
+    )
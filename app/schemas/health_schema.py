@@ -0,0 +1,17 @@
+from datetime import datetime
+from typing import Dict, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ProbeStatus(BaseModel):
+    ok: bool
+    required: bool = Field(..., description="Whether readiness depends on this check")
+    checked_at: datetime = Field(..., description="UTC timestamp of the last probe")
+    latency_ms: float
+    error: Optional[str] = None
+
+
+class ReadinessStatus(BaseModel):
+    status: Literal["ok", "unavailable"]
+    checks: Dict[str, ProbeStatus]
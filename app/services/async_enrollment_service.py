@@ -0,0 +1,167 @@
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from pymongo.errors import DuplicateKeyError
+from fastapi import HTTPException, status
+
+from app.cache import EnrollmentCache, enrollment_cache
+from app.event_hub import EventHub, event_hub
+from app.queue.events import status_event
+from app.repositories.async_enrollment_repo import AsyncEnrollmentRepository
+from app.schemas.enrollment_schema import (
+    EnrollmentBulkResult,
+    EnrollmentCreate,
+    EnrollmentRead,
+    dump_enrollment,
+    dump_enrollments,
+)
+from app.queue.async_provider import AsyncRabbitMQProvider
+from app.queue.async_publisher import AsyncPublisher
+from app.config.settings import get_settings
+from app.services.enrollment_rules import (
+    ALREADY_ACTIVE,
+    BulkCreation,
+    admission_error,
+    raise_for_publish_error,
+    record_publish,
+    require_ready,
+)
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+class AsyncEnrollmentService:
+    """
+    Enrollment use cases on the async repository and publisher, so a
+    request never blocks a thread while it waits for MongoDB or RabbitMQ. Single
+    enrollments and list pages are served through the EnrollmentCache,
+    and status changes are streamed from the EventHub.
+    """
+    def __init__(
+        self,
+        repo: AsyncEnrollmentRepository,
+        cache: EnrollmentCache = enrollment_cache,
+        hub: EventHub = event_hub,
+    ):
+        self.repo = repo
+        self.cache = cache
+        self.hub = hub
+
+    def _get_publisher(self) -> AsyncPublisher:
+        return require_ready(AsyncRabbitMQProvider.get_publisher())
+
+    async def create(self, payload: EnrollmentCreate, owner: str) -> EnrollmentRead:
+        reason = admission_error(await self.repo.cpf_state.get(payload.cpf, owner))
+        if reason:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=reason
+            )
+
+        outbox = get_settings().outbox_enabled
+        try:
+            enrollment = await self.repo.create(payload, owner, outbox=outbox)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=ALREADY_ACTIVE
+            )
+        self.cache.invalidate(owner)
+        if outbox:
+            return enrollment
+
+        publisher = self._get_publisher()
+        started = time.perf_counter()
+        error = await publisher.publish_and_wait(enrollment.id.encode("utf-8"))
+        record_publish(started, error)
+        raise_for_publish_error(error)
+        return enrollment
+
+    async def create_many(self, items: List[Dict[str, Any]], owner: str) -> List[EnrollmentBulkResult]:
+        bulk = BulkCreation(items)
+        admitted = bulk.admit(await self.repo.cpf_state.get_many(bulk.cpfs(), owner))
+        if admitted:
+            outbox = get_settings().outbox_enabled
+            publisher = None if outbox else self._get_publisher()
+            saved = bulk.saved(
+                admitted,
+                await self.repo.create_many([p for _, p in admitted], owner, outbox=outbox),
+            )
+            self.cache.invalidate(owner)
+            if outbox:
+                errors = [None] * len(saved)
+            else:
+                errors = await publisher.publish_many(e.id.encode("utf-8") for _, e in saved)
+            bulk.published(saved, errors)
+        return bulk.results
+
+    async def list(self, owner: str) -> List[EnrollmentRead]:
+        return await self.repo.list(owner)
+
+    async def list_page(
+        self, owner: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[EnrollmentRead], Optional[str]]:
+        after = decode_cursor(cursor) if cursor else None
+        page, next_after = await self.repo.list_page(owner, limit, after)
+        return page, next_after and encode_cursor(next_after)
+
+    async def list_page_json(
+        self, owner: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[bytes, Optional[str]]:
+        """
+        list_page already encoded as a JSON array, serialized straight
+        from the documents. Raises ValueError for an unknown cursor.
+        """
+        cached, token = self.cache.get_page(owner, limit, cursor)
+        if cached is not None:
+            return cached
+        after = decode_cursor(cursor) if cursor else None
+        docs, next_after = await self.repo.list_page_documents(owner, limit, after)
+        page = dump_enrollments(docs), next_after and encode_cursor(next_after)
+        self.cache.put_page(owner, limit, cursor, page, token)
+        return page
+
+    async def export(self, owner: str, batch_size: int) -> AsyncIterator[bytes]:
+        async for doc in self.repo.iter_documents(owner, batch_size):
+            yield dump_enrollment(doc) + b"\n"
+
+    async def get(self, id: str, owner: str) -> Optional[EnrollmentRead]:
+        return await self.repo.get(id, owner)
+
+    async def get_json(self, id: str, owner: str) -> Optional[bytes]:
+        cached, token = self.cache.get_item(owner, id)
+        if cached is not None:
+            return cached
+        doc = await self.repo.get_document(id, owner)
+        if not doc:
+            return None
+        body = dump_enrollment(doc)
+        self.cache.put_item(owner, id, body, token)
+        return body
+
+    async def delete(self, id: str, owner: str) -> bool:
+        deleted = await self.repo.delete(id, owner)
+        if deleted:
+            self.cache.invalidate(owner, [id])
+        return deleted
+
+    async def watch(
+        self, owner: str, keepalive: float, id: Optional[str] = None
+    ) -> Optional[AsyncIterator[bytes]]:
+        """
+        SSE stream of the owner's status changes, or of one enrollment's,
+        starting with its current status. Returns None for an unknown
+        enrollment. The stream subscribes when it starts and only then
+        reads the current status, so a change made in between is not
+        missed.
+        """
+        if id is None:
+            return self.hub.open_stream(owner, None, keepalive)
+        if not await self.repo.get_document(id, owner):
+            return None
+
+        async def current() -> Optional[Dict]:
+            doc = await self.repo.get_document(id, owner)
+            if not doc:
+                return None
+            return status_event(doc["_id"], owner, doc.get("status"), doc.get("rejection_reason"))
+
+        return self.hub.open_stream(owner, id, keepalive, current)
@@ -0,0 +1,125 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from fastapi import HTTPException, status
+
+from app.metrics import PUBLISH_ERRORS, PUBLISH_SECONDS
+from app.schemas.cpf_state_schema import CpfState
+from app.schemas.enrollment_schema import (
+    EnrollmentBulkResult,
+    EnrollmentCreate,
+    EnrollmentRead,
+)
+from app.queue.publisher import PublisherUnavailable
+
+ALREADY_ACTIVE = "An enrollment is already pending or approved for this CPF"
+TOO_MANY_REJECTIONS = "Too many rejections; you cannot request again"
+
+
+def admission_error(state: CpfState) -> Optional[str]:
+    if state.pending or state.approved:
+        return ALREADY_ACTIVE
+    if state.rejected >= 3:
+        return TOO_MANY_REJECTIONS
+    return None
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in exc.errors()
+    )
+
+
+def require_ready(publisher):
+    if not publisher.is_ready:
+        PUBLISH_ERRORS.inc(PublisherUnavailable.__name__)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cannot connect to RabbitMQ",
+        )
+    return publisher
+
+
+def record_publish(started: float, error: Optional[Exception]) -> None:
+    """Records a publish that began at perf_counter() `started`."""
+    PUBLISH_SECONDS.observe(time.perf_counter() - started)
+    if error is not None:
+        PUBLISH_ERRORS.inc(type(error).__name__)
+
+
+def raise_for_publish_error(error: Optional[Exception]) -> None:
+    if isinstance(error, PublisherUnavailable):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cannot connect to RabbitMQ",
+        )
+    if error is not None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="RabbitMQ did not accept the enrollment",
+        )
+
+
+class BulkCreation:
+    """
+    Per-item bookkeeping of a bulk create: items drop out with an error
+    at each stage (validation, in-request duplicates, admission, insert,
+    publish) and the rest end up created.
+    """
+    def __init__(self, items: List[Dict[str, Any]]):
+        self.results: List[Optional[EnrollmentBulkResult]] = [None] * len(items)
+        self.candidates: List[Tuple[int, EnrollmentCreate]] = []
+        seen = set()
+        for index, item in enumerate(items):
+            try:
+                payload = EnrollmentCreate.model_validate(item)
+            except ValidationError as e:
+                self.fail(index, _validation_message(e))
+                continue
+            if payload.cpf in seen:
+                self.fail(index, "Duplicate CPF in this request")
+                continue
+            seen.add(payload.cpf)
+            self.candidates.append((index, payload))
+
+    def fail(self, index: int, error: str) -> None:
+        self.results[index] = EnrollmentBulkResult(index=index, result="error", error=error)
+
+    def cpfs(self) -> List[str]:
+        return [p.cpf for _, p in self.candidates]
+
+    def admit(self, states: Dict[str, CpfState]) -> List[Tuple[int, EnrollmentCreate]]:
+        admitted = []
+        for index, payload in self.candidates:
+            reason = admission_error(states[payload.cpf])
+            if reason:
+                self.fail(index, reason)
+            else:
+                admitted.append((index, payload))
+        return admitted
+
+    def saved(
+        self,
+        admitted: List[Tuple[int, EnrollmentCreate]],
+        created: List[Optional[EnrollmentRead]],
+    ) -> List[Tuple[int, EnrollmentRead]]:
+        saved = []
+        for (index, _), enrollment in zip(admitted, created):
+            if enrollment is None:
+                self.fail(index, ALREADY_ACTIVE)
+            else:
+                saved.append((index, enrollment))
+        return saved
+
+    def published(
+        self, saved: List[Tuple[int, EnrollmentRead]], errors: List[Optional[Exception]]
+    ) -> None:
+        for (index, enrollment), error in zip(saved, errors):
+            if error is not None:
+                self.fail(index, "Enrollment saved but RabbitMQ did not accept it")
+            else:
+                self.results[index] = EnrollmentBulkResult(
+                    index=index, result="created", enrollment=enrollment
+                )
+
@@ -3,8 +3,11 @@ import os
 import pytest
 from fastapi.testclient import TestClient
 
+from app.cache import enrollment_cache
+from app.config.settings import settings_store
 from app.database.provider import DatabaseProvider
 from app.dependencies import get_age_groups_client
+from app.queue.async_provider import AsyncRabbitMQProvider
 from app.queue.provider import RabbitMQProvider
 from main import app
 from mongomock import MongoClient as MockClient
@@ -20,17 +23,50 @@ def dummy_rabbit(monkeypatch):
         def basic_publish(self, *args, **kwargs):
             pass
 
+    class DummyPublisher:
+        is_ready = True
+
+        def __init__(self):
+            self.published = []
+
+        async def wait_ready(self, timeout=None):
+            return self.is_ready
+
+        async def publish_and_wait(self, body, routing_key=None):
+            self.published.append(body.decode())
+            return None
+
+        async def publish_many(self, bodies, routing_key=None, batch_size=None):
+            return [await self.publish_and_wait(body, routing_key) for body in bodies]
+
+        async def close(self):
+            pass
+
+    publisher = DummyPublisher()
     monkeypatch.setattr(
         RabbitMQProvider,
         "get_channel",
         classmethod(lambda cls: DummyChannel()),
     )
+    monkeypatch.setattr(
+        AsyncRabbitMQProvider,
+        "get_publisher",
+        classmethod(lambda cls: publisher),
+    )
     monkeypatch.setattr(
         RabbitMQProvider,
         "close",
         classmethod(lambda cls: None),
     )
-    yield
+    yield publisher
+
+@pytest.fixture
+def override_settings(monkeypatch):
+    """Replaces the settings snapshot with a copy carrying the given values."""
+    def override(**changes):
+        snapshot = settings_store.current().model_copy(update=changes)
+        monkeypatch.setattr(settings_store, "_snapshot", snapshot)
+    return override
 
 @pytest.fixture
 def age_groups_stub():
@@ -76,26 +112,38 @@ def client():
 
 @pytest.fixture(autouse=True)
 def clear_enrollments_collection():
-    """Ensure enrollments collection is empty before/after each test."""
+    """Ensure enrollments, CPF state and the read cache are empty before/after each test."""
     db = DatabaseProvider.get_db()
     db.drop_collection("enrollments")
+    db.drop_collection("cpf_state")
+    enrollment_cache.clear()
     yield
     db.drop_collection("enrollments")
+    db.drop_collection("cpf_state")
+    enrollment_cache.clear()
 
 
 @pytest.fixture
 def dummy_channel():
-    """Capture basic_ack/basic_nack calls."""
+    """Capture basic_ack/basic_nack/basic_publish calls."""
     class DummyChannel:
         def __init__(self):
             self.acked = []
             self.nacked = []
+            self.published = []
+
+            self.multiple = []
 
-        def basic_ack(self, delivery_tag):
+        def basic_ack(self, delivery_tag, multiple=False):
             self.acked.append(delivery_tag)
+            self.multiple.append(multiple)
 
-        def basic_nack(self, delivery_tag, requeue):
+        def basic_nack(self, delivery_tag, requeue, multiple=False):
             self.nacked.append((delivery_tag, requeue))
+            self.multiple.append(multiple)
+
+        def basic_publish(self, exchange, routing_key, body, properties=None):
+            self.published.append((exchange, routing_key, body, properties))
 
     return DummyChannel()
 
@@ -0,0 +1,78 @@
+import pytest
+
+from app.clients.age_groups_cache import AgeGroupIndex, AgeGroupsCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Loader:
+    def __init__(self, groups):
+        self.groups = groups
+        self.fail = False
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise Exception("upstream failure")
+        return self.groups
+
+
+def test_index_merges_overlapping_groups():
+    index = AgeGroupIndex([
+        {"min_age": 10, "max_age": 20},
+        {"min_age": 0, "max_age": 5},
+        {"min_age": 15, "max_age": 25},
+        {"min_age": 40, "max_age": 30},
+    ])
+    assert len(index) == 2
+    assert [a for a in range(-1, 30) if index.contains(a)] == (
+        list(range(0, 6)) + list(range(10, 26))
+    )
+
+
+def test_index_empty_contains_nothing():
+    assert not AgeGroupIndex([]).contains(0)
+
+
+def test_cache_reloads_after_ttl():
+    clock, loader = FakeClock(), Loader([{"min_age": 0, "max_age": 5}])
+    cache = AgeGroupsCache(loader, ttl_seconds=10, max_staleness_seconds=60, clock=clock)
+
+    cache.get()
+    clock.now = 9
+    cache.get()
+    assert loader.calls == 1
+
+    loader.groups = [{"min_age": 0, "max_age": 50}]
+    clock.now = 10
+    assert cache.get().contains(30)
+    assert loader.calls == 2
+
+
+def test_cache_serves_stale_snapshot_within_window():
+    clock, loader = FakeClock(), Loader([{"min_age": 0, "max_age": 5}])
+    cache = AgeGroupsCache(loader, ttl_seconds=10, max_staleness_seconds=60, clock=clock)
+    cache.get()
+
+    loader.fail = True
+    clock.now = 59
+    assert cache.get().contains(3)
+
+    clock.now = 60
+    with pytest.raises(Exception, match="upstream failure"):
+        cache.get()
+
+
+def test_cache_without_snapshot_propagates_failure():
+    loader = Loader([])
+    loader.fail = True
+    cache = AgeGroupsCache(loader, ttl_seconds=10, max_staleness_seconds=60, clock=FakeClock())
+    with pytest.raises(Exception, match="upstream failure"):
+        cache.get()
@@ -0,0 +1,108 @@
+import asyncio
+
+from bson import ObjectId
+
+import processor.async_worker as async_worker
+from app.clients.age_groups_cache import AsyncAgeGroupsCache
+from app.database.async_provider import AsyncDatabaseProvider
+from app.database.provider import DatabaseProvider
+from app.enums.enrollment_status import EnrollmentStatus
+from app.repositories.cpf_state_repo import CpfStateRepository
+from app.tests.test_processor import insert_enrollment
+
+
+class DummyMessage:
+    def __init__(self, body: bytes, headers=None):
+        self.body = body
+        self.headers = headers or {}
+        self.acked = False
+
+    async def ack(self):
+        self.acked = True
+
+
+class DummyExchange:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, message, routing_key):
+        self.published.append((routing_key, message))
+
+
+def _cache(groups=None, fail=False):
+    async def loader():
+        if fail:
+            raise Exception("upstream failure")
+        return groups
+
+    return AsyncAgeGroupsCache(loader, ttl_seconds=60, max_staleness_seconds=60)
+
+
+def _handle(eid: str, cache: AsyncAgeGroupsCache, headers=None, exchange=None) -> DummyMessage:
+    message = DummyMessage(eid.encode(), headers)
+    db = AsyncDatabaseProvider.get_db()
+    asyncio.run(async_worker.handle_message(
+        message, db=db, age_groups=cache, default_exchange=exchange or DummyExchange()
+    ))
+    return message
+
+
+def _status(eid: str) -> dict:
+    return DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})
+
+
+def test_async_approval_acks():
+    eid = insert_enrollment("11111111111", age=12)
+    message = _handle(eid, _cache([{"min_age": 0, "max_age": 20}]))
+    assert _status(eid)["status"] == EnrollmentStatus.approved.value
+    state = CpfStateRepository(DatabaseProvider.get_db()).get("11111111111")
+    assert (state.pending, state.approved) == (0, 1)
+    assert message.acked
+
+
+def test_async_rejection_acks():
+    eid = insert_enrollment("22222222222", age=30)
+    message = _handle(eid, _cache([{"min_age": 0, "max_age": 20}]))
+    assert "Age 30 not in any group" in _status(eid)["rejection_reason"]
+    assert message.acked
+
+
+def test_async_upstream_failure_is_retried_then_parked():
+    eid = insert_enrollment("44444444444", age=3)
+    exchange = DummyExchange()
+    message = _handle(eid, _cache(fail=True), exchange=exchange)
+    assert _status(eid)["status"] == EnrollmentStatus.pending.value
+    assert message.acked
+    [(routing_key, retry)] = exchange.published
+    assert routing_key == async_worker._retry.delay_queue(10)
+    assert retry.headers["x-attempt"] == 2
+
+    exchange = DummyExchange()
+    message = _handle(eid, _cache(fail=True), headers={"x-attempt": 4}, exchange=exchange)
+    assert _status(eid)["status"] == EnrollmentStatus.failed.value
+    assert message.acked
+    assert exchange.published[0][0] == async_worker._retry.parked
+
+
+def test_async_missing_document_acks():
+    message = _handle("000000000000000000000000", _cache([]))
+    assert message.acked
+
+
+def test_async_concurrent_messages():
+    cache = _cache([{"min_age": 0, "max_age": 20}])
+    ids = [insert_enrollment(f"{i:011d}", age=10) for i in range(1, 6)]
+    db = AsyncDatabaseProvider.get_db()
+    messages = [DummyMessage(eid.encode()) for eid in ids]
+
+    async def run_all():
+        await asyncio.gather(*(
+            async_worker.handle_message(
+                m, db=db, age_groups=cache, default_exchange=DummyExchange()
+            )
+            for m in messages
+        ))
+
+    asyncio.run(run_all())
+    assert all(m.acked for m in messages)
+    assert {_status(e)["status"] for e in ids} == {EnrollmentStatus.approved.value}
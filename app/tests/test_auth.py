@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+import app.auth as auth_module
+from app.auth import CredentialStore, VerifiedCredentials
+from app.utils.passwords import hash_password, verify_password
+from app.utils.tokens import issue_token, verify_token
+
+SECRET = b"s" * 32
+
+
+def test_password_hash_round_trip():
+    encoded = hash_password("hunter2", n=2 ** 10)
+    assert encoded.startswith("scrypt$1024$")
+    assert verify_password("hunter2", encoded)
+    assert not verify_password("hunter3", encoded)
+    assert not verify_password("hunter2", "plaintext")
+
+
+def test_token_round_trip_expiry_and_tampering():
+    token, expires_at = issue_token("admin", SECRET, ttl_seconds=60, now=1000)
+    assert expires_at == 1060
+    assert verify_token(token, SECRET, now=1059) == "admin"
+    assert verify_token(token, SECRET, now=1060) is None
+    assert verify_token(token, b"other" * 8, now=1000) is None
+    payload, _, signature = token.rpartition(".")
+    forged = payload.replace(".1060", ".9999") + "." + signature
+    assert verify_token(forged, SECRET, now=1000) is None
+    assert verify_token("admin.9999999999.\xe9", SECRET, now=1000) is None
+
+
+def test_token_secret_is_required_outside_tests(monkeypatch):
+    snapshot = auth_module.settings.model_copy(update={"environment": "production"})
+    monkeypatch.setattr(auth_module, "settings", snapshot)
+    with pytest.raises(RuntimeError, match="AUTH_TOKEN_SECRET"):
+        auth_module._token_secret()
+    monkeypatch.setattr(auth_module, "settings", snapshot.model_copy(update={"auth_token_secret": "s"}))
+    assert auth_module._token_secret() == b"s"
+
+
+def write_credentials(path, users):
+    path.write_text(json.dumps({"users": users}))
+
+
+def test_verified_credentials_hash_once_until_reload(tmp_path, monkeypatch):
+    creds = tmp_path / "credentials.json"
+    write_credentials(creds, {"alice": hash_password("pw", n=2 ** 10)})
+    store = CredentialStore(creds, check_interval=0)
+    verified = VerifiedCredentials(store, max_size=2)
+
+    calls = []
+    original = auth_module.verify_password
+    monkeypatch.setattr(
+        auth_module, "verify_password", lambda *a: calls.append(a) or original(*a)
+    )
+
+    assert verified.check("alice", "pw")
+    assert verified.check("alice", "pw")
+    assert not verified.check("alice", "wrong")
+    assert len(calls) == 2
+
+    write_credentials(creds, {"alice": hash_password("new", n=2 ** 10)})
+    os.utime(creds, (0, store._mtime + 10))
+    assert not verified.check("alice", "pw")
+    assert verified.check("alice", "new")
+
+
+def test_verified_credentials_lru_is_bounded(tmp_path):
+    creds = tmp_path / "credentials.json"
+    write_credentials(creds, {u: hash_password("pw", n=2 ** 10) for u in "abc"})
+    verified = VerifiedCredentials(CredentialStore(creds), max_size=2)
+    for user in "abc":
+        assert verified.check(user, "pw")
+    assert not verified.cached("a", "pw")
+    assert verified.cached("b", "pw") and verified.cached("c", "pw")
+
+
+def test_token_endpoint_issues_bearer_token(client: TestClient):
+    r = client.post("/auth/token", json={"username": "admin", "password": "commonuser"})
+    assert r.status_code == status.HTTP_200_OK
+    body = r.json()
+    assert body["token_type"] == "bearer"
+    assert body["expires_in"] == auth_module.settings.auth_token_ttl_seconds
+
+    headers = {"Authorization": f"Bearer {body['access_token']}"}
+    created = client.post(
+        "/enrollments/",
+        json={"name": "Alice", "cpf": "652.535.790-01", "age": 12},
+        headers=headers,
+    )
+    assert created.status_code == status.HTTP_201_CREATED
+    listed = client.get("/enrollments/", auth=("admin", "commonuser")).json()
+    assert [e["id"] for e in listed] == [created.json()["id"]]
+
+
+def test_token_endpoint_rejects_bad_password(client: TestClient):
+    r = client.post("/auth/token", json={"username": "admin", "password": "nope"})
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_invalid_bearer_token_401(client: TestClient):
+    r = client.get("/enrollments/", headers={"Authorization": "Bearer not.a.token"})
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_non_ascii_bearer_token_401(client: TestClient):
+    r = client.get(
+        "/enrollments/", headers={"Authorization": "Bearer admin.9999999999.\xe9".encode("latin-1")}
+    )
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_missing_credentials_401(client: TestClient):
+    r = client.get("/enrollments/")
+    assert r.status_code == status.HTTP_401_UNAUTHORIZED
+    assert "Basic" in r.headers["WWW-Authenticate"]
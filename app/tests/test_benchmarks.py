@@ -0,0 +1,29 @@
+from benchmarks.harness import compare, measure
+
+
+def _report(**results):
+    return {"results": results}
+
+
+def test_compare_flags_slower_latency_and_lower_throughput():
+    base = _report(
+        get={"p50_ms": 1.0, "p99_ms": 2.0, "ops_per_sec": 1000.0},
+        post={"p50_ms": 1.0, "p99_ms": 2.0, "ops_per_sec": 1000.0},
+    )
+    current = _report(
+        get={"p50_ms": 1.1, "p99_ms": 2.1, "ops_per_sec": 950.0},
+        post={"p50_ms": 1.5, "p99_ms": 2.0, "ops_per_sec": 700.0},
+        new={"p50_ms": 9.0, "p99_ms": 9.0, "ops_per_sec": 1.0},
+    )
+
+    regressions = compare(base, current, threshold=0.2)
+    assert len(regressions) == 2
+    assert all(line.startswith("post:") for line in regressions)
+
+
+def test_measure_reports_per_call_percentiles():
+    calls = []
+    result = measure(lambda: calls.append(1), iterations=100, batch=10, warmup=5)
+    assert len(calls) == 105
+    assert result["iterations"] == 100
+    assert result["p50_ms"] <= result["p99_ms"]
@@ -0,0 +1,124 @@
+import processor.worker as worker_module
+from app.cache import EnrollmentCache, TTLCache, enrollment_cache
+from app.database.provider import DatabaseProvider
+from app.enums.enrollment_status import EnrollmentStatus
+from app.metrics import MONGO_OPERATION_SECONDS
+from app.queue.events import decode_events, status_event
+from app.tests.test_processor import StubGroups, insert_enrollment
+
+AUTH = ("admin", "commonuser")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def mongo_gets() -> int:
+    return MONGO_OPERATION_SECONDS.count("AsyncEnrollmentRepository", "get_document")
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired():
+    clock = Clock()
+    cache = TTLCache(max_size=2, ttl=5, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    clock.now += 5
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_result_read_before_an_invalidation_is_not_stored():
+    cache = EnrollmentCache(max_size=10, ttl=60)
+    _, token = cache.get_item("admin", "1")
+    cache.invalidate("admin", ["1"])
+    cache.put_item("admin", "1", b"stale", token)
+    assert cache.get_item("admin", "1")[0] is None
+
+    _, token = cache.get_item("admin", "1")
+    cache.put_item("admin", "1", b"fresh", token)
+    assert cache.get_item("admin", "1")[0] == b"fresh"
+    assert cache.hits == 1
+    assert cache.misses == 3
+
+
+def test_owner_versions_are_bounded_and_evictions_miss():
+    cache = EnrollmentCache(max_size=3, ttl=60)
+    _, token = cache.get_page("carol", 10, None)
+    cache.put_page("carol", 10, None, ["c"], token)
+    for owner in ("alice", "bob", "dave"):
+        cache.invalidate(owner)
+    assert cache.get_page("carol", 10, None)[0] == ["c"]
+
+    cache.invalidate("eve")
+    assert list(cache._owner_versions) == ["bob", "dave", "eve"]
+    # Evicting alice's version moves carol, who has none, to a new one.
+    assert cache.get_page("carol", 10, None)[0] is None
+
+
+def test_repeated_get_is_served_from_cache(client):
+    r = client.post("/enrollments/", json={"name": "A", "cpf": "652.535.790-01", "age": 12}, auth=AUTH)
+    eid = r.json()["id"]
+
+    before = mongo_gets()
+    first = client.get(f"/enrollments/{eid}", auth=AUTH)
+    second = client.get(f"/enrollments/{eid}", auth=AUTH)
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert mongo_gets() == before + 1
+
+
+def test_status_event_refreshes_cached_enrollment(client):
+    eid = insert_enrollment("65253579001", age=12)
+    DatabaseProvider.get_db()["enrollments"].update_one({}, {"$set": {"owner": "admin"}})
+    assert client.get(f"/enrollments/{eid}", auth=AUTH).json()["status"] == "pending"
+
+    DatabaseProvider.get_db()["enrollments"].update_one({}, {"$set": {"status": "approved"}})
+    assert client.get(f"/enrollments/{eid}", auth=AUTH).json()["status"] == "pending"
+
+    enrollment_cache.invalidate_events([status_event(eid, "admin", "approved")])
+    assert client.get(f"/enrollments/{eid}", auth=AUTH).json()["status"] == "approved"
+
+
+def test_list_is_invalidated_by_create_and_delete(client):
+    assert client.get("/enrollments/", auth=AUTH).json() == []
+
+    r = client.post("/enrollments/", json={"name": "A", "cpf": "652.535.790-01", "age": 12}, auth=AUTH)
+    eid = r.json()["id"]
+    assert [e["id"] for e in client.get("/enrollments/", auth=AUTH).json()] == [eid]
+
+    assert client.delete(f"/enrollments/{eid}", auth=AUTH).status_code == 204
+    assert client.get("/enrollments/", auth=AUTH).json() == []
+    assert client.get(f"/enrollments/{eid}", auth=AUTH).status_code == 404
+
+
+def test_worker_publishes_status_events(monkeypatch, dummy_channel, dummy_method):
+    monkeypatch.setattr(
+        worker_module, "fetch_age_groups", StubGroups([{"min_age": 0, "max_age": 20}])
+    )
+    worker_module._age_groups_cache.clear()
+    eid = insert_enrollment("65253579001", age=12)
+    worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+    worker_module._age_groups_cache.clear()
+
+    [(exchange, _, body, _)] = dummy_channel.published
+    assert exchange == worker_module.settings.enrollment_events_exchange
+    assert decode_events(body) == [status_event(eid, None, EnrollmentStatus.approved.value)]
+
+
+def test_hit_ratio_is_exported(client):
+    r = client.post("/enrollments/", json={"name": "A", "cpf": "652.535.790-01", "age": 12}, auth=AUTH)
+    eid = r.json()["id"]
+    client.get(f"/enrollments/{eid}", auth=AUTH)
+    client.get(f"/enrollments/{eid}", auth=AUTH)
+
+    assert enrollment_cache.hit_ratio() > 0
+    assert "enrollment_cache_hit_ratio " in client.get("/metrics").text
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+import processor.async_worker as async_worker
+import processor.worker as worker_module
+from app.clients.age_groups_cache import AgeGroupsCache
+from app.clients.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.database.provider import DatabaseProvider
+from app.enums.enrollment_status import EnrollmentStatus
+from app.tests.test_processor import insert_enrollment
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise RuntimeError("down")
+
+
+def test_breaker_opens_half_opens_and_closes():
+    clock = Clock()
+    breaker = CircuitBreaker("api", failure_threshold=2, reset_timeout=30, clock=clock)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(fail)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "not called")
+
+    clock.now += 30
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_one_trial_at_a_time():
+    clock = Clock()
+    breaker = CircuitBreaker("api", failure_threshold=1, reset_timeout=5, success_threshold=2, clock=clock)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    clock.now += 5
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == HALF_OPEN
+    breaker.call(lambda: None)
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_async_trial_releases_the_half_open_slot(monkeypatch):
+    clock = Clock()
+    breaker = CircuitBreaker("api", failure_threshold=1, reset_timeout=5, clock=clock)
+    monkeypatch.setattr(async_worker, "_age_breaker", breaker)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    clock.now += 5
+
+    class HangingClient:
+        async def list(self):
+            await asyncio.Event().wait()
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(async_worker.fetch_age_groups(HangingClient()))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("api", failure_threshold=2, reset_timeout=5)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    breaker.call(lambda: None)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+class CountingClient:
+    def __init__(self, groups=None):
+        self.groups = groups
+        self.calls = 0
+
+    def list(self):
+        self.calls += 1
+        if self.groups is None:
+            raise RuntimeError("age groups api down")
+        return self.groups
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("age_groups_api", failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(worker_module, "_age_breaker", breaker)
+    worker_module._age_groups_cache.clear()
+    yield breaker
+    worker_module._age_groups_cache.clear()
+
+
+def test_worker_sends_messages_to_a_delay_queue_while_open(
+    breaker, monkeypatch, dummy_channel, dummy_method
+):
+    client = CountingClient()
+    monkeypatch.setattr(worker_module, "get_age_client", lambda: client)
+    for cpf in ("11111111111", "22222222222", "33333333333"):
+        eid = insert_enrollment(cpf, age=12)
+        worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+
+    assert client.calls == 2
+    assert breaker.state == OPEN
+    retries = [p for p in dummy_channel.published if p[1] == worker_module._retry.delay_queue(10)]
+    assert len(retries) == 3
+    assert "CircuitOpenError" in retries[-1][3].headers["x-last-error"]
+    assert dummy_channel.acked == [dummy_method.delivery_tag] * 3
+
+
+def test_worker_uses_last_known_groups_while_open(
+    breaker, monkeypatch, dummy_channel, dummy_method
+):
+    client = CountingClient([{"min_age": 0, "max_age": 20}])
+    monkeypatch.setattr(worker_module, "get_age_client", lambda: client)
+    clock = Clock()
+    cache = AgeGroupsCache(
+        loader=worker_module.fetch_age_groups, ttl_seconds=60, max_staleness_seconds=900, clock=clock
+    )
+    monkeypatch.setattr(worker_module, "_age_groups_cache", cache)
+    cache.get()
+    client.groups = None
+    clock.now += 61
+
+    for cpf in ("11111111111", "22222222222", "33333333333"):
+        eid = insert_enrollment(cpf, age=12)
+        worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+
+    assert client.calls == 3
+    assert breaker.state == OPEN
+    assert all(p[1] != worker_module._retry.delay_queue(10) for p in dummy_channel.published)
+    statuses = {d["status"] for d in DatabaseProvider.get_db()["enrollments"].find()}
+    assert statuses == {EnrollmentStatus.approved.value}
@@ -0,0 +1,68 @@
+from app.database.provider import DatabaseProvider
+from app.enums.enrollment_status import EnrollmentStatus
+from app.repositories.cpf_state_repo import CpfStateRepository
+from app.repositories.enrollment_repo import EnrollmentRepository
+
+
+class DummyPayload:
+    def __init__(self, cpf="920.104.720-71"):
+        self.cpf = cpf
+
+    def model_dump(self):
+        return {"name": "S", "cpf": self.cpf, "age": 5}
+
+
+def _snapshot(state_repo):
+    return sorted(
+        (d["_id"], d.get("pending", 0), d.get("approved", 0), d.get("rejected", 0),
+         d.get("failed", 0), d.get("active_enrollment_id"))
+        for d in state_repo.collection.find()
+    )
+
+
+def test_transitions_keep_counters_per_owner_and_overall():
+    db = DatabaseProvider.get_db()
+    repo = EnrollmentRepository(db)
+
+    first = repo.create(DummyPayload(), owner="admin")
+    state = repo.cpf_state.get("92010472071", "admin")
+    assert (state.pending, state.active_enrollment_id) == (1, first.id)
+
+    repo.update_rejection(first.id, "reason")
+    second = repo.create(DummyPayload(), owner="user1")
+    repo.update_status(second.id, EnrollmentStatus.approved)
+
+    admin = repo.cpf_state.get("92010472071", "admin")
+    assert (admin.pending, admin.rejected, admin.approved) == (0, 1, 0)
+    assert admin.active_enrollment_id is None
+
+    overall = repo.cpf_state.get("92010472071")
+    assert (overall.pending, overall.rejected, overall.approved) == (0, 1, 1)
+    assert overall.active_enrollment_id == second.id
+
+    assert repo.delete(second.id, "user1")
+    overall = repo.cpf_state.get("92010472071")
+    assert (overall.approved, overall.active_enrollment_id) == (0, None)
+
+
+def test_missing_state_reads_as_empty():
+    state = CpfStateRepository(DatabaseProvider.get_db()).get("00000000000", "admin")
+    assert (state.pending, state.approved, state.rejected) == (0, 0, 0)
+
+
+def test_rebuild_matches_incremental_state():
+    db = DatabaseProvider.get_db()
+    repo = EnrollmentRepository(db)
+    for owner in ("admin", "user1"):
+        for _ in range(2):
+            rec = repo.create(DummyPayload(), owner=owner)
+            repo.update_rejection(rec.id, "reason")
+        repo.create(DummyPayload(), owner=owner)
+    other = repo.create(DummyPayload("652.535.790-01"), owner="admin")
+    repo.update_status(other.id, EnrollmentStatus.approved)
+
+    incremental = _snapshot(repo.cpf_state)
+    db.drop_collection("cpf_state")
+
+    assert repo.cpf_state.rebuild() == 5
+    assert _snapshot(repo.cpf_state) == incremental
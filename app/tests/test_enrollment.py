@@ -1,11 +1,20 @@
+import json
+from datetime import datetime, timezone
+from typing import List
+
+from bson import ObjectId
 from fastapi import status
 from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
 
+from app.database.async_mongomock import AsyncMockCollection
+from app.database.async_provider import AsyncDatabaseProvider
 from app.database.provider import DatabaseProvider
 from app.dependencies import get_age_groups_client
 from app.enums.enrollment_status import EnrollmentStatus
-from app.queue.provider import RabbitMQProvider
+from app.repositories.async_cpf_state_repo import AsyncCpfStateRepository
 from app.repositories.enrollment_repo import EnrollmentRepository
+from app.schemas.enrollment_schema import EnrollmentRead, dump_enrollment, dump_enrollments
 from main import app
 
 
@@ -16,24 +25,21 @@ def test_health_success(client: TestClient):
 
 
 def test_health_mongo_down(client: TestClient, monkeypatch):
+    async def fail(cmd):
+        raise Exception("fail")
+
     class BadDB:
         client = type("c", (), {
-            "admin": type("a", (), {
-                "command": staticmethod(lambda cmd: (_ for _ in ()).throw(Exception("fail")))
-            })
+            "admin": type("a", (), {"command": staticmethod(fail)})
         })
-    monkeypatch.setattr(DatabaseProvider, "get_db", classmethod(lambda cls: BadDB()))
+    monkeypatch.setattr(AsyncDatabaseProvider, "get_db", classmethod(lambda cls: BadDB()))
     r = client.get("/health/", auth=("admin", "commonuser"))
     assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
     assert "MongoDB" in r.json()["detail"]
 
 
-def test_health_rabbit_down(client: TestClient, monkeypatch):
-    monkeypatch.setattr(
-        RabbitMQProvider,
-        "get_channel",
-        classmethod(lambda cls: (_ for _ in ()).throw(Exception("no rabbit")))
-    )
+def test_health_rabbit_down(client: TestClient, dummy_rabbit, monkeypatch):
+    monkeypatch.setattr(dummy_rabbit, "is_ready", False)
     r = client.get("/health/", auth=("admin", "commonuser"))
     assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
     assert "RabbitMQ" in r.json()["detail"]
@@ -223,3 +229,165 @@ def test_user_can_see_and_delete_only_their_own_enrollment(client: TestClient):
 
     get_u1 = client.get(f"/enrollments/{user1_id}", auth=("user1", "commonpass"))
     assert get_u1.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_create_checks_admission_with_one_state_lookup(client: TestClient, monkeypatch):
+    calls = []
+    original = AsyncCpfStateRepository.get
+
+    async def spy(self, cpf, owner=None):
+        calls.append((cpf, owner))
+        return await original(self, cpf, owner)
+
+    monkeypatch.setattr(AsyncCpfStateRepository, "get", spy)
+    monkeypatch.setattr(
+        AsyncMockCollection,
+        "aggregate",
+        lambda *a, **kw: (_ for _ in ()).throw(AssertionError("extra round trip")),
+    )
+
+    r = client.post(
+        "/enrollments/", json={"name": "One", "cpf": "652.535.790-01", "age": 12},
+        auth=("admin", "commonuser")
+    )
+    assert r.status_code == status.HTTP_201_CREATED
+    assert calls == [("65253579001", "admin")]
+
+
+def _seed_enrollments(owner: str, count: int):
+    repo = EnrollmentRepository(DatabaseProvider.get_db())
+    class DummyPayload:
+        def __init__(self, i):
+            self.i = i
+
+        def model_dump(self):
+            return {"name": f"P{self.i}", "cpf": f"{self.i:011d}", "age": 5}
+
+    return [repo.create(DummyPayload(i), owner=owner).id for i in range(count)]
+
+
+def test_list_pages_with_cursor(client: TestClient):
+    ids = _seed_enrollments("admin", 5)
+    _seed_enrollments("user1", 2)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/enrollments/", params=params, auth=("admin", "commonuser"))
+        assert r.status_code == status.HTTP_200_OK
+        seen += [e["id"] for e in r.json()]
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == ids
+
+
+def test_list_page_size_is_capped(client: TestClient, override_settings):
+    override_settings(enrollments_page_size_max=3)
+    _seed_enrollments("admin", 5)
+
+    r = client.get("/enrollments/", params={"limit": 1000}, auth=("admin", "commonuser"))
+    assert len(r.json()) == 3
+    assert r.headers.get("X-Next-Cursor")
+
+
+def test_list_invalid_cursor_400(client: TestClient):
+    r = client.get(
+        "/enrollments/", params={"cursor": "not-a-cursor"}, auth=("admin", "commonuser")
+    )
+    assert r.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_export_streams_ndjson(client: TestClient):
+    ids = _seed_enrollments("admin", 4)
+    _seed_enrollments("user1", 2)
+
+    r = client.get(
+        "/enrollments/export", params={"batch_size": 3}, auth=("admin", "commonuser")
+    )
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["status"] == EnrollmentStatus.pending.value
+
+
+def test_bulk_create_reports_per_item(client: TestClient, dummy_rabbit):
+    channel = dummy_rabbit
+    existing = client.post(
+        "/enrollments/",
+        json={"name": "Old", "cpf": "953.740.110-30", "age": 2},
+        auth=("admin", "commonuser"),
+    )
+    assert existing.status_code == status.HTTP_201_CREATED
+    channel.published.clear()
+
+    items = [
+        {"name": "Alice", "cpf": "652.535.790-01", "age": 12},
+        {"name": "Bad", "cpf": "123", "age": 3},
+        {"name": "Again", "cpf": "65253579001", "age": 12},
+        {"name": "Bob", "cpf": "953.740.110-30", "age": 2},
+    ]
+    r = client.post("/enrollments/bulk", json=items, auth=("admin", "commonuser"))
+    assert r.status_code == status.HTTP_200_OK
+    results = r.json()
+
+    assert [res["index"] for res in results] == [0, 1, 2, 3]
+    assert [res["result"] for res in results] == ["created", "error", "error", "error"]
+    assert results[0]["enrollment"]["cpf"] == "65253579001"
+    assert "cpf" in results[1]["error"]
+    assert results[2]["error"] == "Duplicate CPF in this request"
+    assert "pending or approved" in results[3]["error"]
+    assert channel.published == [results[0]["enrollment"]["id"]]
+
+    lst = client.get("/enrollments/", auth=("admin", "commonuser")).json()
+    assert len(lst) == 2
+
+
+def test_bulk_create_rejects_oversized_body(client: TestClient):
+    item = {"name": "A", "cpf": "652.535.790-01", "age": 1}
+    r = client.post("/enrollments/bulk", json=[item] * 5001, auth=("admin", "commonuser"))
+    assert r.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_create_503_when_publisher_not_ready(client: TestClient, dummy_rabbit, monkeypatch):
+    monkeypatch.setattr(dummy_rabbit, "is_ready", False)
+    r = client.post(
+        "/enrollments/",
+        json={"name": "Alice", "cpf": "652.535.790-01", "age": 12},
+        auth=("admin", "commonuser"),
+    )
+    assert r.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert dummy_rabbit.published == []
+
+
+def test_fast_json_matches_response_model_output():
+    docs = [
+        {
+            "_id": ObjectId(), "name": "Ana", "cpf": "65253579001", "age": 7,
+            "status": EnrollmentStatus.pending.value,
+            "created_at": datetime(2025, 1, 2, 3, 4, 5, 678000), "owner": "admin",
+        },
+        {
+            "_id": ObjectId(), "name": "Ção", "cpf": "95374011030", "age": 40,
+            "status": EnrollmentStatus.rejected.value, "rejection_reason": "Age 40 not in any group",
+            "created_at": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "processed_at": datetime(2025, 1, 2, 3, 5, tzinfo=timezone.utc),
+            "outbox_pending": True,
+        },
+    ]
+    models = [EnrollmentRead.from_document(d) for d in docs]
+    assert dump_enrollments(docs) == TypeAdapter(List[EnrollmentRead]).dump_json(models)
+    assert dump_enrollment(docs[1]) == models[1].model_dump_json().encode()
+
+
+def test_fast_routes_keep_openapi_schema():
+    paths = app.openapi()["paths"]
+    ref = {"$ref": "#/components/schemas/EnrollmentRead"}
+    list_schema = paths["/enrollments/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert list_schema["items"] == ref
+    get_schema = paths["/enrollments/{enrollment_id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert get_schema == ref
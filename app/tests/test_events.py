@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+from app.database.provider import DatabaseProvider
+from app.event_hub import EventHub
+from app.queue.events import status_event
+from app.tests.test_processor import insert_enrollment
+
+AUTH = ("admin", "commonuser")
+
+
+def parse_sse(chunks):
+    """The data of each `status` message, skipping keepalives."""
+    events = []
+    for message in b"".join(chunks).decode().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.splitlines() if not line.startswith(":"))
+        if lines.get("event") == "status":
+            events.append(json.loads(lines["data"]))
+    return events
+
+
+def test_hub_routes_events_to_matching_streams():
+    async def run():
+        hub = EventHub()
+        owner_sub = hub.subscribe("admin")
+        item_sub = hub.subscribe("admin", "1")
+        other_sub = hub.subscribe("other")
+        hub.publish([status_event("1", "admin", "approved"), status_event("2", "admin", "rejected", "x")])
+        assert [e["id"] for e in (owner_sub.queue.get_nowait(), owner_sub.queue.get_nowait())] == ["1", "2"]
+        assert item_sub.queue.get_nowait()["id"] == "1"
+        assert item_sub.queue.empty() and other_sub.queue.empty()
+        hub.unsubscribe(owner_sub)
+        hub.unsubscribe(owner_sub)
+        assert len(hub) == 2
+
+    asyncio.run(run())
+
+
+def test_enrollment_stream_ends_after_the_decision():
+    async def run():
+        hub = EventHub()
+        sub = hub.subscribe("admin", "1")
+        stream = hub.stream(sub, keepalive=0.01, current=status_event("1", "admin", "pending"))
+        chunks = [await stream.__anext__(), await stream.__anext__()]
+        hub.publish([status_event("1", "admin", "rejected", "Age 30 not in any group")])
+        chunks += [chunk async for chunk in stream]
+        assert len(hub) == 0
+        return chunks
+
+    chunks = asyncio.run(run())
+    assert chunks[1] == b": keepalive\n\n"
+    assert parse_sse(chunks) == [
+        {"id": "1", "status": "pending", "rejection_reason": None},
+        {"id": "1", "status": "rejected", "rejection_reason": "Age 30 not in any group"},
+    ]
+
+
+def test_enrollment_stream_stays_open_after_failed():
+    async def run():
+        hub = EventHub()
+        sub = hub.subscribe("admin", "1")
+        stream = hub.stream(sub, keepalive=1, current=status_event("1", "admin", "failed"))
+        hub.publish([status_event("1", "admin", "approved")])
+        return [chunk async for chunk in stream]
+
+    assert [e["status"] for e in parse_sse(asyncio.run(run()))] == ["failed", "approved"]
+
+
+def test_stream_subscribes_only_once_it_starts():
+    async def run():
+        hub = EventHub()
+
+        async def current():
+            # Subscribed before the current status is read.
+            assert len(hub) == 1
+            return status_event("1", "admin", "pending")
+
+        never_sent = hub.open_stream("admin", "1", keepalive=1, current=current)
+        assert len(hub) == 0
+        del never_sent
+
+        stream = hub.open_stream("admin", "1", keepalive=1, current=current)
+        first = await stream.__anext__()
+        assert len(hub) == 1
+        await stream.aclose()
+        assert len(hub) == 0
+        return [first]
+
+    assert parse_sse(asyncio.run(run())) == [{"id": "1", "status": "pending", "rejection_reason": None}]
+
+
+def test_slow_stream_is_dropped_when_its_queue_fills():
+    async def run():
+        hub = EventHub(max_queued=2)
+        sub = hub.subscribe("admin")
+        hub.publish([status_event(str(i), "admin", "approved") for i in range(3)])
+        assert sub.overflowed and len(hub) == 0
+        return [chunk async for chunk in hub.stream(sub, keepalive=1)]
+
+    assert [e["id"] for e in parse_sse(asyncio.run(run()))] == ["0", "1"]
+
+
+def test_enrollment_stream_over_http(client):
+    eid = insert_enrollment("65253579001", age=12, status="approved")
+    DatabaseProvider.get_db()["enrollments"].update_one({}, {"$set": {"owner": "admin"}})
+
+    with client.stream("GET", f"/enrollments/{eid}/events", auth=AUTH) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(list(r.iter_bytes()))
+    assert events == [{"id": eid, "status": "approved", "rejection_reason": None}]
+
+    assert client.get(f"/enrollments/{eid}/events", auth=("user1", "commonpass")).status_code == 404
+    assert client.get("/enrollments/64b000000000000000000000/events", auth=AUTH).status_code == 404
@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_health_prober
+from app.health import HealthProber
+from main import app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _prober(probes, clock=None, **kwargs):
+    return HealthProber(
+        probes, required=("mongodb", "rabbitmq"), interval=5, timeout=0.05,
+        clock=clock or Clock(), **kwargs,
+    )
+
+
+async def _ok():
+    pass
+
+
+async def _down():
+    raise ConnectionError("refused")
+
+
+async def _hang():
+    await asyncio.sleep(1)
+
+
+def test_probe_records_each_check_and_only_required_ones_gate_readiness():
+    prober = _prober({"mongodb": _ok, "rabbitmq": _ok, "age_groups_api": _hang})
+    assert prober.readiness()[0] is False  # nothing probed yet
+
+    assert asyncio.run(prober.probe_once()) is True
+    assert prober.readiness()[0]
+
+    prober = _prober({"mongodb": _down, "rabbitmq": _ok})
+    assert asyncio.run(prober.probe_once()) is False
+    assert b"refused" in prober.readiness()[1]
+
+
+def test_stale_result_is_not_ready():
+    clock = Clock()
+    prober = _prober({"mongodb": _ok, "rabbitmq": _ok}, clock=clock)
+    asyncio.run(prober.probe_once())
+    assert prober.readiness()[0]
+
+    clock.now += 60
+    assert not prober.readiness()[0]
+
+
+def test_http_client_lives_from_start_to_stop():
+    async def run():
+        prober = _prober({"mongodb": _ok, "rabbitmq": _ok}, http_client=httpx.AsyncClient)
+        assert prober.http is None
+        prober.start()
+        http = prober.http
+        assert http is not None and not http.is_closed
+        await prober.stop()
+        assert http.is_closed and prober.http is None
+
+    asyncio.run(run())
+
+
+def test_ready_and_live_answer_from_cached_state(client: TestClient):
+    calls = []
+
+    async def counted():
+        calls.append(1)
+
+    prober = _prober({"mongodb": counted, "rabbitmq": counted, "age_groups_api": _hang})
+    app.dependency_overrides[get_health_prober] = lambda: prober
+
+    assert client.get("/health/ready").status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert client.get("/health/live").json() == {"status": "ok"}
+
+    asyncio.run(prober.probe_once())
+    for _ in range(5):
+        r = client.get("/health/ready")
+    assert r.status_code == status.HTTP_200_OK
+    body = r.json()
+    assert body["status"] == "ok"
+    assert body["checks"]["mongodb"]["ok"] and body["checks"]["mongodb"]["required"]
+    assert body["checks"]["age_groups_api"]["error"].startswith("timed out")
+    assert len(calls) == 2  # one probe pass, no probing per request
@@ -0,0 +1,127 @@
+import os
+
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+import processor.worker as worker_module
+from app.database.indexes import ENROLLMENT_INDEXES, ensure_indexes
+from app.database.provider import DatabaseProvider
+from app.enums.enrollment_status import EnrollmentStatus
+from app.repositories.enrollment_repo import EnrollmentRepository
+
+MONGO_TEST_URI = os.environ.get("MONGO_TEST_URI")
+
+requires_mongo = pytest.mark.skipif(
+    not MONGO_TEST_URI,
+    reason="set MONGO_TEST_URI to run query-plan tests against a real MongoDB",
+)
+
+
+def test_ensure_indexes_is_idempotent():
+    db = DatabaseProvider.get_db()
+    first = ensure_indexes(db)
+    second = ensure_indexes(db)
+    assert first == second == [m.document["name"] for m in ENROLLMENT_INDEXES]
+    info = db["enrollments"].index_information()
+    assert list(info["owner_cpf_status"]["key"]) == [("owner", 1), ("cpf", 1), ("status", 1)]
+    assert info["cpf_owner_active_unique"]["unique"] is True
+
+
+def test_worker_logs_and_continues_when_an_index_cannot_be_built(monkeypatch, caplog):
+    def conflicting(db):
+        raise OperationFailure("Index already exists with a different name: owner_id")
+    monkeypatch.setattr(worker_module, "ensure_indexes", conflicting)
+    worker_module._ensure_indexes()
+    assert "Could not ensure MongoDB indexes: Index already exists" in caplog.text
+    assert "owner_id" in caplog.text
+
+
+class RecordingCollection:
+    """Passes calls through to a collection, remembering the filters used."""
+    def __init__(self, collection):
+        self._collection = collection
+        self.filters = []
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+        if name not in (
+            "find", "find_one", "count_documents",
+            "find_one_and_update", "find_one_and_delete",
+        ):
+            return method
+
+        def call(filter=None, *args, **kwargs):
+            self.filters.append(filter)
+            return method(filter, *args, **kwargs)
+
+        return call
+
+
+def _stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for key, value in plan.items():
+            if key != "rejectedPlans":
+                yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def assert_no_collscan(collection, filter):
+    stages = list(_stages(collection.find(filter).explain()))
+    assert "COLLSCAN" not in stages, f"{filter} is a collection scan: {stages}"
+
+
+@pytest.fixture
+def real_db():
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=2000)
+    db = client["enrollment_api_query_plan_tests"]
+    db.drop_collection("enrollments")
+    ensure_indexes(db)
+    db["enrollments"].insert_many([
+        {"cpf": f"{i:011d}", "owner": f"owner{i % 7}", "status": EnrollmentStatus.rejected.value}
+        for i in range(500)
+    ])
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+@requires_mongo
+def test_repository_queries_use_indexes(real_db):
+    repo = EnrollmentRepository(real_db)
+    recorder = RecordingCollection(repo.collection)
+    repo.collection = recorder
+
+    repo.list("owner1")
+    repo.list_page("owner1", 10)
+    repo.list_page("owner1", 10, after=ObjectId("000000000000000000000000"))
+    repo.get("000000000000000000000000", "owner1")
+    repo.delete("000000000000000000000000", "owner1")
+    repo.update_status("000000000000000000000000", EnrollmentStatus.approved)
+
+    assert len(recorder.filters) == 6
+    for filter in recorder.filters:
+        assert_no_collscan(real_db["enrollments"], filter)
+
+
+@requires_mongo
+def test_worker_count_queries_use_indexes(real_db):
+    for status in (EnrollmentStatus.rejected, EnrollmentStatus.approved):
+        assert_no_collscan(
+            real_db["enrollments"], {"cpf": "00000000001", "status": status.value}
+        )
+
+
+@requires_mongo
+def test_active_enrollment_unique_per_cpf_and_owner(real_db):
+    col = real_db["enrollments"]
+    col.insert_one({"cpf": "99999999999", "owner": "a", "status": EnrollmentStatus.rejected.value})
+    col.insert_one({"cpf": "99999999999", "owner": "a", "status": EnrollmentStatus.pending.value})
+    col.insert_one({"cpf": "99999999999", "owner": "b", "status": EnrollmentStatus.pending.value})
+    with pytest.raises(DuplicateKeyError):
+        col.insert_one({"cpf": "99999999999", "owner": "a", "status": EnrollmentStatus.approved.value})
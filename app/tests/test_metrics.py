@@ -0,0 +1,73 @@
+import threading
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.metrics import (
+    AUTH_FAILURES,
+    MONGO_OPERATION_SECONDS,
+    PUBLISH_SECONDS,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+)
+
+
+def test_metrics_merge_per_thread_updates_and_render_text_format():
+    registry = Registry()
+    counter = Counter("jobs_total", "Jobs", ("kind",), registry=registry)
+    gauge = Gauge("busy", "Busy workers", registry=registry)
+    histogram = Histogram("job_seconds", "Job time", buckets=(0.1, 1.0), registry=registry)
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+            gauge.inc()
+            histogram.observe(0.05)
+        gauge.dec(amount=1000)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    histogram.observe(5)
+
+    text = registry.render()
+    assert '# TYPE jobs_total counter\njobs_total{kind="a"} 4000\n' in text
+    assert "busy 0\n" in text
+    assert 'job_seconds_bucket{le="0.1"} 4000\n' in text
+    assert 'job_seconds_bucket{le="1.0"} 4000\n' in text
+    assert 'job_seconds_bucket{le="+Inf"} 4001\n' in text
+    assert "job_seconds_count 4001\n" in text
+
+
+def _sample(text: str, prefix: str) -> float:
+    line = next(l for l in text.splitlines() if l.startswith(prefix))
+    return float(line.rsplit(" ", 1)[1])
+
+
+def test_metrics_endpoint_reports_requests_mongo_publish_and_auth(client: TestClient):
+    auth = ("admin", "commonuser")
+    publishes = PUBLISH_SECONDS.count()
+    lookups = MONGO_OPERATION_SECONDS.count("AsyncEnrollmentRepository", "get_document")
+    failures = AUTH_FAILURES.value("basic")
+
+    r = client.post("/enrollments/", json={"name": "A", "cpf": "652.535.790-01", "age": 12}, auth=auth)
+    eid = r.json()["id"]
+    assert client.get(f"/enrollments/{eid}", auth=auth).status_code == status.HTTP_200_OK
+    assert client.get("/enrollments/", auth=("admin", "wrong")).status_code == status.HTTP_401_UNAUTHORIZED
+
+    r = client.get("/metrics")
+    assert r.status_code == status.HTTP_200_OK
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    assert _sample(
+        text,
+        'http_request_duration_seconds_count{method="GET",route="/enrollments/{enrollment_id}",status="200"}',
+    ) >= 1
+    assert 'http_requests_in_flight{method="GET"} 1' in text  # the scrape itself
+    assert PUBLISH_SECONDS.count() == publishes + 1
+    assert MONGO_OPERATION_SECONDS.count("AsyncEnrollmentRepository", "get_document") == lookups + 1
+    assert AUTH_FAILURES.value("basic") == failures + 1
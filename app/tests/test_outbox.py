@@ -0,0 +1,150 @@
+import time
+
+import pytest
+from bson import ObjectId
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.config.settings import settings_store
+from app.database.provider import DatabaseProvider
+from app.queue.outbox import OutboxRelay
+from app.queue.publisher import PublishNacked
+from app.repositories.enrollment_repo import EnrollmentRepository
+
+
+@pytest.fixture
+def outbox_mode(override_settings):
+    override_settings(outbox_enabled=True)
+
+
+class ConfirmingStub:
+    """Confirms every id except those in `refuse`."""
+    is_ready = True
+
+    def __init__(self, refuse=()):
+        self.refuse = set(refuse)
+        self.published = []
+
+    def publish_many(self, bodies, routing_key=None, batch_size=None):
+        errors = []
+        for body in bodies:
+            self.published.append(body.decode())
+            refused = body.decode() in self.refuse
+            errors.append(PublishNacked("no") if refused else None)
+        return errors
+
+
+def test_create_in_outbox_mode_does_not_touch_the_broker(
+    client: TestClient, dummy_rabbit, outbox_mode, monkeypatch
+):
+    monkeypatch.setattr(dummy_rabbit, "is_ready", False)
+    r = client.post(
+        "/enrollments/",
+        json={"name": "Alice", "cpf": "652.535.790-01", "age": 12},
+        auth=("admin", "commonuser"),
+    )
+    assert r.status_code == status.HTTP_201_CREATED
+    assert dummy_rabbit.published == []
+
+    doc = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(r.json()["id"])})
+    assert doc["outbox_pending"] is True
+
+
+def test_bulk_create_in_outbox_mode(client: TestClient, dummy_rabbit, outbox_mode):
+    items = [
+        {"name": "Alice", "cpf": "652.535.790-01", "age": 12},
+        {"name": "Bob", "cpf": "953.740.110-30", "age": 2},
+    ]
+    r = client.post("/enrollments/bulk", json=items, auth=("admin", "commonuser"))
+    assert [res["result"] for res in r.json()] == ["created", "created"]
+    assert dummy_rabbit.published == []
+    repo = EnrollmentRepository(DatabaseProvider.get_db())
+    assert len(repo.pending_outbox(10)) == 2
+
+
+def test_relay_marks_only_confirmed_entries_sent(client: TestClient, outbox_mode):
+    ids = []
+    for cpf in ("652.535.790-01", "953.740.110-30", "111.444.777-35"):
+        r = client.post(
+            "/enrollments/",
+            json={"name": "X", "cpf": cpf, "age": 3},
+            auth=("admin", "commonuser"),
+        )
+        ids.append(r.json()["id"])
+
+    repo = EnrollmentRepository(DatabaseProvider.get_db())
+    publisher = ConfirmingStub(refuse={ids[1]})
+    relay = OutboxRelay(repo, lambda: publisher, batch_size=2)
+
+    assert relay.relay_once() == 1
+    assert publisher.published == ids[:2]
+    assert relay.relay_once() == 1
+    assert publisher.published == ids[:2] + [ids[1], ids[2]]
+    assert [str(oid) for oid in repo.pending_outbox(10)] == [ids[1]]
+
+
+def test_relay_waits_while_publisher_is_down(client: TestClient, outbox_mode):
+    client.post(
+        "/enrollments/",
+        json={"name": "X", "cpf": "652.535.790-01", "age": 3},
+        auth=("admin", "commonuser"),
+    )
+    repo = EnrollmentRepository(DatabaseProvider.get_db())
+    publisher = ConfirmingStub()
+    publisher.is_ready = False
+    assert OutboxRelay(repo, lambda: publisher).relay_once() == 0
+    assert publisher.published == []
+    assert len(repo.pending_outbox(10)) == 1
+
+
+def test_relay_uses_the_current_publisher_on_each_pass(client: TestClient, outbox_mode):
+    client.post(
+        "/enrollments/",
+        json={"name": "X", "cpf": "652.535.790-01", "age": 3},
+        auth=("admin", "commonuser"),
+    )
+    repo = EnrollmentRepository(DatabaseProvider.get_db())
+    stopped, replacement = ConfirmingStub(), ConfirmingStub()
+    stopped.is_ready = False
+    current = [stopped]
+    relay = OutboxRelay(repo, lambda: current[0])
+
+    assert relay.relay_once() == 0
+    current[0] = replacement
+    assert relay.relay_once() == 1
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_relay_follows_outbox_enabled_across_reloads(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings_store, "_snapshot", settings_store.current())
+    # Start from what the store reads now, so only OUTBOX_ENABLED changes below.
+    settings_store.reload()
+    repo = EnrollmentRepository(DatabaseProvider.get_db())
+    publisher = ConfirmingStub()
+    relay = OutboxRelay(repo, lambda: publisher, poll_interval=0.01)
+    settings_store.subscribe(relay.on_settings_changed)
+    try:
+        monkeypatch.setenv("OUTBOX_ENABLED", "true")
+        settings_store.reload()
+        assert relay.running
+        r = client.post(
+            "/enrollments/",
+            json={"name": "X", "cpf": "652.535.790-01", "age": 3},
+            auth=("admin", "commonuser"),
+        )
+        wait_until(lambda: publisher.published == [r.json()["id"]])
+
+        monkeypatch.setenv("OUTBOX_ENABLED", "false")
+        settings_store.reload()
+        wait_until(lambda: not relay.running)
+        assert repo.pending_outbox(10) == []
+    finally:
+        settings_store.unsubscribe(relay.on_settings_changed)
+        relay.stop()
+        repo.collection.delete_many({})
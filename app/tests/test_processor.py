@@ -1,11 +1,15 @@
 from datetime import datetime, timezone
 
+import pika
 import pytest
 from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 import processor.worker as worker_module
 from app.database.provider import DatabaseProvider
 from app.enums.enrollment_status import EnrollmentStatus
+from app.repositories.cpf_state_repo import ACTIVE_STATUSES, CpfStateRepository
+from app.services.enrollment_rules import ALREADY_ACTIVE
 
 
 def insert_enrollment(cpf, age, status=EnrollmentStatus.pending.value):
@@ -22,11 +26,12 @@ def insert_enrollment(cpf, age, status=EnrollmentStatus.pending.value):
         "processed_at": None,
     }
     result = db["enrollments"].insert_one(data)
+    CpfStateRepository(db).record(cpf, None, result.inserted_id, None, status)
     return str(result.inserted_id)
 
 
 class StubGroups:
-    """Stub for fetch_age_groups_with_retry."""
+    """Stub for fetch_age_groups."""
     def __init__(self, groups, fail=False):
         self.groups = groups
         self.fail = fail
@@ -37,9 +42,17 @@ class StubGroups:
         return self.groups
 
 
+@pytest.fixture(autouse=True)
+def clear_age_groups_cache():
+    """Each test starts without a cached age-groups snapshot."""
+    worker_module._age_groups_cache.clear()
+    yield
+    worker_module._age_groups_cache.clear()
+
+
 def test_successful_approval(monkeypatch, dummy_channel, dummy_method):
     eid = insert_enrollment("11111111111", age=12)
-    monkeypatch.setattr(worker_module, "fetch_age_groups_with_retry",
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
                         StubGroups([{"min_age":0,"max_age":20}]))
     worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
     doc = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})
@@ -50,7 +63,7 @@ def test_successful_approval(monkeypatch, dummy_channel, dummy_method):
 
 def test_business_reject_age_out(monkeypatch, dummy_channel, dummy_method):
     eid = insert_enrollment("22222222222", age=30)
-    monkeypatch.setattr(worker_module, "fetch_age_groups_with_retry",
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
                         StubGroups([{"min_age":0,"max_age":20}]))
     worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
     doc = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})
@@ -61,13 +74,9 @@ def test_business_reject_age_out(monkeypatch, dummy_channel, dummy_method):
 
 def test_business_reject_duplicate_approved(monkeypatch, dummy_channel, dummy_method):
     db = DatabaseProvider.get_db()
-    eid1 = insert_enrollment("33333333333", age=5)
-    db["enrollments"].update_one(
-        {"_id": ObjectId(eid1)},
-        {"$set": {"status": EnrollmentStatus.approved.value}}
-    )
+    insert_enrollment("33333333333", age=5, status=EnrollmentStatus.approved.value)
     eid2 = insert_enrollment("33333333333", age=4)
-    monkeypatch.setattr(worker_module, "fetch_age_groups_with_retry",
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
                         StubGroups([{"min_age":0,"max_age":20}]))
     worker_module.process_one(dummy_channel, dummy_method, None, eid2.encode())
     doc2 = db["enrollments"].find_one({"_id": ObjectId(eid2)})
@@ -76,16 +85,33 @@ def test_business_reject_duplicate_approved(monkeypatch, dummy_channel, dummy_me
     assert dummy_channel.acked == [dummy_method.delivery_tag]
 
 
-def test_transient_failure_nack(monkeypatch, dummy_channel, dummy_method):
+def test_transient_failure_goes_to_the_next_delay_queue(monkeypatch, dummy_channel, dummy_method):
     eid = insert_enrollment("44444444444", age=3)
-    monkeypatch.setattr(worker_module, "fetch_age_groups_with_retry",
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
                         StubGroups([], fail=True))
-    worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+    props = pika.BasicProperties(headers={"x-attempt": 2})
+    worker_module.process_one(dummy_channel, dummy_method, props, eid.encode())
+    doc = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})
+    assert doc["status"] == EnrollmentStatus.pending.value
+    [(exchange, routing_key, body, retry_props)] = dummy_channel.published
+    assert (exchange, routing_key, body) == ("", worker_module._retry.delay_queue(60), eid.encode())
+    assert retry_props.headers["x-attempt"] == 3
+    assert "upstream failure" in retry_props.headers["x-last-error"]
+    assert dummy_channel.acked == [dummy_method.delivery_tag]
+    assert dummy_channel.nacked == []
+
+
+def test_exhausted_retries_park_and_fail(monkeypatch, dummy_channel, dummy_method):
+    eid = insert_enrollment("44444444444", age=3)
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        StubGroups([], fail=True))
+    props = pika.BasicProperties(headers={"x-attempt": 4})
+    worker_module.process_one(dummy_channel, dummy_method, props, eid.encode())
     doc = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})
     assert doc["status"] == EnrollmentStatus.failed.value
     assert doc["processed_at"] is not None
-    assert dummy_channel.nacked == [(dummy_method.delivery_tag, False)]
-    assert dummy_channel.acked == []
+    assert dummy_channel.published[0][1] == worker_module._retry.parked
+    assert dummy_channel.acked == [dummy_method.delivery_tag]
 
 
 def test_missing_document_ack(dummy_channel, dummy_method):
@@ -101,13 +127,9 @@ def test_missing_document_ack(dummy_channel, dummy_method):
 ])
 def test_rejection_limit(monkeypatch, dummy_channel, dummy_method, prior_rejects, should_block):
     for _ in range(prior_rejects):
-        eid = insert_enrollment("55555555555", age=2)
-        DatabaseProvider.get_db()["enrollments"].update_one(
-            {"_id": ObjectId(eid)},
-            {"$set": {"status": EnrollmentStatus.rejected.value}}
-        )
+        insert_enrollment("55555555555", age=2, status=EnrollmentStatus.rejected.value)
     eid_new = insert_enrollment("55555555555", age=2)
-    monkeypatch.setattr(worker_module, "fetch_age_groups_with_retry",
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
                         StubGroups([{"min_age":0,"max_age":10}]))
     worker_module.process_one(dummy_channel, dummy_method, None, eid_new.encode())
     doc_new = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid_new)})
@@ -118,3 +140,221 @@ def test_rejection_limit(monkeypatch, dummy_channel, dummy_method, prior_rejects
     else:
         assert doc_new["status"] == EnrollmentStatus.approved.value
         assert dummy_channel.acked == [dummy_method.delivery_tag]
+
+
+def test_age_groups_fetched_once_per_ttl(monkeypatch, dummy_channel, dummy_method):
+    stub = StubGroups([{"min_age":0,"max_age":20}])
+    calls = []
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        lambda: calls.append(1) or stub())
+    for cpf in ("66666666666", "77777777777"):
+        eid = insert_enrollment(cpf, age=12)
+        worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+    assert len(calls) == 1
+    assert dummy_channel.acked == [dummy_method.delivery_tag] * 2
+
+
+def _deliveries(*ids):
+    class DummyMethod:
+        def __init__(self, tag):
+            self.delivery_tag = tag
+
+    return [(DummyMethod(tag), None, eid.encode()) for tag, eid in enumerate(ids, start=1)]
+
+
+def test_batch_outcomes_and_single_ack(monkeypatch, dummy_channel):
+    db = DatabaseProvider.get_db()
+    for _ in range(3):
+        insert_enrollment("88888888888", age=5, status=EnrollmentStatus.rejected.value)
+    blocked = insert_enrollment("88888888888", age=5)
+    first = insert_enrollment("99999999999", age=5)
+    second = insert_enrollment("99999999999", age=6)
+    too_old = insert_enrollment("12121212121", age=30)
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        StubGroups([{"min_age":0,"max_age":20}]))
+
+    worker_module.process_batch(
+        dummy_channel,
+        _deliveries(blocked, first, second, too_old, "000000000000000000000000"),
+    )
+
+    def doc(eid):
+        return db["enrollments"].find_one({"_id": ObjectId(eid)})
+
+    assert "Too many rejections" in doc(blocked)["rejection_reason"]
+    assert doc(first)["status"] == EnrollmentStatus.approved.value
+    assert "already approved" in doc(second)["rejection_reason"]
+    assert "Age 30 not in any group" in doc(too_old)["rejection_reason"]
+    assert all(doc(e)["processed_at"] is not None for e in (blocked, first, second, too_old))
+    assert all(doc(e)["processed_batch"] is not None for e in (blocked, first, second, too_old))
+    assert dummy_channel.acked == [5]
+    assert dummy_channel.multiple == [True]
+
+
+def test_batch_upstream_failure_retries_each_delivery(monkeypatch, dummy_channel):
+    retried = insert_enrollment("13131313131", age=3)
+    exhausted = insert_enrollment("14141414141", age=4)
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        StubGroups([], fail=True))
+    deliveries = _deliveries(retried, exhausted)
+    deliveries[1] = (deliveries[1][0], pika.BasicProperties(headers={"x-attempt": 4}), deliveries[1][2])
+    worker_module.process_batch(dummy_channel, deliveries)
+
+    def status(eid):
+        return DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})["status"]
+
+    assert status(retried) == EnrollmentStatus.pending.value
+    assert status(exhausted) == EnrollmentStatus.failed.value
+    assert [p[1] for p in dummy_channel.published[:2]] == [
+        worker_module._retry.delay_queue(10), worker_module._retry.parked,
+    ]
+    assert dummy_channel.acked == [2]
+    assert dummy_channel.multiple == [True]
+    assert dummy_channel.nacked == []
+
+
+def test_redelivered_final_enrollment_is_skipped(monkeypatch, dummy_channel, dummy_method):
+    eid = insert_enrollment("66666666666", age=12, status=EnrollmentStatus.approved.value)
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        StubGroups([], fail=True))
+    worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+    doc = DatabaseProvider.get_db()["enrollments"].find_one({"_id": ObjectId(eid)})
+    assert doc["status"] == EnrollmentStatus.approved.value
+    assert dummy_channel.acked == [dummy_method.delivery_tag]
+
+
+def test_batch_does_not_count_writes_that_lost_a_race(monkeypatch, dummy_channel):
+    db = DatabaseProvider.get_db()
+    eid = insert_enrollment("15151515151", age=5)
+
+    def approve_concurrently():
+        # Another worker's batch decides the enrollment after this one read it.
+        db["enrollments"].update_one(
+            {"_id": ObjectId(eid)},
+            worker_module.outcome_update(EnrollmentStatus.approved, None, ObjectId()),
+        )
+        CpfStateRepository(db).record("15151515151", None, ObjectId(eid), "pending", "approved")
+        return [{"min_age": 0, "max_age": 20}]
+
+    monkeypatch.setattr(worker_module, "fetch_age_groups", approve_concurrently)
+    worker_module.process_batch(dummy_channel, _deliveries(eid))
+
+    assert db["enrollments"].find_one({"_id": ObjectId(eid)})["status"] == "approved"
+    state = CpfStateRepository(db).get("15151515151")
+    assert (state.pending, state.approved, state.rejected) == (0, 1, 0)
+    assert dummy_channel.published == []
+
+
+class ActiveUniqueCollection:
+    """
+    Enforces cpf_owner_active_unique on status updates, which mongomock
+    cannot: it ignores the index's partialFilterExpression.
+    """
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def _conflicts(self, filter, update) -> bool:
+        if update["$set"]["status"] not in ACTIVE_STATUSES:
+            return False
+        doc = self._collection.find_one(filter)
+        return doc is not None and self._collection.find_one({
+            "_id": {"$ne": doc["_id"]},
+            "cpf": doc["cpf"],
+            "owner": doc.get("owner"),
+            "status": {"$in": ACTIVE_STATUSES},
+        }) is not None
+
+    def update_one(self, filter, update):
+        if self._conflicts(filter, update):
+            raise DuplicateKeyError("E11000 duplicate key error", 11000)
+        return self._collection.update_one(filter, update)
+
+    def bulk_write(self, requests, ordered=True):
+        errors = [
+            {"index": i, "code": 11000, "errmsg": "E11000 duplicate key error"}
+            for i, r in enumerate(requests) if self._conflicts(r._filter, r._doc)
+        ]
+        failed = {e["index"] for e in errors}
+        ok = [r for i, r in enumerate(requests) if i not in failed]
+        if ok:
+            self._collection.bulk_write(ok, ordered=ordered)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+@pytest.fixture
+def active_unique(monkeypatch):
+    db = DatabaseProvider.get_db()
+
+    class Db:
+        def __getitem__(self, name):
+            return ActiveUniqueCollection(db[name]) if name == "enrollments" else db[name]
+
+    monkeypatch.setattr(DatabaseProvider, "get_db", lambda: Db())
+    return db
+
+
+def test_replayed_failed_enrollment_with_a_newer_active_one_is_rejected(
+    monkeypatch, active_unique, dummy_channel, dummy_method
+):
+    replayed = insert_enrollment("16161616161", age=5, status=EnrollmentStatus.failed.value)
+    newer = insert_enrollment("16161616161", age=5)
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        StubGroups([{"min_age": 0, "max_age": 20}]))
+
+    worker_module.process_one(dummy_channel, dummy_method, None, replayed.encode())
+
+    doc = active_unique["enrollments"].find_one({"_id": ObjectId(replayed)})
+    assert (doc["status"], doc["rejection_reason"]) == (EnrollmentStatus.rejected.value, ALREADY_ACTIVE)
+    assert active_unique["enrollments"].find_one({"_id": ObjectId(newer)})["status"] == "pending"
+    state = CpfStateRepository(active_unique).get("16161616161")
+    assert (state.pending, state.approved, state.rejected, state.failed) == (1, 0, 1, 0)
+    assert dummy_channel.acked == [dummy_method.delivery_tag]
+
+
+def test_batch_rejects_replayed_failed_enrollment_with_a_newer_active_one(
+    monkeypatch, active_unique, dummy_channel
+):
+    replayed = insert_enrollment("17171717171", age=5, status=EnrollmentStatus.failed.value)
+    insert_enrollment("17171717171", age=5)
+    other = insert_enrollment("18181818181", age=5)
+    monkeypatch.setattr(worker_module, "fetch_age_groups",
+                        StubGroups([{"min_age": 0, "max_age": 20}]))
+
+    worker_module.process_batch(dummy_channel, _deliveries(replayed, other))
+
+    def doc(eid):
+        return active_unique["enrollments"].find_one({"_id": ObjectId(eid)})
+
+    assert (doc(replayed)["status"], doc(replayed)["rejection_reason"]) == (
+        EnrollmentStatus.rejected.value, ALREADY_ACTIVE
+    )
+    assert doc(other)["status"] == EnrollmentStatus.approved.value
+    assert CpfStateRepository(active_unique).get("17171717171").approved == 0
+    assert dummy_channel.acked == [2]
+
+
+def test_batch_does_not_reject_for_an_approval_that_lost_a_race(monkeypatch, dummy_channel):
+    db = DatabaseProvider.get_db()
+    first = insert_enrollment("19191919191", age=5)
+    second = insert_enrollment("19191919191", age=6)
+
+    def reject_first_concurrently():
+        # Another worker rejects the first enrollment after this batch read it.
+        db["enrollments"].update_one(
+            {"_id": ObjectId(first)},
+            worker_module.outcome_update(EnrollmentStatus.rejected, "elsewhere", ObjectId()),
+        )
+        CpfStateRepository(db).record("19191919191", None, ObjectId(first), "pending", "rejected")
+        return [{"min_age": 0, "max_age": 20}]
+
+    monkeypatch.setattr(worker_module, "fetch_age_groups", reject_first_concurrently)
+    worker_module.process_batch(dummy_channel, _deliveries(first, second))
+
+    assert db["enrollments"].find_one({"_id": ObjectId(second)})["status"] == "approved"
+    state = CpfStateRepository(db).get("19191919191")
+    assert (state.pending, state.approved, state.rejected) == (0, 1, 1)
+    assert dummy_channel.acked == [2]
@@ -0,0 +1,72 @@
+import pika
+
+from app.queue.arguments import queue_arguments
+from app.queue.retry import ATTEMPT_HEADER, RetryTopology, attempt_of
+from processor.replay_parked import replay
+
+topology = RetryTopology("work", (10, 60))
+
+
+def test_declarations_route_delay_queues_back_to_the_work_queue():
+    queues = dict(topology.declarations())
+    assert list(queues) == ["work", "work.parked", "work.retry.10s", "work.retry.60s"]
+    assert queues["work"] == queue_arguments("work")
+    assert "x-message-ttl" not in queues["work"]
+    assert queues["work.retry.60s"] == {
+        "x-message-ttl": 60_000,
+        "x-dead-letter-exchange": "",
+        "x-dead-letter-routing-key": "work",
+    }
+
+
+def test_failures_back_off_then_park():
+    headers = {"trace": "t"}
+    routes = []
+    for _ in range(3):
+        queue, headers = topology.route_failure(headers, "boom")
+        routes.append(queue)
+    assert routes == ["work.retry.10s", "work.retry.60s", "work.parked"]
+    assert headers == {"trace": "t", ATTEMPT_HEADER: 4, "x-last-error": "boom"}
+    assert attempt_of(None) == attempt_of({ATTEMPT_HEADER: "bad"}) == 1
+
+
+class ParkedChannel:
+    def __init__(self, bodies):
+        self.parked = [
+            (tag, pika.BasicProperties(headers={ATTEMPT_HEADER: 4, "x-death": [], "trace": "t"}), body)
+            for tag, body in enumerate(bodies, start=1)
+        ]
+        self.published = []
+        self.acked = []
+        self.requeued = []
+
+    def basic_get(self, queue, auto_ack):
+        assert queue == "work.parked" and not auto_ack
+        if not self.parked:
+            return None, None, None
+        tag, props, body = self.parked.pop(0)
+        return type("Method", (), {"delivery_tag": tag}), props, body
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append((routing_key, body, properties.headers))
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+    def basic_nack(self, delivery_tag, multiple, requeue):
+        self.requeued.append((delivery_tag, multiple, requeue))
+
+
+def test_replay_resets_attempts_and_respects_limit():
+    ch = ParkedChannel([b"a", b"b", b"c"])
+    assert replay(ch, topology, limit=2) == 2
+    assert ch.published == [("work", b"a", {"trace": "t"}), ("work", b"b", {"trace": "t"})]
+    assert ch.acked == [1, 2]
+    assert len(ch.parked) == 1
+
+
+def test_replay_dry_run_leaves_messages_parked():
+    ch = ParkedChannel([b"a", b"b"])
+    assert replay(ch, topology, dry_run=True) == 2
+    assert ch.published == [] and ch.acked == []
+    assert ch.requeued == [(2, True, True)]
@@ -0,0 +1,24 @@
+import time
+
+from processor.supervisor import Supervisor
+
+
+def _sleep():
+    time.sleep(60)
+
+
+def test_supervisor_restarts_crashed_child_and_shuts_down():
+    sup = Supervisor(_sleep, processes=2, restart_delay=0, shutdown_timeout=5)
+    sup.start()
+    try:
+        crashed = sup._children[0]
+        crashed.kill()
+        crashed.join()
+
+        sup.check_children()
+
+        assert sup._children[0].pid != crashed.pid
+        assert all(p.is_alive() for p in sup._children)
+    finally:
+        sup.shutdown()
+    assert not any(p.is_alive() for p in sup._children)
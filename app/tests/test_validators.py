@@ -0,0 +1,44 @@
+import random
+
+from app.utils.validators import (
+    calculate_cpf_check_digits,
+    is_valid_cpf,
+    normalize_cpf,
+    normalize_cpfs,
+    validate_cpfs,
+)
+
+
+def _random_cpf(rng: random.Random) -> str:
+    kind = rng.randrange(7)
+    base = "".join(rng.choice("0123456789") for _ in range(9))
+    cpf = base + calculate_cpf_check_digits(base)
+    if kind == 0:
+        return cpf
+    if kind == 1:
+        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+    if kind == 2:  # one digit off
+        i = rng.randrange(11)
+        return cpf[:i] + str((int(cpf[i]) + rng.randrange(1, 10)) % 10) + cpf[i + 1:]
+    if kind == 3:
+        return rng.choice("0123456789") * 11
+    if kind == 4:  # full-width digits are still digits to \D
+        return cpf.translate({ord(d): 0xFF10 + int(d) for d in "0123456789"})
+    if kind == 5:
+        return "".join(rng.choice("0123456789 .-/x") for _ in range(rng.randrange(16)))
+    return rng.choice([None, "", "abc", cpf[:10], cpf + "0"])
+
+
+def test_validate_cpfs_matches_is_valid_cpf():
+    rng = random.Random(1234)
+    raws = [_random_cpf(rng) for _ in range(20000)]
+
+    mask = validate_cpfs(raws)
+
+    assert mask.tolist() == [is_valid_cpf(raw) for raw in raws]
+    assert normalize_cpfs(raws) == [normalize_cpf(raw) for raw in raws]
+    assert 0 < mask.sum() < len(raws)
+
+
+def test_validate_cpfs_empty_column():
+    assert validate_cpfs([]).tolist() == []
@@ -0,0 +1,76 @@
+import json
+import urllib.request
+
+import pytest
+
+import processor.worker as worker_module
+from app.tests.test_processor import StubGroups, insert_enrollment
+from processor.stats import RateMeter, WorkerStats, _serve
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_meter_counts_only_the_window():
+    clock = Clock()
+    meter = RateMeter(window=10, clock=clock)
+    clock.now += 10
+    meter.mark(50)
+    assert meter.rate() == 5.0
+
+    clock.now += 11
+    meter.mark(10)
+    assert meter.rate() == 1.0
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    stats = WorkerStats()
+    monkeypatch.setattr(worker_module, "worker_stats", stats)
+    worker_module._age_groups_cache.clear()
+    yield stats
+    worker_module._age_groups_cache.clear()
+
+
+def test_process_one_records_outcomes_and_stages(stats, monkeypatch, dummy_channel, dummy_method):
+    monkeypatch.setattr(
+        worker_module, "fetch_age_groups", StubGroups([{"min_age": 0, "max_age": 20}])
+    )
+    for cpf, age in (("11111111111", 12), ("22222222222", 30)):
+        eid = insert_enrollment(cpf, age=age)
+        worker_module.process_one(dummy_channel, dummy_method, None, eid.encode())
+    worker_module.process_one(dummy_channel, dummy_method, None, b"64b000000000000000000000")
+
+    snapshot = stats.snapshot()
+    assert snapshot["outcomes"] == {
+        "approved": 1, "missing": 1, "rejected:age_not_in_group": 1,
+    }
+    stages = snapshot["stages_ms"]
+    assert stages["load"]["count"] == 3
+    assert stages["write"]["count"] == 2
+    assert stages["ack"]["count"] == 3
+
+    # A summary covers the interval since the previous one.
+    assert stats.summary()["messages"] == 3
+    assert stats.summary()["messages"] == 0
+
+
+def test_stats_server_serves_json_and_metrics(stats):
+    stats.outcome("approved")
+    server = _serve(stats, 0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/stats") as r:
+            assert json.load(r)["outcomes"] == {"approved": 1}
+        with urllib.request.urlopen(f"{base}/metrics") as r:
+            text = r.read().decode()
+        assert 'worker_messages_total{outcome="approved",reason=""}' in text
+        assert "worker_messages_per_second" in text
+    finally:
+        server.shutdown()
+        server.server_close()
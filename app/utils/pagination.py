@@ -0,0 +1,21 @@
+import base64
+import binascii
+
+from bson import ObjectId
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    """
+    Opaque keyset cursor: the last _id of a page, base64url-encoded.
+    """
+    return base64.urlsafe_b64encode(last_id.binary).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (binascii.Error, ValueError):
+        raise ValueError("Invalid cursor")
+    if len(raw) != 12:
+        raise ValueError("Invalid cursor")
+    return ObjectId(raw)
@@ -0,0 +1,54 @@
+import base64
+import hashlib
+import hmac
+import os
+import sys
+
+SCHEME = "scrypt"
+
+# About 60 ms and 16 MiB per hash on current hardware.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    """
+    Salted scrypt hash in the form "scrypt$n$r$p$salt$digest", which is
+    what credentials.json stores.
+    """
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=32)
+    return f"{SCHEME}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, n, r, p, salt, digest = encoded.split("$")
+        if scheme != SCHEME:
+            return False
+        expected = _b64decode(digest)
+        actual = hashlib.scrypt(
+            password.encode(),
+            salt=_b64decode(salt),
+            n=int(n), r=int(r), p=int(p),
+            dklen=len(expected),
+        )
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+if __name__ == "__main__":
+    # python -m app.utils.passwords <password>  ->  value for credentials.json
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.utils.passwords <password>")
+    print(hash_password(sys.argv[1]))
@@ -0,0 +1,9 @@
+import json
+from typing import Dict
+
+KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_message(event: str, data: Dict) -> bytes:
+    """One Server-Sent Events message with a single-line JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
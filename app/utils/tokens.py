@@ -0,0 +1,46 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+from typing import Optional, Tuple
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _sign(secret: bytes, payload: str) -> str:
+    return _b64encode(hmac.new(secret, payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(
+    subject: str, secret: bytes, ttl_seconds: int, now: Optional[float] = None
+) -> Tuple[str, int]:
+    """
+    Returns "<subject>.<expiry>.<signature>" (subject base64url-encoded,
+    expiry in epoch seconds, HMAC-SHA256 signature) and its expiry.
+    """
+    expires_at = int(now if now is not None else time.time()) + ttl_seconds
+    payload = f"{_b64encode(subject.encode())}.{expires_at}"
+    return f"{payload}.{_sign(secret, payload)}", expires_at
+
+
+def verify_token(token: str, secret: bytes, now: Optional[float] = None) -> Optional[str]:
+    """The token's subject if the signature matches and it has not expired."""
+    if not token.isascii():
+        return None
+    payload, _, signature = token.rpartition(".")
+    encoded_subject, _, expires_at = payload.partition(".")
+    if not (encoded_subject and expires_at.isdigit()):
+        return None
+    if not hmac.compare_digest(signature.encode(), _sign(secret, payload).encode()):
+        return None
+    if int(expires_at) <= (now if now is not None else time.time()):
+        return None
+    try:
+        return base64.urlsafe_b64decode(
+            encoded_subject + "=" * (-len(encoded_subject) % 4)
+        ).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        return None
@@ -1,4 +1,7 @@
 import re
+from typing import Iterable, List, Optional
+
+import numpy as np
 
 def normalize_cpf(raw: str) -> str:
     return re.sub(r"\D+", "", raw or "")
@@ -18,3 +21,47 @@ def is_valid_cpf(cpf: str) -> bool:
     if len(cpf11) != 11 or invalid_cpf_sequence(cpf11):
         return False
     return calculate_cpf_check_digits(cpf11[:9]) == cpf11[-2:]
+
+
+# Column-wise versions of the above, for validating whole files at once.
+# They return exactly what the per-CPF functions return for each value.
+
+_ASCII_NON_DIGITS = {c: None for c in range(128) if not chr(c).isdigit()}
+_FIRST_WEIGHTS = np.arange(10, 1, -1)   # 10..2 over digits 1-9
+_SECOND_WEIGHTS = np.arange(11, 2, -1)  # 11..3 over digits 1-9, then 2 x first check
+
+def _normalize(raw: Optional[str]) -> str:
+    # str.translate is much cheaper than re.sub; \D also matches non-ASCII
+    # digits, so anything outside ASCII takes the regex path.
+    if raw and raw.isascii():
+        return raw.translate(_ASCII_NON_DIGITS)
+    return normalize_cpf(raw)
+
+def normalize_cpfs(raws: Iterable[Optional[str]]) -> List[str]:
+    return [_normalize(raw) for raw in raws]
+
+def _check_digit(weighted_sum: np.ndarray) -> np.ndarray:
+    check = (weighted_sum * 10) % 11
+    return np.where(check < 10, check, 0)
+
+def validate_cpfs(raws: Iterable[Optional[str]]) -> np.ndarray:
+    """
+    is_valid_cpf over a column of raw CPFs, as a boolean mask. Digits are
+    extracted into an (n, 11) array and both check digits are computed
+    with one weighted sum per row.
+    """
+    cpfs = normalize_cpfs(raws)
+    valid = np.zeros(len(cpfs), dtype=bool)
+    rows = [i for i, cpf in enumerate(cpfs) if len(cpf) == 11 and cpf.isascii()]
+    if rows:
+        buffer = "".join(cpfs[i] for i in rows).encode("ascii")
+        digits = (np.frombuffer(buffer, dtype=np.uint8) - ord("0")).reshape(-1, 11).astype(np.int64)
+        first = _check_digit(digits[:, :9] @ _FIRST_WEIGHTS)
+        second = _check_digit(digits[:, :9] @ _SECOND_WEIGHTS + first * 2)
+        repeated = (digits == digits[:, :1]).all(axis=1)
+        valid[rows] = ~repeated & (digits[:, 9] == first) & (digits[:, 10] == second)
+    # Eleven non-ASCII digits (e.g. full-width) are rare enough to check one by one.
+    for i, cpf in enumerate(cpfs):
+        if len(cpf) == 11 and not cpf.isascii():
+            valid[i] = is_valid_cpf(cpf)
+    return valid
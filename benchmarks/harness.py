@@ -0,0 +1,79 @@
+"""
+Timing, result files and baseline comparison shared by the benchmarks.
+"""
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+
+def measure(fn: Callable[[], object], iterations: int, batch: int = 1, warmup: int = 10) -> Dict:
+    """
+    Calls `fn` `iterations` times after `warmup` untimed calls. Calls are
+    timed in groups of `batch` (use more than 1 for sub-microsecond work,
+    where the timer itself would dominate); p50/p99 are per call.
+    """
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    total = 0.0
+    for _ in range(max(iterations // batch, 1)):
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        elapsed = time.perf_counter() - start
+        total += elapsed
+        samples.append(elapsed / batch)
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "iterations": len(samples) * batch,
+        "p50_ms": round(statistics.median(samples) * 1000, 4),
+        "p99_ms": round(cuts[98] * 1000, 4),
+        "ops_per_sec": round(len(samples) * batch / total, 1),
+    }
+
+
+def report(results: Dict[str, Dict]) -> Dict:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def print_table(results: Dict[str, Dict]) -> None:
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}}  {'p50 ms':>10}  {'p99 ms':>10}  {'ops/s':>10}")
+    for name, r in results.items():
+        print(f"{name:<{width}}  {r['p50_ms']:>10.4f}  {r['p99_ms']:>10.4f}  {r['ops_per_sec']:>10.1f}")
+
+
+def write(path: str, data: Dict) -> None:
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Regressions of `current` against `baseline` (both report() dicts): a
+    benchmark whose p50 or p99 grew, or whose throughput fell, by more
+    than `threshold` (0.2 = 20%). Benchmarks missing from either side
+    are ignored.
+    """
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if old[key] and new[key] > old[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {old[key]} -> {new[key]}")
+        if new["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{name}: ops_per_sec {old['ops_per_sec']} -> {new['ops_per_sec']}"
+            )
+    return regressions
@@ -0,0 +1,84 @@
+"""
+Per-item cost of a list response: FastAPI's response_model path against
+the raw-Response path used by GET /enrollments/.
+
+    python -m benchmarks.serialization [--items 10000] [--repeat 5]
+
+Both routes serve the same in-memory documents, so the difference is
+the encoding alone (plus a constant per-request overhead).
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from bson import ObjectId
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.enums.enrollment_status import EnrollmentStatus
+from app.schemas.enrollment_schema import EnrollmentRead, dump_enrollments
+
+
+def make_documents(count: int, owner: str = "admin") -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Applicant {i}",
+            "cpf": "65253579001",
+            "age": i % 90,
+            "status": EnrollmentStatus.pending.value,
+            "rejection_reason": None,
+            "created_at": now,
+            "processed_at": None,
+            "owner": owner,
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(docs: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/model", response_model=List[EnrollmentRead])
+    async def model_path():
+        return [EnrollmentRead.from_document(d) for d in docs]
+
+    @app.get("/raw", response_model=List[EnrollmentRead])
+    async def raw_path():
+        return Response(dump_enrollments(docs), media_type="application/json")
+
+    return app
+
+
+def per_item_us(client: TestClient, path: str, items: int, repeat: int) -> float:
+    client.get(path)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = client.get(path)
+        best = min(best, time.perf_counter() - start)
+        assert r.status_code == 200
+    return best * 1e6 / items
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_documents(args.items)
+    client = TestClient(build_app(docs))
+    assert client.get("/model").json() == client.get("/raw").json()
+
+    model = per_item_us(client, "/model", args.items, args.repeat)
+    raw = per_item_us(client, "/raw", args.items, args.repeat)
+    print(f"{args.items} items, best of {args.repeat}")
+    print(f"  response_model: {model:6.2f} us/item")
+    print(f"  raw Response:   {raw:6.2f} us/item  ({model / raw:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,42 +3,73 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pika.exceptions import AMQPConnectionError
+from pymongo.errors import PyMongoError
 
-from app.config.settings import get_settings
+from app.cache import enrollment_cache
+from app.config.settings import get_settings, reload_settings_on_sighup, settings_store
+from app.database.async_provider import AsyncDatabaseProvider
+from app.database.indexes import ensure_indexes_async
+from app.database.provider import DatabaseProvider
+from app.event_hub import event_hub
+from app.health import health_prober
+from app.metrics import MetricsMiddleware
+from app.queue.async_provider import AsyncRabbitMQProvider
+from app.queue.outbox import OutboxRelay
 from app.queue.provider import RabbitMQProvider
+from app.repositories.enrollment_repo import EnrollmentRepository
+from app.routers.auth_router import router as auth_router
 from app.routers.health_router import router as health_router
+from app.routers.metrics_router import router as metrics_router
 from app.routers.enrollment_router import router as enrollment_router
 
 settings = get_settings()
 
-async def _connect_rabbitmq_with_retry(
-    max_attempts: int = 5, base_delay: int = 3
-):
-    for attempt in range(1, max_attempts + 1):
-        try:
-            RabbitMQProvider.get_channel()
-            print("Connected to RabbitMQ")
-            return
-        except AMQPConnectionError:
-            if attempt < max_attempts:
-                delay = attempt * base_delay
-                print(
-                    f"RabbitMQ not ready (attempt {attempt}/{max_attempts}), "
-                    f"retrying in {delay}s…"
-                )
-                await asyncio.sleep(delay)
-            else:
-                print(
-                    f"Could not connect to RabbitMQ after "
-                    f"{max_attempts} attempts; giving up for now."
-                )
+async def _start_rabbitmq_publisher(timeout: float = 15):
+    # The publisher keeps reconnecting on its own; this only reports
+    # whether the first connection came up in time.
+    if await AsyncRabbitMQProvider.get_publisher().wait_ready(timeout):
+        print("Connected to RabbitMQ")
+    else:
+        print(
+            f"RabbitMQ not ready after {timeout:.0f}s; "
+            f"the publisher keeps retrying in the background"
+        )
+
+async def _ensure_mongo_indexes():
+    try:
+        await ensure_indexes_async(AsyncDatabaseProvider.get_db())
+        print("Ensured MongoDB indexes")
+    except PyMongoError as e:
+        print(f"Could not ensure MongoDB indexes: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    asyncio.create_task(_connect_rabbitmq_with_retry())
+    reload_settings_on_sighup()
+    asyncio.create_task(_start_rabbitmq_publisher())
+    asyncio.create_task(_ensure_mongo_indexes())
+    events = AsyncRabbitMQProvider.get_events_listener()
+    events.subscribe(enrollment_cache.invalidate_events)
+    events.subscribe(event_hub.publish)
+    health_prober.start()
+    # The relay is a background thread, so it keeps the blocking driver
+    # and the thread-based publisher. It follows OUTBOX_ENABLED across
+    # settings reloads.
+    relay = OutboxRelay(
+        EnrollmentRepository(DatabaseProvider.get_db()),
+        RabbitMQProvider.get_publisher,
+        batch_size=settings.outbox_batch_size,
+        poll_interval=settings.outbox_poll_interval_seconds,
+    )
+    settings_store.subscribe(relay.on_settings_changed)
+    if get_settings().outbox_enabled:
+        relay.start()
     yield
+    await health_prober.stop()
+    settings_store.unsubscribe(relay.on_settings_changed)
+    relay.stop()
     RabbitMQProvider.close()
+    await AsyncRabbitMQProvider.close()
+    await AsyncDatabaseProvider.close()
     print("Shutting down Enrollment API")
 
 app = FastAPI(
@@ -55,5 +86,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(auth_router)
 app.include_router(enrollment_router)
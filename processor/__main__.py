@@ -0,0 +1,46 @@
+import argparse
+import logging
+import os
+
+from processor.supervisor import Supervisor
+
+
+def _run_sync_worker() -> None:
+    from processor import worker
+    worker.main()
+
+
+def _run_async_worker() -> None:
+    from processor import async_worker
+    async_worker.main()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m processor",
+        description="Run N enrollment worker processes under a supervisor.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="run the asyncio worker in each process",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+    target = _run_async_worker if args.use_async else _run_sync_worker
+    Supervisor(target, processes=max(args.processes, 1)).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import signal
+from typing import Dict, List, Optional, Set, Tuple
+
+import aio_pika
+import httpx
+from aio_pika.abc import AbstractIncomingMessage
+from bson import ObjectId, errors as bson_errors
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.clients.age_groups_cache import AsyncAgeGroupsCache
+from app.clients.age_groups_client import AsyncAgeGroupsClient
+from app.clients.circuit_breaker import CircuitBreaker
+from app.config.settings import get_settings
+from app.database.async_provider import AsyncDatabaseProvider
+from app.database.indexes import ensure_indexes_async
+from app.enums.enrollment_status import EnrollmentStatus
+from app.queue.events import encode_events, status_event
+from app.queue.retry import RetryTopology
+from app.repositories.async_cpf_state_repo import AsyncCpfStateRepository
+from processor.rules import ALREADY_ACTIVE, decide, is_final, outcome_update
+from processor.stats import worker_stats
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
+logger = logging.getLogger("async_worker")
+
+settings = get_settings()
+
+_retry = RetryTopology(settings.rabbit_queue_name, settings.worker_retry_delays_seconds)
+
+
+_age_breaker = CircuitBreaker(
+    "age_groups_api",
+    failure_threshold=settings.age_groups_breaker_failure_threshold,
+    reset_timeout=settings.age_groups_breaker_reset_seconds,
+    success_threshold=settings.age_groups_breaker_success_threshold,
+)
+
+
+async def fetch_age_groups(client: AsyncAgeGroupsClient) -> List[Dict]:
+    """worker.fetch_age_groups for the async client."""
+    _age_breaker.before_call()
+    try:
+        groups = await client.list()
+    except Exception:
+        _age_breaker.record_failure()
+        raise
+    except BaseException:
+        # Cancelled: says nothing about the API, but must not hold the
+        # half-open trial forever.
+        _age_breaker.release_trial()
+        raise
+    _age_breaker.record_success()
+    return groups
+
+
+async def _apply_outcome(
+    col, cpf_state: AsyncCpfStateRepository, doc: dict, new_status: EnrollmentStatus, reason
+) -> Optional[Tuple[EnrollmentStatus, Optional[str]]]:
+    """worker._apply_outcome on the async driver."""
+    query = {"_id": doc["_id"], "status": doc.get("status")}
+    try:
+        res = await col.update_one(query, outcome_update(new_status, reason))
+    except DuplicateKeyError:
+        new_status, reason = EnrollmentStatus.rejected, ALREADY_ACTIVE
+        res = await col.update_one(query, outcome_update(new_status, reason))
+    if not res.modified_count:
+        return None
+    await cpf_state.record(
+        doc.get("cpf"), doc.get("owner"), doc["_id"], doc.get("status"), new_status.value
+    )
+    return new_status, reason
+
+
+async def _notify(
+    events_exchange, doc: dict, new_status: EnrollmentStatus, reason: Optional[str] = None
+) -> None:
+    if events_exchange is None:
+        return
+    with worker_stats.stage("notify"):
+        try:
+            await events_exchange.publish(
+                aio_pika.Message(encode_events([
+                    status_event(doc["_id"], doc.get("owner"), new_status.value, reason)
+                ])),
+                routing_key="",
+            )
+        except Exception:
+            logger.exception("Could not publish enrollment status event")
+
+
+async def process_enrollment(
+    db, age_groups: AsyncAgeGroupsCache, enrollment_id: str, events_exchange=None
+) -> None:
+    """
+    Applies the same rules as worker.process_one. Raises when the
+    enrollment could not be decided and should be retried. Status changes
+    are announced on `events_exchange`, if given.
+    """
+    try:
+        oid = ObjectId(enrollment_id)
+    except (bson_errors.InvalidId, TypeError):
+        logger.warning(f"Invalid enrollment_id={enrollment_id!r}; acking and skipping")
+        worker_stats.outcome("invalid")
+        return
+
+    with worker_stats.stage("load"):
+        doc = await db["enrollments"].find_one({"_id": oid})
+    if not doc:
+        logger.debug(f"No document found for {enrollment_id!r}; acking and skipping")
+        worker_stats.outcome("missing")
+        return
+    if is_final(doc.get("status")):
+        logger.debug(f"Enrollment {enrollment_id} is already {doc['status']}; acking and skipping")
+        worker_stats.outcome("skipped")
+        return
+
+    if settings.worker_processing_delay_seconds > 0:
+        with worker_stats.stage("processing_delay"):
+            await asyncio.sleep(settings.worker_processing_delay_seconds)
+
+    with worker_stats.stage("age_groups"):
+        groups = await age_groups.get()
+
+    cpf_state = AsyncCpfStateRepository(db)
+    with worker_stats.stage("cpf_state"):
+        state = await cpf_state.get(doc.get("cpf"))
+    new_status, reason = decide(doc.get("age"), groups, state.rejected, state.approved)
+    with worker_stats.stage("write"):
+        written = await _apply_outcome(db["enrollments"], cpf_state, doc, new_status, reason)
+    if written is None:
+        worker_stats.outcome("skipped")
+        return
+    new_status, reason = written
+    await _notify(events_exchange, doc, new_status, reason)
+    worker_stats.decided(new_status.value, reason)
+
+
+async def _mark_failed(db, enrollment_id: str, events_exchange) -> None:
+    with worker_stats.stage("write"):
+        doc = await db["enrollments"].find_one({"_id": ObjectId(enrollment_id)})
+        if not doc or is_final(doc.get("status")):
+            return
+        written = await _apply_outcome(
+            db["enrollments"], AsyncCpfStateRepository(db), doc, EnrollmentStatus.failed, None
+        )
+    if written is not None:
+        await _notify(events_exchange, doc, EnrollmentStatus.failed)
+
+
+async def _retry_or_park(
+    message: AbstractIncomingMessage, default_exchange, error: str
+) -> bool:
+    """
+    worker._retry_or_park on aio-pika: republishes the message to its next
+    delay queue, or to the parking lot once its retries are used up, and
+    returns True if parked.
+    """
+    target, headers = _retry.route_failure(message.headers, error)
+    await default_exchange.publish(
+        aio_pika.Message(
+            message.body, headers=headers, delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        ),
+        routing_key=target,
+    )
+    return target == _retry.parked
+
+
+async def handle_message(
+    message: AbstractIncomingMessage,
+    db,
+    age_groups: AsyncAgeGroupsCache,
+    default_exchange,
+    events_exchange=None,
+) -> None:
+    """
+    Processes one delivery and acks it. A failure is first republished
+    through `default_exchange` for a retry; an enrollment whose retries
+    are used up is marked failed.
+    """
+    enrollment_id = message.body.decode()
+    try:
+        await process_enrollment(db, age_groups, enrollment_id, events_exchange)
+    except Exception as e:
+        logger.warning(f"Could not process {enrollment_id!r}: {e!r}")
+        if await _retry_or_park(message, default_exchange, repr(e)):
+            logger.error(f"Retries exhausted; marking enrollment {enrollment_id} as failed and parking it")
+            await _mark_failed(db, enrollment_id, events_exchange)
+            worker_stats.outcome(EnrollmentStatus.failed.value)
+        else:
+            worker_stats.outcome("retried")
+
+    with worker_stats.stage("ack"):
+        await message.ack()
+
+
+async def run() -> None:
+    """
+    Consumes with prefetch_count=WORKER_CONCURRENCY; aio-pika hands every
+    delivery to its own task, so at most that many enrollments are in
+    flight at once. On SIGTERM/SIGINT the consumer is cancelled and the
+    in-flight enrollments are finished and acked before exiting.
+    """
+    http = httpx.AsyncClient(
+        base_url=settings.age_groups_api_url.rstrip("/"),
+        auth=(settings.age_groups_api_username, settings.age_groups_api_password),
+    )
+    age_client = AsyncAgeGroupsClient(settings.age_groups_api_url, http)
+    age_groups = AsyncAgeGroupsCache(
+        loader=lambda: fetch_age_groups(age_client),
+        ttl_seconds=settings.age_groups_cache_ttl_seconds,
+        max_staleness_seconds=settings.age_groups_max_staleness_seconds,
+    )
+    db = AsyncDatabaseProvider.get_db()
+    try:
+        await ensure_indexes_async(db)
+    except PyMongoError as e:
+        logger.error(f"Could not ensure MongoDB indexes: {e}")
+    age_groups.start_background_refresh()
+    worker_stats.start(settings.worker_stats_port, settings.worker_stats_log_interval_seconds)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+
+    in_flight: Set[asyncio.Task] = set()
+    channel = events_exchange = None
+
+    async def on_message(message: AbstractIncomingMessage) -> None:
+        task = asyncio.current_task()
+        in_flight.add(task)
+        try:
+            await handle_message(
+                message,
+                db=db,
+                age_groups=age_groups,
+                default_exchange=channel.default_exchange,
+                events_exchange=events_exchange,
+            )
+        finally:
+            in_flight.discard(task)
+
+    logger.info("Async worker starting up, connecting to RabbitMQ…")
+    connection = await aio_pika.connect_robust(settings.rabbit_uri)
+    try:
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=settings.worker_concurrency)
+        events_exchange = await channel.declare_exchange(
+            settings.enrollment_events_exchange, aio_pika.ExchangeType.FANOUT, durable=True
+        )
+        # The work queue comes first, then the parking lot and delay queues.
+        queue, *_ = [
+            await channel.declare_queue(name, durable=True, arguments=arguments)
+            for name, arguments in _retry.declarations()
+        ]
+        consumer_tag = await queue.consume(on_message)
+        logger.info(
+            f"[*] Waiting for messages on queue '{settings.rabbit_queue_name}' "
+            f"(concurrency={settings.worker_concurrency})"
+        )
+        await stopping.wait()
+
+        logger.info(f"Stopping; finishing {len(in_flight)} in-flight messages")
+        await queue.cancel(consumer_tag)
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+    finally:
+        await connection.close()
+        await age_groups.stop_background_refresh()
+        worker_stats.stop()
+        await http.aclose()
+        await AsyncDatabaseProvider.close()
+        logger.info("Async worker stopped")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
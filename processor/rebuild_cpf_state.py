@@ -0,0 +1,25 @@
+import logging
+
+from app.database.provider import DatabaseProvider
+from app.repositories.cpf_state_repo import CpfStateRepository
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
+logger = logging.getLogger("rebuild_cpf_state")
+
+
+def main():
+    """
+    Recomputes the cpf_state collection from enrollments. Run it once
+    after upgrading, and whenever the counters are suspected to have
+    drifted; transitions that happen while it runs are not included, so
+    prefer a quiet period.
+    """
+    count = CpfStateRepository(DatabaseProvider.get_db()).rebuild()
+    logger.info(f"Rebuilt {count} CPF state documents from enrollments")
+
+
+if __name__ == "__main__":
+    main()
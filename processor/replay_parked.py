@@ -0,0 +1,94 @@
+import argparse
+import logging
+from typing import Optional
+
+import pika
+from pika.adapters.blocking_connection import BlockingChannel
+
+from app.config.settings import get_settings
+from app.queue.provider import RabbitMQProvider
+from app.queue.retry import ERROR_HEADER, RetryTopology, attempt_of
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
+logger = logging.getLogger("replay_parked")
+
+
+def replay(
+    ch: BlockingChannel,
+    topology: RetryTopology,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+) -> int:
+    """
+    Moves up to `limit` parked messages back onto the work queue, oldest
+    first, with a fresh attempt count. Each message is acked on the
+    parking lot only after it was published, so an interrupted replay
+    leaves the rest parked. With `dry_run` the messages are only listed
+    and stay parked. Returns the number of messages handled.
+    """
+    count = 0
+    last_tag = None
+    while limit is None or count < limit:
+        method, props, body = ch.basic_get(queue=topology.parked, auto_ack=False)
+        if method is None:
+            break
+        headers = (props.headers if props else None) or {}
+        logger.info(
+            f"{body.decode(errors='replace')}: {attempt_of(headers) - 1} failed attempts, "
+            f"last error {headers.get(ERROR_HEADER)!r}"
+        )
+        count += 1
+        if dry_run:
+            last_tag = method.delivery_tag
+            continue
+        # x- headers are retry and dead-letter bookkeeping; a replay starts over.
+        fresh = {k: v for k, v in headers.items() if not k.startswith("x-")}
+        ch.basic_publish(
+            exchange="",
+            routing_key=topology.queue_name,
+            body=body,
+            properties=pika.BasicProperties(headers=fresh or None, delivery_mode=2),
+        )
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    if last_tag is not None:
+        ch.basic_nack(delivery_tag=last_tag, multiple=True, requeue=True)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m processor.replay_parked",
+        description="Move parked enrollment messages back onto the work queue.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Replay at most this many messages (default: all)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the parked messages without moving them",
+    )
+    args = parser.parse_args()
+
+    settings = get_settings()
+    topology = RetryTopology(settings.rabbit_queue_name, settings.worker_retry_delays_seconds)
+    ch = RabbitMQProvider.get_channel()
+    try:
+        topology.declare(ch)
+        # With confirms, basic_publish returns once the broker has the
+        # message, before the parked copy is acked.
+        ch.confirm_delivery()
+        count = replay(ch, topology, args.limit, args.dry_run)
+    finally:
+        RabbitMQProvider.close()
+    logger.info(f"{'Listed' if args.dry_run else 'Replayed'} {count} parked messages")
+
+
+if __name__ == "__main__":
+    main()
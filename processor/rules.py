@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from bson import ObjectId
+
+from app.clients.age_groups_cache import AgeGroupIndex
+from app.enums.enrollment_status import FINAL_STATUSES, EnrollmentStatus
+from app.services.enrollment_rules import ALREADY_ACTIVE
+
+TOO_MANY_REJECTIONS = "Too many rejections; you cannot request again"
+ALREADY_APPROVED = "An enrollment is already approved for this CPF"
+
+
+def is_final(status: Optional[str]) -> bool:
+    """
+    Approved and rejected enrollments are never re-decided, so a message
+    delivered twice (the outbox relay is at-least-once) is a no-op.
+    """
+    return status in FINAL_STATUSES
+
+
+def decide(
+    age: int,
+    groups: AgeGroupIndex,
+    rejected_count: int,
+    approved_count: int,
+) -> Tuple[EnrollmentStatus, Optional[str]]:
+    """
+    Applies the business rules to one enrollment and returns the new
+    status together with the rejection reason, if any.
+    """
+    if rejected_count >= 3:
+        return EnrollmentStatus.rejected, TOO_MANY_REJECTIONS
+    if not groups.contains(age):
+        return EnrollmentStatus.rejected, f"Age {age} not in any group"
+    if approved_count > 0:
+        return EnrollmentStatus.rejected, ALREADY_APPROVED
+    return EnrollmentStatus.approved, None
+
+
+def rejection_code(reason: str) -> str:
+    """A short, bounded label for a rejection reason from decide()."""
+    if reason == TOO_MANY_REJECTIONS:
+        return "too_many_rejections"
+    if reason == ALREADY_APPROVED:
+        return "already_approved"
+    if reason == ALREADY_ACTIVE:
+        return "already_active"
+    return "age_not_in_group"
+
+
+def outcome_update(
+    status: EnrollmentStatus, reason: Optional[str], batch: Optional[ObjectId] = None
+) -> Dict:
+    """
+    The $set for a decided enrollment. `batch` tags the writes of one
+    worker batch, so the batch can find which of them matched.
+    """
+    update = {
+        "status": status.value,
+        "processed_at": datetime.now(timezone.utc),
+    }
+    if reason is not None:
+        update["rejection_reason"] = reason
+    if batch is not None:
+        update["processed_batch"] = batch
+    return {"$set": update}
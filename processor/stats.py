@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+from app.metrics import REGISTRY, CallbackGauge, Counter, Histogram
+from processor.rules import rejection_code
+
+logger = logging.getLogger("worker.stats")
+
+STAGE_SECONDS = Histogram(
+    "worker_stage_duration_seconds",
+    "Time spent in each stage of processing a message (or a batch)",
+    ("stage",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+MESSAGES = Counter(
+    "worker_messages_total",
+    "Messages processed, by outcome and rejection reason",
+    ("outcome", "reason"),
+)
+
+
+class RateMeter:
+    """Events per second over the last `window` seconds, in one-second buckets."""
+    def __init__(self, window: int = 60, clock: Callable[[], float] = time.monotonic):
+        self._window = window
+        self._clock = clock
+        self._started = clock()
+        self._buckets: deque = deque()  # [second, count]
+
+    def mark(self, n: int = 1) -> None:
+        second = int(self._clock())
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += n
+        else:
+            self._buckets.append([second, n])
+            self._trim(second)
+
+    def rate(self) -> float:
+        now = self._clock()
+        self._trim(int(now))
+        span = min(self._window, max(now - self._started, 1.0))
+        return sum(n for _, n in list(self._buckets)) / span
+
+    def _trim(self, second: int) -> None:
+        while self._buckets and self._buckets[0][0] <= second - self._window:
+            self._buckets.popleft()
+
+
+class _Totals:
+    def __init__(self):
+        self.outcomes: Dict[str, int] = {}
+        # stage -> [count, total seconds, max seconds]
+        self.stages: Dict[str, List[float]] = {}
+
+    def add_outcome(self, key: str) -> None:
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+
+    def as_dict(self) -> Dict:
+        return {
+            "messages": sum(self.outcomes.values()),
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "stages_ms": {
+                stage: {
+                    "count": int(count),
+                    "mean": round(total / count * 1000, 3),
+                    "max": round(peak * 1000, 3),
+                }
+                for stage, (count, total, peak) in list(self.stages.items())
+            },
+        }
+
+
+class _Stage:
+    __slots__ = ("_stats", "_name", "_start")
+
+    def __init__(self, stats: "WorkerStats", name: str):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self._stats.record_stage(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class WorkerStats:
+    """
+    Per-stage timings, outcome counts and a rolling messages-per-second
+    rate for one worker process. Exposed as Prometheus metrics and JSON
+    on a small HTTP server, and logged as one summary line per interval
+    instead of a line per message.
+
+    Recording happens on the consuming thread only; the reporter and HTTP
+    threads just read, so nothing here takes a lock.
+    """
+    def __init__(self, rate_window: int = 60):
+        self.rate = RateMeter(rate_window)
+        self._totals = _Totals()
+        self._interval = _Totals()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def stage(self, name: str) -> _Stage:
+        """`with stats.stage("load"): ...` times the block."""
+        return _Stage(self, name)
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        STAGE_SECONDS.observe(seconds, name)
+        self._totals.add_stage(name, seconds)
+        self._interval.add_stage(name, seconds)
+
+    def outcome(self, outcome: str, reason: str = "") -> None:
+        MESSAGES.inc(outcome, reason)
+        key = f"{outcome}:{reason}" if reason else outcome
+        self._totals.add_outcome(key)
+        self._interval.add_outcome(key)
+        self.rate.mark()
+
+    def decided(self, status: str, reason: Optional[str]) -> None:
+        """Counts the outcome of decide()."""
+        self.outcome(status, rejection_code(reason) if reason else "")
+
+    def snapshot(self) -> Dict:
+        return {"per_second": round(self.rate.rate(), 3), **self._totals.as_dict()}
+
+    def summary(self) -> Dict:
+        """Stats since the previous summary, plus the current rate."""
+        interval, self._interval = self._interval, _Totals()
+        return {"per_second": round(self.rate.rate(), 3), **interval.as_dict()}
+
+    def start(self, port: int, log_interval: float) -> None:
+        if port:
+            self._server = _serve(self, port)
+        if log_interval > 0:
+            thread = threading.Thread(
+                target=self._log_loop, args=(log_interval,), name="worker-stats-log", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads.clear()
+
+    def _log_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            logger.info(f"worker_stats {json.dumps(self.summary())}")
+
+
+def _serve(stats: WorkerStats, port: int, attempts: int = 64) -> Optional[ThreadingHTTPServer]:
+    """
+    Serves GET /metrics and GET /stats on the first free port from `port`
+    on, so every process of a supervisor gets its own.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = REGISTRY.render().encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/stats":
+                body = json.dumps(stats.snapshot()).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    for candidate in range(port, port + attempts):
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", candidate), Handler)
+        except OSError:
+            continue
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name="worker-stats-http", daemon=True)
+        thread.start()
+        logger.info(f"Worker stats on http://0.0.0.0:{candidate}/stats and /metrics")
+        return server
+    logger.warning(f"No free port for worker stats in {port}-{port + attempts - 1}")
+    return None
+
+
+worker_stats = WorkerStats()
+CallbackGauge(
+    "worker_messages_per_second",
+    "Messages processed per second over the last minute",
+    worker_stats.rate.rate,
+)
@@ -0,0 +1,102 @@
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("supervisor")
+
+
+class Supervisor:
+    """
+    Forks `processes` copies of `target` and keeps them running.
+
+    Children that exit are restarted, waiting `restart_delay` seconds if
+    the previous copy died within `min_uptime` seconds of starting. On
+    SIGTERM/SIGINT every child receives SIGTERM and gets
+    `shutdown_timeout` seconds to finish its in-flight messages before
+    it is killed.
+    """
+    def __init__(
+        self,
+        target: Callable[[], None],
+        processes: int,
+        restart_delay: float = 5.0,
+        min_uptime: float = 10.0,
+        shutdown_timeout: float = 30.0,
+    ):
+        self._target = target
+        self._processes = processes
+        self._restart_delay = restart_delay
+        self._min_uptime = min_uptime
+        self._shutdown_timeout = shutdown_timeout
+        self._ctx = multiprocessing.get_context("fork")
+        self._children: List[Optional[multiprocessing.Process]] = [None] * processes
+        self._started_at: List[float] = [0.0] * processes
+        self._stopping = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        self.start()
+        while not self._stopping:
+            sentinels = [p.sentinel for p in self._children if p is not None]
+            wait(sentinels, timeout=1.0)
+            self.check_children()
+        self.shutdown()
+
+    def start(self) -> None:
+        logger.info(f"Starting {self._processes} worker processes")
+        for slot in range(self._processes):
+            self._start(slot)
+
+    def check_children(self) -> None:
+        for slot, proc in enumerate(self._children):
+            if self._stopping or proc is None or proc.is_alive():
+                continue
+            proc.join()
+            uptime = time.monotonic() - self._started_at[slot]
+            logger.warning(
+                f"Worker {slot} (pid {proc.pid}) exited with code {proc.exitcode} "
+                f"after {uptime:.0f}s; restarting"
+            )
+            if uptime < self._min_uptime:
+                time.sleep(self._restart_delay)
+            self._start(slot)
+
+    def shutdown(self) -> None:
+        self._stopping = True
+        alive = [p for p in self._children if p is not None and p.is_alive()]
+        logger.info(f"Stopping {len(alive)} worker processes")
+        for proc in alive:
+            proc.terminate()
+        deadline = time.monotonic() + self._shutdown_timeout
+        for proc in alive:
+            proc.join(max(deadline - time.monotonic(), 0))
+            if proc.is_alive():
+                logger.warning(f"Worker pid {proc.pid} did not stop in time; killing")
+                proc.kill()
+                proc.join()
+
+    def _start(self, slot: int) -> None:
+        proc = self._ctx.Process(
+            target=_child_main,
+            args=(self._target,),
+            name=f"enrollment-worker-{slot}",
+        )
+        proc.start()
+        self._children[slot] = proc
+        self._started_at[slot] = time.monotonic()
+        logger.info(f"Started worker {slot} (pid {proc.pid})")
+
+    def _on_signal(self, signum, frame) -> None:
+        logger.info(f"Received signal {signum}; shutting down workers")
+        self._stopping = True
+
+
+def _child_main(target: Callable[[], None]) -> None:
+    # Drop the supervisor's handlers; the worker installs its own.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target()
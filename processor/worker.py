@@ -1,17 +1,29 @@
 import logging
+import signal
+import threading
 import time
-from datetime import datetime, timezone
-from typing import List, Dict
+from typing import Dict, List, Optional, Tuple
 
 import httpx
-from bson import ObjectId
+import pika
+from bson import ObjectId, errors as bson_errors
 from pika.adapters.blocking_connection import BlockingChannel
+from pymongo import UpdateMany
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 
+from app.clients.age_groups_cache import AgeGroupsCache
 from app.clients.age_groups_client import AgeGroupsClient
+from app.clients.circuit_breaker import CircuitBreaker
 from app.config.settings import get_settings
+from app.database.indexes import ensure_indexes
 from app.database.provider import DatabaseProvider
 from app.enums.enrollment_status import EnrollmentStatus
+from app.repositories.cpf_state_repo import CpfStateRepository
+from app.queue.events import declare_events_exchange, publish_events, status_event
 from app.queue.provider import RabbitMQProvider
+from app.queue.retry import RetryTopology
+from processor.rules import ALREADY_ACTIVE, decide, is_final, outcome_update
+from processor.stats import worker_stats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -21,123 +33,432 @@ logger = logging.getLogger("worker")
 
 settings = get_settings()
 
-_http = httpx.Client(
-    base_url=settings.age_groups_api_url.rstrip("/"),
-    auth=(settings.age_groups_api_username, settings.age_groups_api_password),
+_age_client: AgeGroupsClient | None = None
+_stopping = threading.Event()
+
+
+def get_age_client() -> AgeGroupsClient:
+    """
+    Creates the HTTP client on first use, so that processes forked by the
+    supervisor never share a connection pool with their parent.
+    """
+    global _age_client
+    if _age_client is None:
+        http = httpx.Client(
+            base_url=settings.age_groups_api_url.rstrip("/"),
+            auth=(settings.age_groups_api_username, settings.age_groups_api_password),
+        )
+        _age_client = AgeGroupsClient(settings.age_groups_api_url, http)
+    return _age_client
+
+
+_age_breaker = CircuitBreaker(
+    "age_groups_api",
+    failure_threshold=settings.age_groups_breaker_failure_threshold,
+    reset_timeout=settings.age_groups_breaker_reset_seconds,
+    success_threshold=settings.age_groups_breaker_success_threshold,
+)
+
+
+def fetch_age_groups() -> List[Dict]:
+    """
+    One call to the Age Groups API through the circuit breaker; nothing
+    here sleeps. While the API is down the cache serves the last good
+    snapshot, the background refresh keeps trying, and messages that
+    cannot be decided go to a delay queue. Once the breaker is open,
+    the call fails at once with CircuitOpenError.
+    """
+    return _age_breaker.call(get_age_client().list)
+
+
+_age_groups_cache = AgeGroupsCache(
+    loader=lambda: fetch_age_groups(),
+    ttl_seconds=settings.age_groups_cache_ttl_seconds,
+    max_staleness_seconds=settings.age_groups_max_staleness_seconds,
 )
-_age_client = AgeGroupsClient(settings.age_groups_api_url, _http)
 
 
-def fetch_age_groups_with_retry(max_attempts: int = 5) -> List[Dict]:
-    delay = 0
-    for attempt in range(1, max_attempts + 1):
+_retry = RetryTopology(settings.rabbit_queue_name, settings.worker_retry_delays_seconds)
+
+
+def _simulate_processing() -> None:
+    if settings.worker_processing_delay_seconds > 0:
+        time.sleep(settings.worker_processing_delay_seconds)
+
+
+DUPLICATE_KEY = 11000
+
+
+def _apply_outcome(
+    col, cpf_state: CpfStateRepository, doc: dict, new_status, reason
+) -> Optional[Tuple[EnrollmentStatus, Optional[str]]]:
+    """
+    Writes the outcome and moves the CPF counters. The write only matches
+    while the enrollment still has the status we read, so a concurrent
+    delivery of the same enrollment cannot count it twice. Returns the
+    status and reason written, or None if it did not match.
+
+    A failed enrollment replayed from the parking lot may meanwhile have
+    a newer pending or approved enrollment of the same CPF and owner;
+    approving it would break cpf_owner_active_unique, so it is rejected
+    as ALREADY_ACTIVE instead.
+    """
+    query = {"_id": doc["_id"], "status": doc.get("status")}
+    try:
+        res = col.update_one(query, outcome_update(new_status, reason))
+    except DuplicateKeyError:
+        new_status, reason = EnrollmentStatus.rejected, ALREADY_ACTIVE
+        res = col.update_one(query, outcome_update(new_status, reason))
+    if not res.modified_count:
+        return None
+    cpf_state.record(
+        doc.get("cpf"), doc.get("owner"), doc["_id"], doc.get("status"), new_status.value
+    )
+    return new_status, reason
+
+
+def _bulk_write_outcomes(col, outcomes: List[Tuple], batch: ObjectId) -> List[Tuple]:
+    """
+    The bulk write behind _apply_outcomes. Outcomes whose approval hit
+    cpf_owner_active_unique are rewritten as ALREADY_ACTIVE rejections,
+    as in _apply_outcome; returns the outcomes as finally written.
+    """
+    def update(doc, new_status, reason):
+        # UpdateMany on an _id filter touches one document, like
+        # UpdateOne, but is also accepted by mongomock's bulk_write.
+        return UpdateMany(
+            {"_id": doc["_id"], "status": doc.get("status")},
+            outcome_update(new_status, reason, batch)
+        )
+
+    try:
+        col.bulk_write([update(*o) for o in outcomes], ordered=False)
+        return outcomes
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        conflicts = {err["index"] for err in errors}
+    outcomes = [
+        (doc, EnrollmentStatus.rejected, ALREADY_ACTIVE) if i in conflicts else (doc, new_status, reason)
+        for i, (doc, new_status, reason) in enumerate(outcomes)
+    ]
+    col.bulk_write([update(*outcomes[i]) for i in sorted(conflicts)], ordered=False)
+    return outcomes
+
+
+def _apply_outcomes(col, cpf_state: CpfStateRepository, outcomes: List[Tuple]) -> List[Tuple]:
+    """
+    Batch form of _apply_outcome for (doc, new_status, reason) tuples:
+    one unordered bulk write, each update conditional on the status that
+    was read. Only the outcomes whose write matched move the CPF
+    counters; they are returned, so a concurrent delivery that decided
+    an enrollment first is neither counted twice nor announced.
+    """
+    if not outcomes:
+        return []
+    # A token of this batch alone: a timestamp could be shared with
+    # another worker writing the same enrollment in the same instant.
+    batch = ObjectId()
+    outcomes = _bulk_write_outcomes(col, outcomes, batch)
+    written = {
+        d["_id"]
+        for d in col.find(
+            {"_id": {"$in": [doc["_id"] for doc, _, _ in outcomes]}, "processed_batch": batch},
+            {"_id": 1},
+        )
+    }
+    matched = [o for o in outcomes if o[0]["_id"] in written]
+    cpf_state.record_many(
+        (doc.get("cpf"), doc.get("owner"), doc["_id"], doc.get("status"), new_status.value)
+        for doc, new_status, _ in matched
+    )
+    return matched
+
+
+def _events(outcomes: List[Tuple]) -> List[Dict]:
+    return [
+        status_event(doc["_id"], doc.get("owner"), new_status.value, reason)
+        for doc, new_status, reason in outcomes
+    ]
+
+
+def _notify(ch: BlockingChannel, events: List[Dict]) -> None:
+    """Tells the API processes which enrollments changed, for their caches."""
+    with worker_stats.stage("notify"):
         try:
-            logger.info(f"Fetching age groups (attempt {attempt})")
-            return _age_client.list()
+            publish_events(ch, settings.enrollment_events_exchange, events)
         except Exception:
-            if attempt == max_attempts:
-                logger.exception("Failed to fetch age groups after retries")
-                raise
-            delay += 3 * attempt
-            time.sleep(delay)
+            logger.exception("Could not publish enrollment status events")
+
+
+def _retry_or_park(ch: BlockingChannel, props, body: bytes, error: str) -> bool:
+    """
+    Republishes a delivery that failed to its next delay queue, or to the
+    parking lot once its retries are used up; returns True if parked.
+    The channel runs with publisher confirms (see main()), so this returns
+    once the broker has the copy, before the original is acked.
+    """
+    target, headers = _retry.route_failure(getattr(props, "headers", None), error)
+    ch.basic_publish(
+        exchange="",
+        routing_key=target,
+        body=body,
+        properties=pika.BasicProperties(headers=headers, delivery_mode=2),
+    )
+    return target == _retry.parked
+
+
+def _ack(ch: BlockingChannel, delivery_tag: int, multiple: bool = False):
+    with worker_stats.stage("ack"):
+        return ch.basic_ack(delivery_tag=delivery_tag, multiple=multiple)
 
 
 def process_one(ch: BlockingChannel, method, props, body: bytes):
-    col = DatabaseProvider.get_db()["enrollments"]
+    """
+    Outcomes and per-stage timings go to worker_stats, which logs one
+    summary line per interval instead of a line per message.
+    """
+    db = DatabaseProvider.get_db()
+    col = db["enrollments"]
+    cpf_state = CpfStateRepository(db)
     enrollment_id = body.decode()
-    logger.info(f"⏳ Received message for enrollment_id={enrollment_id!r}")
 
-    doc = col.find_one({"_id": ObjectId(enrollment_id)})
+    with worker_stats.stage("load"):
+        doc = col.find_one({"_id": ObjectId(enrollment_id)})
     if not doc:
-        logger.warning(f"No document found for {enrollment_id!r}; acking and skipping")
-        return ch.basic_ack(delivery_tag=method.delivery_tag)
+        logger.debug(f"No document found for {enrollment_id!r}; acking and skipping")
+        worker_stats.outcome("missing")
+        return _ack(ch, method.delivery_tag)
+    if is_final(doc.get("status")):
+        logger.debug(f"Enrollment {enrollment_id} is already {doc['status']}; acking and skipping")
+        worker_stats.outcome("skipped")
+        return _ack(ch, method.delivery_tag)
 
-    time.sleep(2)
+    with worker_stats.stage("processing_delay"):
+        _simulate_processing()
 
     try:
-        groups = fetch_age_groups_with_retry()
-    except Exception:
-        logger.error(f"Marking enrollment {enrollment_id} as failed and NACKing")
-        col.update_one(
-            {"_id": ObjectId(enrollment_id)},
-            {"$set": {
-                "status": EnrollmentStatus.failed.value,
-                "processed_at": datetime.now(timezone.utc)
-            }}
-        )
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-        return
-
-    age = doc.get("age")
-    cpf = doc.get("cpf")
-
-    rejected_count = col.count_documents({
-        "cpf": cpf,
-        "status": EnrollmentStatus.rejected.value
-    })
-    if rejected_count >= 3:
-        reason = "Too many rejections; you cannot request again"
-        logger.info(f"Rejecting {enrollment_id}: {reason}")
-        col.update_one(
-            {"_id": ObjectId(enrollment_id)},
-            {"$set": {
-                "status": EnrollmentStatus.rejected.value,
-                "rejection_reason": reason,
-                "processed_at": datetime.now(timezone.utc)
-            }}
-        )
-        return ch.basic_ack(delivery_tag=method.delivery_tag)
-
-    if not any(g["min_age"] <= age <= g["max_age"] for g in groups):
-        reason = f"Age {age} not in any group"
-        logger.info(f"Rejecting {enrollment_id}: {reason}")
-        col.update_one(
-            {"_id": ObjectId(enrollment_id)},
-            {"$set": {
-                "status": EnrollmentStatus.rejected.value,
-                "rejection_reason": reason,
-                "processed_at": datetime.now(timezone.utc)
-            }}
-        )
-        return ch.basic_ack(delivery_tag=method.delivery_tag)
-
-    if col.count_documents({
-            "cpf": cpf,
-            "status": EnrollmentStatus.approved.value
-        }) > 0:
-        reason = "An enrollment is already approved for this CPF"
-        logger.info(f"Rejecting {enrollment_id}: {reason}")
-        col.update_one(
-            {"_id": ObjectId(enrollment_id)},
-            {"$set": {
-                "status": EnrollmentStatus.rejected.value,
-                "rejection_reason": reason,
-                "processed_at": datetime.now(timezone.utc)
-            }}
-        )
-        return ch.basic_ack(delivery_tag=method.delivery_tag)
-
-    logger.info(f"Approving enrollment {enrollment_id}")
-    col.update_one(
-        {"_id": ObjectId(enrollment_id)},
-        {"$set": {
-            "status": EnrollmentStatus.approved.value,
-            "processed_at": datetime.now(timezone.utc)
-        }}
+        with worker_stats.stage("age_groups"):
+            groups = _age_groups_cache.get()
+    except Exception as e:
+        if not _retry_or_park(ch, props, body, repr(e)):
+            worker_stats.outcome("retried")
+            return _ack(ch, method.delivery_tag)
+        logger.error(f"Retries exhausted; marking enrollment {enrollment_id} as failed and parking it")
+        with worker_stats.stage("write"):
+            written = _apply_outcome(col, cpf_state, doc, EnrollmentStatus.failed, None)
+        if written is not None:
+            _notify(ch, [status_event(doc["_id"], doc.get("owner"), EnrollmentStatus.failed.value)])
+        worker_stats.outcome(EnrollmentStatus.failed.value)
+        return _ack(ch, method.delivery_tag)
+
+    with worker_stats.stage("cpf_state"):
+        state = cpf_state.get(doc.get("cpf"))
+    new_status, reason = decide(doc.get("age"), groups, state.rejected, state.approved)
+    with worker_stats.stage("write"):
+        written = _apply_outcome(col, cpf_state, doc, new_status, reason)
+    if written is None:
+        worker_stats.outcome("skipped")
+        return _ack(ch, method.delivery_tag)
+    new_status, reason = written
+    _notify(ch, [status_event(doc["_id"], doc.get("owner"), new_status.value, reason)])
+    worker_stats.decided(new_status.value, reason)
+    return _ack(ch, method.delivery_tag)
+
+
+def process_batch(ch: BlockingChannel, deliveries: List[Tuple]):
+    """
+    Processes several deliveries with one read of the enrollments, one
+    read of the CPF states and one unordered bulk write (one more per
+    repeat of a CPF), then acks the whole batch at once.
+
+    Deliveries are evaluated in order. A CPF that appears more than once
+    is decided one enrollment per write, so later enrollments see only
+    the earlier outcomes whose write matched: an approval that lost a
+    race does not get the next enrollment rejected.
+    """
+    db = DatabaseProvider.get_db()
+    col = db["enrollments"]
+    cpf_state = CpfStateRepository(db)
+    last_tag = deliveries[-1][0].delivery_tag
+
+    oids = []
+    by_oid = {}
+    for _, props, body in deliveries:
+        try:
+            oid = ObjectId(body.decode())
+        except (bson_errors.InvalidId, TypeError):
+            logger.warning(f"Skipping invalid enrollment_id={body!r}")
+            worker_stats.outcome("invalid")
+            continue
+        if oid not in oids:
+            oids.append(oid)
+            by_oid[oid] = (props, body)
+
+    with worker_stats.stage("load"):
+        found = list(col.find({"_id": {"$in": oids}}))
+    docs = {d["_id"]: d for d in found if not is_final(d.get("status"))}
+    for _ in range(len(oids) - len(found)):
+        worker_stats.outcome("missing")
+    for _ in range(len(found) - len(docs)):
+        worker_stats.outcome("skipped")
+    if not docs:
+        return _ack(ch, last_tag, multiple=True)
+
+    with worker_stats.stage("processing_delay"):
+        _simulate_processing()
+
+    try:
+        with worker_stats.stage("age_groups"):
+            groups = _age_groups_cache.get()
+    except Exception as e:
+        parked = {
+            oid: d for oid, d in docs.items() if _retry_or_park(ch, *by_oid[oid], repr(e))
+        }
+        for _ in range(len(docs) - len(parked)):
+            worker_stats.outcome("retried")
+        if parked:
+            logger.error(f"Retries exhausted; marking {len(parked)} enrollments as failed and parking them")
+            with worker_stats.stage("write"):
+                matched = _apply_outcomes(
+                    col, cpf_state, [(d, EnrollmentStatus.failed, None) for d in parked.values()]
+                )
+            _notify(ch, _events(matched))
+            for _ in parked:
+                worker_stats.outcome(EnrollmentStatus.failed.value)
+        return _ack(ch, last_tag, multiple=True)
+
+    with worker_stats.stage("cpf_state"):
+        states = cpf_state.get_many(d.get("cpf") for d in docs.values())
+    counts = {
+        cpf: {
+            EnrollmentStatus.rejected.value: state.rejected,
+            EnrollmentStatus.approved.value: state.approved,
+        }
+        for cpf, state in states.items()
+    }
+    remaining = [docs[oid] for oid in oids if oid in docs]
+    matched: List[Tuple] = []
+    skipped = 0
+    while remaining:
+        outcomes, later, seen = [], [], set()
+        for doc in remaining:
+            cpf = doc.get("cpf")
+            if cpf in seen:
+                later.append(doc)
+                continue
+            seen.add(cpf)
+            new_status, reason = decide(
+                doc.get("age"),
+                groups,
+                rejected_count=counts[cpf][EnrollmentStatus.rejected.value],
+                approved_count=counts[cpf][EnrollmentStatus.approved.value],
+            )
+            outcomes.append((doc, new_status, reason))
+        with worker_stats.stage("write"):
+            written = _apply_outcomes(col, cpf_state, outcomes)
+        for doc, new_status, _ in written:
+            counts[doc.get("cpf")][new_status.value] += 1
+        matched.extend(written)
+        skipped += len(outcomes) - len(written)
+        remaining = later
+
+    _notify(ch, _events(matched))
+    for _, new_status, reason in matched:
+        worker_stats.decided(new_status.value, reason)
+    for _ in range(skipped):
+        worker_stats.outcome("skipped")
+    return _ack(ch, last_tag, multiple=True)
+
+
+def consume_batches(ch: BlockingChannel, batch_size: int, batch_timeout_ms: int):
+    """
+    Collects up to `batch_size` deliveries, or whatever arrived within
+    `batch_timeout_ms` of the first one, and hands them to process_batch.
+    """
+    buffer: List[Tuple] = []
+
+    def on_message(ch, method, props, body):
+        buffer.append((method, props, body))
+
+    ch.basic_qos(prefetch_count=batch_size)
+    ch.basic_consume(
+        queue=settings.rabbit_queue_name,
+        on_message_callback=on_message
     )
-    return ch.basic_ack(delivery_tag=method.delivery_tag)
+    while not _stopping.is_set():
+        while not buffer and not _stopping.is_set():
+            ch.connection.process_data_events(time_limit=None)
+        deadline = time.monotonic() + batch_timeout_ms / 1000
+        while len(buffer) < batch_size and not _stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ch.connection.process_data_events(time_limit=remaining)
+        while buffer:
+            batch, buffer[:] = buffer[:batch_size], buffer[batch_size:]
+            process_batch(ch, batch)
+
+
+def _install_stop_handler(ch: BlockingChannel) -> None:
+    """
+    On SIGTERM/SIGINT stop taking new deliveries; the message (or batch)
+    being processed is finished and acked before main() returns.
+    """
+    def on_signal(signum, frame):
+        logger.info(f"Received signal {signum}; finishing in-flight messages")
+        _stopping.set()
+        ch.connection.add_callback_threadsafe(ch.stop_consuming)
+
+    signal.signal(signal.SIGTERM, on_signal)
+    signal.signal(signal.SIGINT, on_signal)
+
+
+def _ensure_indexes() -> None:
+    """
+    As at API startup, a failure (e.g. an index that already exists with
+    other options) is logged and the worker runs without the index, rather
+    than exiting and being restarted into the same error.
+    """
+    try:
+        ensure_indexes(DatabaseProvider.get_db())
+    except PyMongoError as e:
+        logger.error(f"Could not ensure MongoDB indexes: {e}")
 
 
 def main():
     logger.info("Worker starting up, connecting to RabbitMQ…")
+    _ensure_indexes()
+    _age_groups_cache.start_background_refresh()
+    worker_stats.start(settings.worker_stats_port, settings.worker_stats_log_interval_seconds)
     ch = RabbitMQProvider.get_channel()
-    ch.basic_qos(prefetch_count=1)
-    ch.basic_consume(
-        queue=settings.rabbit_queue_name,
-        on_message_callback=process_one
-    )
-    logger.info(f"[*] Waiting for messages on queue '{settings.rabbit_queue_name}'")
-    ch.start_consuming()
+    _retry.declare(ch)
+    declare_events_exchange(ch, settings.enrollment_events_exchange)
+    # With confirms, basic_publish returns once the broker has the
+    # message, so a retry or parked copy exists before the original is acked.
+    ch.confirm_delivery()
+    _install_stop_handler(ch)
+    try:
+        if settings.worker_batch_size > 1:
+            logger.info(
+                f"[*] Consuming '{settings.rabbit_queue_name}' in batches of "
+                f"{settings.worker_batch_size}"
+            )
+            consume_batches(ch, settings.worker_batch_size, settings.worker_batch_timeout_ms)
+        else:
+            ch.basic_qos(prefetch_count=1)
+            ch.basic_consume(
+                queue=settings.rabbit_queue_name,
+                on_message_callback=process_one
+            )
+            logger.info(f"[*] Waiting for messages on queue '{settings.rabbit_queue_name}'")
+            ch.start_consuming()
+    finally:
+        _age_groups_cache.stop_background_refresh()
+        worker_stats.stop()
+        RabbitMQProvider.close()
+        logger.info("Worker stopped")
 
 
 if __name__ == "__main__":